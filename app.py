@@ -1,24 +1,24 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import json
-from prophet import Prophet
-from prophet.serialize import model_from_json
-import psycopg2
-from db import init_connection
+from db import init_connection, read_static_data
+from artifacts import latest_artifact
+from forecasting import STORE_DIVIDER, run_all_forecasts, forecast_matrix, load_published_forecasts, triage_from_forecasts
+from forecast_history import record_run
+from replenishment import replenishment_policy, plan_store, plan_full_chain
+from rebalancing import plan_transfers
 
 # --- Page Config ---
 st.set_page_config(page_title="LocalLens Triage", page_icon="🏠", layout="wide")
 
 # --- Helper Functions ---
 @st.cache_resource
-def load_static_data(_conn):
-    """Loads products, stores, and trend map in one go."""
-    products = pd.read_sql("SELECT product_id, name FROM products ORDER BY name", _conn)
-    stores = pd.read_sql("SELECT store_id, name FROM stores ORDER BY name", _conn)
-    trends = pd.read_sql("SELECT product_id, keyword FROM product_trend_mapping", _conn)
-    trend_map = dict(zip(trends['product_id'], trends['keyword']))
-    return products, stores, trend_map
+def query_static_data(_conn):
+    return read_static_data(_conn)
+
+def load_static_data(conn):
+    """Loads products, stores, and trend map in one go (published by scheduler.py when it runs)."""
+    static = latest_artifact("static") or query_static_data(conn)
+    return static['products'], static['stores'], static['trend_map']
 
 @st.cache_data(show_spinner=False)
 def get_current_stock(_conn, store_id):
@@ -31,57 +31,29 @@ def get_current_stock(_conn, store_id):
     df = pd.read_sql(query, _conn, params=params)
     return dict(zip(df['product_id'], df['total_stock']))
 
-@st.cache_resource(show_spinner=False)
-def load_prophet_model(product_id):
-    try:
-        # --- UPDATE: Look in the 'models/' folder ---
-        with open(f"models/demand_model_product_{product_id}.json", 'r') as f:
-            return model_from_json(f.read())
-    except:
-        return None
-
-def generate_future_trend(future_dates, keyword):
-    # (Simplified seasonality logic)
-    day_of_year = future_dates['ds'].dt.dayofyear
-    base = 20
-    noise = np.random.normal(0, 3, len(future_dates))
-    seasonality = (np.sin(2 * np.pi * (day_of_year - 90) / 365.25) + 1) * 10
-    if keyword in ['Turkey Breast', 'Cranberry Sauce', 'Ground Turkey']:
-        seasonality = (np.sin(2 * np.pi * (day_of_year - 320) / 365.25) + 1) * 35 
-    return np.clip(base + seasonality + noise, 0, 100).astype(int)
-
 @st.cache_data(show_spinner=False)
-def run_all_forecasts(_product_list, _trend_map, _stock_map, store_id):
-    """Runs forecasts and returns results AND the cache."""
-    triage_results = []
-    forecast_cache = {} 
-    
-    for _, product in _product_list.iterrows():
-        pid, pname = product['product_id'], product['name']
-        model = load_prophet_model(pid)
-        if not model: continue
-
-        future = model.make_future_dataframe(periods=14, freq='D')
-        future['on_sale'] = 0
-        if pid in _trend_map:
-            future['interest'] = generate_future_trend(future, _trend_map[pid])
-        
-        forecast = model.predict(future)
-        forecast_cache[pid] = forecast 
-        
-        raw_demand = int(forecast.iloc[-14:]['yhat'].sum())
-        final_demand = raw_demand if store_id == "ALL_STORES" else int(raw_demand / 5)
-        stock = _stock_map.get(pid, 0)
-        
-        triage_results.append({
-            "product_id": pid,
-            "product_name": pname,
-            "current_stock": stock,
-            "forecasted_demand": final_demand,
-            "shortfall": max(0, final_demand - stock)
-        })
+def get_stock_matrix(_conn, product_ids, store_ids):
+    """Stock for every product (rows) in every store (columns), from one query."""
+    df = pd.read_sql("SELECT product_id, store_id, stock_quantity FROM inventory", _conn)
+    matrix = df.pivot(index='product_id', columns='store_id', values='stock_quantity')
+    return matrix.reindex(index=list(product_ids), columns=list(store_ids)).fillna(0).to_numpy()
+
+def forecast_bands(forecast_cache):
+    """(product_ids, yhat, yhat_lower, yhat_upper) matrices for the next 14 days."""
+    pids, yhat, _ = forecast_matrix(forecast_cache, 'yhat')
+    _, lower, _ = forecast_matrix(forecast_cache, 'yhat_lower')
+    _, upper, _ = forecast_matrix(forecast_cache, 'yhat_upper')
+    return pids, yhat, lower, upper
 
-    return pd.DataFrame(triage_results), forecast_cache
+@st.cache_resource(show_spinner=False)
+def record_forecast_history(_conn, run_date, _forecast_cache, _store_ids):
+    """Keeps today's on-demand forecasts when the scheduler isn't recording them (once per day per server)."""
+    try:
+        return record_run(_conn, _forecast_cache, _store_ids, run_date)
+    except Exception as e:
+        _conn.rollback()
+        print(f"Could not record forecast history: {e}")
+        return 0
 
 @st.cache_data
 def convert_df_to_csv(df):
@@ -104,13 +76,26 @@ if conn:
         st.session_state['selected_store_id'] = "ALL_STORES"
     
     sel_store_id = st.sidebar.selectbox("Select Store:", options=store_opts.keys(), format_func=lambda x: store_opts[x], key='selected_store_id')
+
+    st.sidebar.subheader("Reorder Policy")
+    lead_time = st.sidebar.slider("Supplier Lead Time (days):", min_value=1, max_value=7, value=3)
+    service_level = st.sidebar.select_slider("Target Service Level:", options=[0.90, 0.95, 0.98, 0.99], value=0.95, format_func=lambda x: f"{x:.0%}")
+    policy = {"lead_time_days": lead_time, "service_level": service_level}
     
     # Run Logic
     stock_map = get_current_stock(conn, sel_store_id)
     
-    if 'triage_df' not in st.session_state or st.session_state.get('last_store') != sel_store_id:
+    # Forecasts published by scheduler.py: only the (cheap) stock comparison runs per store
+    forecast_cache, published_at = load_published_forecasts()
+    if forecast_cache is not None:
+        triage_df = triage_from_forecasts(products, forecast_cache, stock_map, sel_store_id)
+        st.session_state['forecast_cache'] = forecast_cache
+        st.session_state['products_df'] = products
+        st.sidebar.caption(f"Forecasts published {published_at:%b %d, %H:%M}.")
+    elif 'triage_df' not in st.session_state or st.session_state.get('last_store') != sel_store_id:
         with st.spinner(f"Running fresh forecasts for {store_opts[sel_store_id]}..."):
             triage_df, forecast_cache = run_all_forecasts(products, trend_map, stock_map, sel_store_id)
+            record_forecast_history(conn, pd.Timestamp.now().date(), forecast_cache, stores['store_id'].tolist())
             
             st.session_state['triage_df'] = triage_df
             st.session_state['forecast_cache'] = forecast_cache
@@ -118,20 +103,45 @@ if conn:
             st.session_state['last_store'] = sel_store_id
     else:
         triage_df = st.session_state['triage_df']
+        forecast_cache = st.session_state['forecast_cache']
+
+    # Reorder points & order quantities from the forecast uncertainty bands
+    if not triage_df.empty:
+        pids, yhat, lower, upper = forecast_bands(forecast_cache)
+        divider = 1 if sel_store_id == "ALL_STORES" else STORE_DIVIDER
+        stock_vec = pd.Series(stock_map).reindex(pids).fillna(0).to_numpy()
+        plan = plan_store(pids, yhat, lower, upper, stock_vec, divider=divider, **policy)
+        triage_df = triage_df.merge(plan, on='product_id', how='left')
+
+        # Sister-store transfers: cover shortages from stores holding surplus before ordering
+        store_ids = stores['store_id'].tolist()
+        stock_matrix = get_stock_matrix(conn, tuple(pids), tuple(store_ids))
+        store_demand = (yhat.sum(axis=1) / STORE_DIVIDER)[:, None]
+        keep_buffer = replenishment_policy(yhat / STORE_DIVIDER, lower / STORE_DIVIDER, upper / STORE_DIVIDER, 0, **policy)['safety_stock'][:, None]
+        transfers = plan_transfers(pids, store_ids, store_demand, stock_matrix, safety_stock=keep_buffer)
+        if sel_store_id != "ALL_STORES":
+            transfers = transfers[(transfers['from_store_id'] == sel_store_id) | (transfers['to_store_id'] == sel_store_id)]
+            incoming = transfers[transfers['to_store_id'] == sel_store_id].groupby('product_id')['units'].sum()
+            triage_df['transfer_in'] = triage_df['product_id'].map(incoming).fillna(0).astype(int)
+        else:
+            triage_df['transfer_in'] = 0
+        # Units arriving from a sister store don't need to be ordered again
+        triage_df['order_qty'] = (triage_df['order_qty'] - triage_df['transfer_in']).clip(lower=0)
 
     # Display Triage
     st.header("🔥 Priority Restock List")
-    st.markdown("Items projected to sell out in the next 14 days.")
+    st.markdown("Items projected to sell out in the next 14 days, or already below their reorder point.")
     
     if not triage_df.empty:
-        restock = triage_df[triage_df['shortfall'] > 0].sort_values('shortfall', ascending=False)
+        restock = triage_df[(triage_df['shortfall'] > 0) | (triage_df['order_qty'] > 0)]
+        restock = restock.sort_values(['shortfall', 'order_qty'], ascending=False)
         
         if restock.empty:
             st.success("✅ Stock levels look good! No immediate action needed.")
         else:
             # Purchase Order Generator
             restock['Select'] = False
-            restock = restock[['Select', 'product_name', 'current_stock', 'forecasted_demand', 'shortfall']]
+            restock = restock[['Select', 'product_name', 'current_stock', 'forecasted_demand', 'shortfall', 'transfer_in', 'safety_stock', 'reorder_point', 'order_qty']]
             
             edited_df = st.data_editor(
                 restock,
@@ -141,8 +151,13 @@ if conn:
                     "product_name": "Product",
                     "current_stock": "In Stock",
                     "forecasted_demand": "Needed (14 Days)",
-                    "shortfall": st.column_config.ProgressColumn("Shortage", format="%d", min_value=0, max_value=int(restock['shortfall'].max())),
+                    "shortfall": st.column_config.ProgressColumn("Shortage", format="%d", min_value=0, max_value=max(1, int(restock['shortfall'].max()))),
+                    "transfer_in": st.column_config.NumberColumn("Transfer In", format="%d", help="Units a sister store can send (see Transfer Suggestions)"),
+                    "safety_stock": st.column_config.NumberColumn("Safety Stock", format="%d"),
+                    "reorder_point": st.column_config.NumberColumn("Reorder Point", format="%d"),
+                    "order_qty": st.column_config.NumberColumn("Order Qty", format="%d"),
                 },
+                disabled=['product_name', 'current_stock', 'forecasted_demand', 'shortfall', 'transfer_in', 'safety_stock', 'reorder_point'],
                 key="po_editor"
             )
             
@@ -150,7 +165,37 @@ if conn:
             selected = edited_df[edited_df.Select]
             if not selected.empty:
                 st.subheader("Generate Purchase Order")
-                csv = convert_df_to_csv(selected)
+                po = selected[['product_name', 'order_qty', 'current_stock', 'reorder_point', 'safety_stock']]
+                csv = convert_df_to_csv(po)
                 st.download_button("Download PO CSV", csv, "purchase_order.csv", "text/csv")
+
+        # Transfer Suggestions
+        st.subheader("🔁 Transfer Suggestions")
+        if transfers.empty:
+            st.caption("No sister store has surplus to cover a shortage right now.")
+        else:
+            store_names = dict(zip(stores['store_id'], stores['name']))
+            product_names = dict(zip(products['product_id'], products['name']))
+            st.dataframe(
+                pd.DataFrame({
+                    "Product": transfers['product_id'].map(product_names),
+                    "From": transfers['from_store_id'].map(store_names),
+                    "To": transfers['to_store_id'].map(store_names),
+                    "Units": transfers['units'],
+                }).sort_values('Units', ascending=False),
+                use_container_width=True,
+                hide_index=True,
+            )
+
+        # Full-chain PO: every product x store in one vectorized pass
+        with st.expander("🚚 Full-Chain Purchase Order (all stores)"):
+            st.caption(f"Lead time {lead_time} days, {service_level:.0%} service level.")
+            if st.button("Build Full-Chain PO"):
+                chain_po = plan_full_chain(pids, store_ids, yhat, lower, upper, stock_matrix, **policy)
+                chain_po.insert(0, 'store_name', chain_po['store_id'].map(dict(zip(stores['store_id'], stores['name']))))
+                chain_po.insert(1, 'product_name', chain_po['product_id'].map(dict(zip(products['product_id'], products['name']))))
+
+                st.metric("Order Lines", f"{len(chain_po):,}", help=f"{int(chain_po['order_qty'].sum()):,} units in total")
+                st.download_button("Download Full-Chain PO CSV", convert_df_to_csv(chain_po), "purchase_order_all_stores.csv", "text/csv")
     else:
         st.warning("No forecast data generated. Check database connections.")
\ No newline at end of file
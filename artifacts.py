@@ -0,0 +1,89 @@
+"""
+Precomputed artifacts shared by the scheduler and the pages.
+
+scheduler.py computes the expensive things (forecasts, the static product /
+store tables, ...) in the background and publishes each one as a pickle in
+artifacts/. A publish writes a temporary file and renames it over the old
+one, so a reader sees either the previous complete artifact or the new one,
+never a half-written file. Pages look artifacts up by name; the file's
+mtime is the version, so a new publish is picked up on the next rerun
+without clearing any Streamlit cache.
+"""
+import json
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+import streamlit as st
+
+ARTIFACT_DIR = "artifacts"
+STATUS_FILE = "_status.json"
+
+
+def artifact_path(name, root=ARTIFACT_DIR):
+    return os.path.join(root, f"{name}.pkl")
+
+
+def _atomic_write(path, data):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp creates 0600; the app may run as another user
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def publish(name, payload, root=ARTIFACT_DIR):
+    """Atomically replaces artifact `name`; `published_at` is added to the payload dict."""
+    payload = {**payload, "published_at": pd.Timestamp.now()}
+    path = artifact_path(name, root)
+    _atomic_write(path, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+    return path
+
+
+def artifact_version(name, root=ARTIFACT_DIR):
+    """mtime of the published artifact (ns), or None if it has never been published."""
+    try:
+        return os.stat(artifact_path(name, root)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def read_artifact(name, root=ARTIFACT_DIR):
+    try:
+        with open(artifact_path(name, root), "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _load_artifact(name, version):
+    return read_artifact(name)
+
+
+def latest_artifact(name):
+    """The current published payload of `name` (loaded once per version), or None."""
+    version = artifact_version(name)
+    return None if version is None else _load_artifact(name, version)
+
+
+# --- Scheduler Status ---
+def read_status(root=ARTIFACT_DIR):
+    try:
+        with open(os.path.join(root, STATUS_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_status(status, root=ARTIFACT_DIR):
+    _atomic_write(os.path.join(root, STATUS_FILE), json.dumps(status, indent=2, default=str).encode())
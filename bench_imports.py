@@ -0,0 +1,91 @@
+"""
+Cold-start import benchmark for the Streamlit pages.
+
+For every page this runs the page's top-level imports in a fresh interpreter
+(so nothing is cached in sys.modules) and compares it with the eager setup
+the pages used to have, where Prophet / spaCy / BeautifulSoup were imported
+up front.
+
+Usage:
+    python bench_imports.py --repeat 5
+"""
+import argparse
+import ast
+import glob
+import statistics
+import subprocess
+import sys
+
+PAGES = ["app.py"] + sorted(glob.glob("pages/*.py"))
+
+# What each page imported at startup before the lazy-import refactor
+EAGER_IMPORTS = {
+    "app.py": ["from prophet import Prophet", "from prophet.serialize import model_from_json"],
+    "Recipe_Finder": ["import spacy", "import requests", "from bs4 import BeautifulSoup"],
+    # Business Health used to do `from app import init_connection`, re-running the dashboard's imports
+    "Business_Health": ["from prophet import Prophet", "from prophet.serialize import model_from_json"],
+}
+
+TIMER = """
+import time, sys
+sys.path.insert(0, '.')
+_t = time.perf_counter()
+{imports}
+print(time.perf_counter() - _t)
+"""
+
+
+def top_level_imports(path):
+    """Returns the source of the import statements at the top level of a page."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return [ast.get_source_segment(source, node) for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def eager_imports_for(path):
+    for key, imports in EAGER_IMPORTS.items():
+        if key in path:
+            return imports
+    return []
+
+
+def time_imports(imports, repeat):
+    """Median wall time (ms) of running `imports` in a fresh interpreter."""
+    code = TIMER.format(imports="\n".join(imports))
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if out.returncode != 0:
+            return None, out.stderr.strip().splitlines()[-1]
+        runs.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+    return statistics.median(runs), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-page cold-start import time.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement")
+    args = parser.parse_args()
+
+    print(f"{'page':<36}{'lazy ms':>10}{'eager ms':>10}{'saved':>10}")
+    for page in PAGES:
+        imports = top_level_imports(page)
+        lazy_ms, error = time_imports(imports, args.repeat)
+        if error:
+            print(f"{page:<36}  failed: {error}")
+            continue
+
+        eager = eager_imports_for(page)
+        eager_ms = lazy_ms
+        if eager:
+            eager_ms, error = time_imports(imports + eager, args.repeat)
+            if error:
+                print(f"{page:<36}{lazy_ms:>10.0f}  eager baseline failed: {error}")
+                continue
+
+        print(f"{page:<36}{lazy_ms:>10.0f}{eager_ms:>10.0f}{eager_ms - lazy_ms:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
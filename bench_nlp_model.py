@@ -0,0 +1,99 @@
+"""
+Benchmark for the ingredient NER model variants.
+
+Each model is measured in a fresh interpreter (so load time and memory are
+cold-start numbers): time to load, resident memory added by the model,
+docs/sec through nlp.pipe over raw_ingredients.txt, and F1 on the gold set
+from test_nlp_advanced.py. The same lines are also run through
+recipes.parse_lines (rule-based fast path, NER only for the rest) to show
+the end-to-end lines/sec, the fast path's share, and how often it agrees
+with the model on the lines it handles.
+
+Usage:
+    python bench_nlp_model.py
+    python bench_nlp_model.py --models ./my_ingredient_model ./retrained_model --repeat 20
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from recipes import MODEL_PATH
+
+RUNNER = """
+import json, resource, sys, time
+sys.path.insert(0, '.')
+import spacy
+from recipes import extract_line, fast_parse, parse_lines
+from test_nlp_advanced import score_model
+
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+nlp = spacy.load({path!r})
+load_s = time.perf_counter() - start
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+with open({raw!r}, encoding="utf-8") as f:
+    lines = [" ".join(l.split()) for l in f if l.strip()]
+texts = lines * {repeat}
+start = time.perf_counter()
+ner = [extract_line(doc) for doc in nlp.pipe(texts, batch_size={batch_size})]
+docs_per_sec = len(ner) / (time.perf_counter() - start)
+
+start = time.perf_counter()
+_, from_rules = parse_lines(texts, nlp, batch_size={batch_size})
+mixed_per_sec = len(texts) / (time.perf_counter() - start)
+fast = [(f, n) for f, n in zip(map(fast_parse, lines), ner) if f is not None]
+
+print(json.dumps({{
+    "load_ms": load_s * 1000,
+    "model_mb": (rss_after - rss_before) / 1024,
+    "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "docs_per_sec": docs_per_sec,
+    "fast_lines_per_sec": mixed_per_sec,
+    "fast_share": from_rules / len(texts),
+    "fast_agreement": sum(f[0] == n[0] for f, n in fast) / max(len(fast), 1),
+    "gold_f1": score_model(nlp, verbose=False)[0]["ents_f"],
+}}))
+"""
+
+
+def bench(path, raw, repeat, batch_size):
+    code = RUNNER.format(path=path, raw=raw, repeat=repeat, batch_size=batch_size)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if out.returncode != 0:
+        print(f"  {path}: failed\n{out.stderr.strip().splitlines()[-1]}")
+        return None
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare NER model variants: load time, memory, docs/sec, F1.")
+    parser.add_argument("--models", nargs="+", default=[MODEL_PATH])
+    parser.add_argument("--raw", default="raw_ingredients.txt", help="Lines to push through nlp.pipe")
+    parser.add_argument("--repeat", type=int, default=10, help="Times to repeat the lines (bigger = steadier docs/sec)")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    results = {}
+    for path in args.models:
+        print(f"Benchmarking {path}...")
+        results[path] = bench(path, args.raw, args.repeat, args.batch_size)
+
+    print(f"\n{'Model':<32} {'Load (ms)':>10} {'Model (MB)':>11} {'Peak (MB)':>10} {'Docs/sec':>10} {'Gold F1':>8}")
+    for path, r in results.items():
+        if r is None:
+            continue
+        print(f"{path:<32} {r['load_ms']:>10.0f} {r['model_mb']:>11.1f} {r['peak_mb']:>10.1f} "
+              f"{r['docs_per_sec']:>10,.0f} {r['gold_f1']:>8.3f}")
+
+    print(f"\n{'With rule-based fast path':<32} {'Lines/sec':>10} {'Speed-up':>9} {'Fast share':>11} {'Agrees w/ NER':>14}")
+    for path, r in results.items():
+        if r is None:
+            continue
+        print(f"{path:<32} {r['fast_lines_per_sec']:>10,.0f} {r['fast_lines_per_sec'] / r['docs_per_sec']:>8.1f}x "
+              f"{r['fast_share']:>11.0%} {r['fast_agreement']:>14.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Concurrency benchmark for register stock decrements.
+
+Many tills (threads, each with its own connection) sell from a small set of
+hot SKUs in one store. Compares the guarded path (stock_reservation.reserve_stock)
+with the old check-then-update path, reporting throughput, latency, rejected
+carts and whether stock went negative. The hot SKUs' stock is restored at the end.
+
+Usage:
+    python bench_reservation.py --tills 32 --hot-skus 5 --duration 20
+"""
+import argparse
+import random
+import threading
+import time
+
+import numpy as np
+import psycopg2
+
+from db import LOCAL_DB
+from stock_reservation import reserve_stock
+
+
+def connect(dsn):
+    return psycopg2.connect(dsn) if dsn else psycopg2.connect(**LOCAL_DB)
+
+
+def naive_checkout(cur, store_id, items):
+    """The old register flow: read stock, then decrement without a guard."""
+    for item in items:
+        cur.execute("SELECT stock_quantity FROM inventory WHERE product_id = %s AND store_id = %s", (item["id"], store_id))
+        row = cur.fetchone()
+        if row is None or row[0] < item["qty"]:
+            return False, []
+    for item in items:
+        cur.execute(
+            "UPDATE inventory SET stock_quantity = stock_quantity - %s WHERE product_id = %s AND store_id = %s",
+            (item["qty"], item["id"], store_id),
+        )
+    return True, []
+
+
+def till(till_id, args, store_id, hot_skus, deadline, results):
+    rng = random.Random(args.seed + till_id)
+    checkout = reserve_stock if args.mode == "guarded" else naive_checkout
+    conn = connect(args.dsn)
+    samples = []
+    try:
+        with conn.cursor() as cur:
+            while time.time() < deadline:
+                cart = [{"id": pid, "qty": rng.randint(1, 2)} for pid in rng.sample(hot_skus, k=rng.randint(1, min(3, len(hot_skus))))]
+                start = time.perf_counter()
+                try:
+                    ok, _ = checkout(cur, store_id, cart)
+                    conn.commit()
+                except psycopg2.Error:
+                    conn.rollback()
+                    ok = None
+                samples.append((time.perf_counter() - start, ok))
+    finally:
+        conn.close()
+    results[till_id] = samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent register checkouts on hot SKUs.")
+    parser.add_argument("--tills", type=int, default=32)
+    parser.add_argument("--hot-skus", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--initial-stock", type=int, default=2000, help="Stock each hot SKU starts with")
+    parser.add_argument("--mode", choices=["guarded", "naive"], default="guarded")
+    parser.add_argument("--store-id", type=int, default=None, help="Store to sell from (default: first store)")
+    parser.add_argument("--dsn", default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    conn = connect(args.dsn)
+    with conn.cursor() as cur:
+        if args.store_id is None:
+            cur.execute("SELECT MIN(store_id) FROM inventory")
+            args.store_id = cur.fetchone()[0]
+        cur.execute("SELECT product_id, stock_quantity FROM inventory WHERE store_id = %s ORDER BY product_id LIMIT %s",
+                    (args.store_id, args.hot_skus))
+        original = cur.fetchall()
+        hot_skus = [pid for pid, _ in original]
+        cur.execute("UPDATE inventory SET stock_quantity = %s WHERE store_id = %s AND product_id = ANY(%s)",
+                    (args.initial_stock, args.store_id, hot_skus))
+    conn.commit()
+
+    print(f"{args.tills} tills selling {len(hot_skus)} hot SKUs in store {args.store_id} for {args.duration:.0f}s ({args.mode})...")
+    results = {}
+    deadline = time.time() + args.duration
+    threads = [threading.Thread(target=till, args=(i, args, args.store_id, hot_skus, deadline, results)) for i in range(args.tills)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT MIN(stock_quantity) FROM inventory WHERE store_id = %s AND product_id = ANY(%s)",
+                        (args.store_id, hot_skus))
+            min_stock = cur.fetchone()[0]
+    finally:
+        # Put the hot SKUs back the way we found them
+        with conn.cursor() as cur:
+            for pid, stock in original:
+                cur.execute("UPDATE inventory SET stock_quantity = %s WHERE store_id = %s AND product_id = %s",
+                            (stock, args.store_id, pid))
+        conn.commit()
+        conn.close()
+
+    samples = [s for till_samples in results.values() for s in till_samples]
+    latencies = np.array([s for s, _ in samples]) * 1000
+    sold = sum(1 for _, ok in samples if ok)
+    refused = sum(1 for _, ok in samples if ok is False)
+    errors = sum(1 for _, ok in samples if ok is None)
+
+    print("\n--- Results ---")
+    print(f"Checkouts attempted: {len(samples)} ({len(samples) / elapsed:.1f}/s)")
+    print(f"Completed: {sold} ({sold / elapsed:.1f}/s) | Refused (no stock): {refused} | DB errors: {errors}")
+    print(f"Latency p50 {np.percentile(latencies, 50):.1f} ms, p99 {np.percentile(latencies, 99):.1f} ms")
+    print(f"Lowest hot-SKU stock at the end: {min_stock} {'❌ NEGATIVE' if min_stock < 0 else '✅'}")
+
+
+if __name__ == "__main__":
+    main()
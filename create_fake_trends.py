@@ -1,84 +1,202 @@
-import pandas as pd
-import numpy as np
+"""
+Synthetic Google Trends generator.
+
+Builds the whole keyword x date interest matrix with NumPy (one block of
+keywords at a time, so memory stays bounded), from a small set of
+seasonality profiles. With no arguments it reproduces the original data
+set: the 31 product keywords below, weekly, over the last 5 years, written
+to google_trends_data.csv. For load testing it scales to thousands of
+keywords at daily granularity and can write Parquet or COPY straight into
+trend_data.
 
-print("Generating fake trend data based on robust product list...")
+Usage:
+    python create_fake_trends.py
+    python create_fake_trends.py --keywords 5000 --freq D --periods 1826 --seed 42 --format parquet
+    python create_fake_trends.py --keywords 5000 --freq D --to-db --replace
+"""
+import argparse
+import os
+from io import StringIO
+
+import numpy as np
+import pandas as pd
 
 # --- A new keyword list based on your products.csv ---
+TRENDY = ['Avocado', 'Oat Milk', 'Quinoa', 'Greek Yogurt', 'Sourdough Bread', 'Almond Flour']
+SUMMER = ['Vanilla Ice Cream', 'Barbecue Sauce', 'Hot Sauce', 'Hamburger Buns', 'Watermelon'] # Assuming Watermelon for summer
+HOLIDAY = ['Turkey Breast', 'Cranberry Sauce', 'Sweet Potato', 'Pumpkin Spice'] # Adding Pumpkin Spice as a classic example
+WINTER = ['Cocoa Powder']
+
 KEYWORDS = [
     # Trendy Items
-    'Avocado', 'Oat Milk', 'Quinoa', 'Greek Yogurt', 'Sourdough Bread', 'Almond Flour',
-    
+    *TRENDY,
+
     # Summer Seasonal
-    'Vanilla Ice Cream', 'Barbecue Sauce', 'Hot Sauce', 'Hamburger Buns', 'Watermelon', # Assuming Watermelon for summer
-    
+    *SUMMER,
+
     # Winter/Holiday Seasonal
-    'Turkey Breast', 'Cranberry Sauce', 'Cocoa Powder', 'Sweet Potato', 'Pumpkin Spice', # Adding Pumpkin Spice as a classic example
-    
+    'Turkey Breast', 'Cranberry Sauce', 'Cocoa Powder', 'Sweet Potato', 'Pumpkin Spice',
+
     # Staples (will get generic seasonality)
-    'Chicken Breasts', 'Ground Beef', 'Spinach', 'Tomatoes', 'Onion', 
-    'Garlic', 'Potatoes', 'Olive Oil', 'Ketchup', 'Mayonnaise', 
+    'Chicken Breasts', 'Ground Beef', 'Spinach', 'Tomatoes', 'Onion',
+    'Garlic', 'Potatoes', 'Olive Oil', 'Ketchup', 'Mayonnaise',
     'Spaghetti', 'Diced Tomatoes', 'Salmon', 'Butter', 'White Rice'
 ]
 
-# Create a 5-year date range (weekly)
-dates = pd.date_range(end=pd.Timestamp.today(), periods=261, freq='W-SUN') # 261 weeks = 5 years
-
-all_trends_df = pd.DataFrame()
-
-print(f"Generating trends for {len(KEYWORDS)} keywords...")
-
-for keyword in KEYWORDS:
-    # Create a base trend with some random noise
-    base_interest = np.random.rand() * 20 + 10  # Base interest between 10 and 30
-    base = np.random.rand(len(dates)) * 15 + base_interest  # Base interest with some variation
-    noise = np.random.normal(0, 3, len(dates))
-    
-    # --- Smart Seasonality & Trend Logic ---
-    day_of_year = dates.dayofyear
-    
-    if keyword in ['Avocado', 'Oat Milk', 'Quinoa', 'Greek Yogurt', 'Sourdough Bread', 'Almond Flour']:
-        # "Trendy" item: create a steady upward trend over 5 years
-        trend_line = np.linspace(0, 40, len(dates)) # Starts low, gets popular
-        seasonality = (np.sin(2 * np.pi * (day_of_year - 90) / 365.25) + 1) * 5 # Mild seasonality
-        interest = base + trend_line + seasonality + noise
-        
-    elif keyword in ['Vanilla Ice Cream', 'Barbecue Sauce', 'Hot Sauce', 'Hamburger Buns', 'Watermelon']:
-        # "Summer" item: Big spike in June-August (day 150-240)
-        seasonality = (np.sin(2 * np.pi * (day_of_year - 180) / 365.25) + 1) * 30 # Spike around day 180 (July)
-        interest = base + seasonality + noise
-
-    elif keyword in ['Turkey Breast', 'Cranberry Sauce', 'Sweet Potato', 'Pumpkin Spice']:
-        # "Holiday" item: Big spike in Oct-Dec (day 270-365)
-        seasonality = (np.sin(2 * np.pi * (day_of_year - 320) / 365.25) + 1) * 35 # Spike around day 320 (Nov)
-        interest = base + seasonality + noise
-
-    elif keyword == 'Cocoa Powder':
-        # "Winter" item: Higher in cold months
-        seasonality = (-np.sin(2 * np.pi * (day_of_year - 180) / 365.25) + 1) * 20 # Inverse of summer spike
-        interest = base + seasonality + noise
-        
-    else:
-        # "Staple" item: Generic, mild seasonality
-        seasonality = (np.sin(2 * np.pi * (day_of_year - 90) / 365.25) + 1) * 10
-        interest = base + seasonality + noise
-    
+# --- Smart Seasonality & Trend Logic ---
+# profile -> (growth over the whole range, seasonal peak day-of-year offset, amplitude, sign)
+PROFILES = {
+    "trendy": (40, 90, 5, 1),     # Steady upward trend, mild seasonality
+    "summer": (0, 180, 30, 1),    # Spike around day 180 (July)
+    "holiday": (0, 320, 35, 1),   # Spike around day 320 (Nov)
+    "winter": (0, 180, 20, -1),   # Inverse of the summer spike
+    "staple": (0, 90, 10, 1),     # Generic, mild seasonality
+}
+
+
+def keyword_profile(keyword):
+    if keyword in TRENDY: return "trendy"
+    if keyword in SUMMER: return "summer"
+    if keyword in HOLIDAY: return "holiday"
+    if keyword in WINTER: return "winter"
+    return "staple"
+
+
+def build_keywords(n, rng, profile_mix=None):
+    """The built-in keywords, padded with synthetic ones (random profile) up to `n`."""
+    keywords = KEYWORDS[:n] if n else list(KEYWORDS)
+    profiles = [keyword_profile(k) for k in keywords]
+    extra = max(0, (n or 0) - len(keywords))
+    if extra:
+        names = list(PROFILES)
+        weights = np.array([(profile_mix or {}).get(p, 1.0) for p in names], dtype=float)
+        picks = rng.choice(len(names), size=extra, p=weights / weights.sum())
+        keywords += [f"Keyword {i:05d}" for i in range(extra)]
+        profiles += [names[i] for i in picks]
+    return keywords, profiles
+
+
+def generate_interest(profiles, dates, rng):
+    """Interest (0-100) for every keyword x date, as an int16 matrix of shape (keywords, dates)."""
+    n_kw, n_d = len(profiles), len(dates)
+    growth, phase, amplitude, sign = (np.array(v, dtype=float)[:, None] for v in zip(*(PROFILES[p] for p in profiles)))
+
+    # Base interest between 10 and 30, with some variation and noise
+    base_interest = rng.random((n_kw, 1)) * 20 + 10
+    base = rng.random((n_kw, n_d)) * 15 + base_interest
+    noise = rng.normal(0, 3, (n_kw, n_d))
+
+    day_of_year = dates.dayofyear.to_numpy()[None, :]
+    trend_line = growth * np.linspace(0, 1, n_d)[None, :]
+    seasonality = (sign * np.sin(2 * np.pi * (day_of_year - phase) / 365.25) + 1) * amplitude
+
     # Combine and make sure interest is between 0 and 100
-    interest = np.clip(interest, 0, 100).astype(int)
-    
-    # Create the DataFrame
-    df = pd.DataFrame({
-        'date': dates,
-        'interest': interest,
-        'keyword': keyword
-    })
-    
-    all_trends_df = pd.concat([all_trends_df, df], ignore_index=True)
-
-# Save to the CSV file
-all_trends_df['date'] = all_trends_df['date'].dt.strftime('%Y-%m-%d') # <-- ADD THIS LINE
-all_trends_df.to_csv("google_trends_data.csv", index=False)
-
-print("\n--- Success! ---")
-print("Generated 'google_trends_data.csv' with fake, realistic data.")
-print("New keywords include trendy items (Oat Milk) and seasonal items (Turkey Breast).")
-print(all_trends_df.head())
\ No newline at end of file
+    return np.clip(base + trend_line + seasonality + noise, 0, 100).astype(np.int16)
+
+
+def iter_blocks(keywords, profiles, dates, rng, block_size):
+    """Long-format (date, interest, keyword) DataFrames, `block_size` keywords at a time."""
+    date_strings = dates.strftime('%Y-%m-%d').to_numpy()
+    for start in range(0, len(keywords), block_size):
+        block_kw = keywords[start:start + block_size]
+        interest = generate_interest(profiles[start:start + block_size], dates, rng)
+        yield pd.DataFrame({
+            'date': np.tile(date_strings, len(block_kw)),
+            'interest': interest.ravel(),
+            'keyword': np.repeat(block_kw, len(dates)),
+        })
+
+
+def write_csv(blocks, path):
+    rows = 0
+    for i, df in enumerate(blocks):
+        df.to_csv(path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+        rows += len(df)
+    return rows
+
+
+def write_parquet(blocks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows, writer = 0, None
+    try:
+        for df in blocks:
+            table = pa.Table.from_pandas(df.assign(date=pd.to_datetime(df['date']).dt.date), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def copy_to_db(blocks, replace=False):
+    """Streams blocks into trend_data with COPY, one block in memory at a time."""
+    from db import new_connection
+
+    conn = new_connection()
+    rows = 0
+    try:
+        with conn.cursor() as cur:
+            if replace:
+                cur.execute("TRUNCATE trend_data RESTART IDENTITY")
+            for df in blocks:
+                buf = StringIO()
+                df.to_csv(buf, index=False, header=False)
+                buf.seek(0)
+                cur.copy_from(buf, 'trend_data', sep=',', columns=('date', 'interest', 'keyword'))
+                rows += len(df)
+        conn.commit()
+    finally:
+        conn.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Google Trends data.")
+    parser.add_argument("--keywords", type=int, default=None,
+                        help=f"Number of keywords (default: the {len(KEYWORDS)} built-in ones; more are synthetic)")
+    parser.add_argument("--periods", type=int, default=261, help="Number of dates (default: 261 weeks = 5 years)")
+    parser.add_argument("--freq", default="W-SUN", help="Date frequency, e.g. W-SUN (weekly) or D (daily)")
+    parser.add_argument("--end", default=None, help="Last date (default: today)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--mix", default=None,
+                        help="Profile weights for synthetic keywords, e.g. staple=5,summer=1,trendy=1")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--output", default=None, help="Output file (default: google_trends_data.csv/.parquet)")
+    parser.add_argument("--to-db", action="store_true", help="COPY straight into trend_data instead of writing a file")
+    parser.add_argument("--replace", action="store_true", help="With --to-db, empty trend_data first")
+    parser.add_argument("--block-size", type=int, default=500, help="Keywords generated per block")
+    args = parser.parse_args()
+
+    print("Generating fake trend data based on robust product list...")
+
+    rng = np.random.default_rng(args.seed)
+    mix = dict((k, float(v)) for k, v in (p.split("=") for p in args.mix.split(","))) if args.mix else None
+    keywords, profiles = build_keywords(args.keywords, rng, mix)
+    dates = pd.date_range(end=pd.Timestamp(args.end) if args.end else pd.Timestamp.today(),
+                          periods=args.periods, freq=args.freq)
+
+    print(f"Generating trends for {len(keywords)} keywords x {len(dates)} dates...")
+    blocks = iter_blocks(keywords, profiles, dates, rng, args.block_size)
+
+    if args.to_db:
+        rows = copy_to_db(blocks, replace=args.replace)
+        print(f"\n--- Success! --- Copied {rows:,} rows into trend_data.")
+        return
+
+    output = args.output or ("google_trends_data.parquet" if args.format == "parquet" else "google_trends_data.csv")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    rows = write_parquet(blocks, output) if args.format == "parquet" else write_csv(blocks, output)
+
+    print("\n--- Success! ---")
+    print(f"Generated '{output}' with {rows:,} rows of fake, realistic data.")
+    print("New keywords include trendy items (Oat Milk) and seasonal items (Turkey Breast).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,19 @@
+import uuid
+
+import numpy as np
 import psycopg2
+import pandas as pd
 import streamlit as st
 
+# Fallback connection settings for a local Postgres (also used by the CLI tools)
+LOCAL_DB = {
+    "dbname": "local_lens_db",
+    "user": "postgres",
+    "password": "postgre",
+    "host": "localhost",
+    "port": "5432",
+}
+
 @st.cache_resource
 def init_connection():
     try:
@@ -19,29 +32,75 @@ def init_connection():
             )
         else:
             print("⚠️ [postgres] section NOT found. Falling back to Localhost...")
-            return psycopg2.connect(
-                dbname="local_lens_db", 
-                user="postgres", 
-                password="postgre", 
-                host="localhost", 
-                port="5432"
-            )
+            return psycopg2.connect(**LOCAL_DB)
     except Exception as e:
         print(f"DB Connection failed: {e}")
         st.error(f"DB Connection failed: {e}")
         return None
 
+def connection_params():
+    """Connection settings for extra, non-shared connections (background workers, CLI jobs)."""
+    try:
+        if "postgres" in st.secrets:
+            return {key: st.secrets["postgres"][key] for key in ("dbname", "user", "password", "host", "port")}
+    except Exception:
+        pass  # No secrets file outside `streamlit run`
+    return dict(LOCAL_DB)
+
+def new_connection():
+    """A dedicated connection (not the cached one), e.g. for a background thread."""
+    return psycopg2.connect(**connection_params())
+
 def run_query(query, params=None):
     conn = init_connection()
     if conn:
         try:
-            import pandas as pd
             return pd.read_sql(query, conn, params=params)
         except Exception as e:
             st.error(f"Query failed: {e}")
             return pd.DataFrame()
     return pd.DataFrame()
 
+def stream_query(query, params=None, fetch_size=10_000, as_records=False, dtypes=None, conn=None):
+    """
+    Streams a large result set in chunks of `fetch_size` rows.
+
+    Uses a named (server-side) cursor, so Postgres keeps the result and only
+    one chunk at a time is held client-side, unlike run_query, which
+    materialises everything. Yields DataFrames, or NumPy record arrays with
+    `as_records=True`. `dtypes` ({column: dtype}) types each chunk, e.g. to
+    turn NUMERIC columns into floats instead of Decimal objects.
+
+    Uses the shared connection unless `conn` is given. If no transaction was
+    open when streaming started, the read transaction is closed afterwards.
+    """
+    conn = conn or init_connection()
+    if conn is None:
+        return
+    was_idle = conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    cur = conn.cursor(name=f"stream_{uuid.uuid4().hex[:12]}")
+    cur.itersize = fetch_size
+    try:
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            columns = [d[0] for d in cur.description]
+            if as_records:
+                if dtypes:
+                    dtype = [(c, dtypes.get(c, object)) for c in columns]
+                    yield np.array([tuple(r) for r in rows], dtype=dtype).view(np.recarray)
+                else:
+                    yield np.rec.fromrecords(rows, names=columns)
+            else:
+                df = pd.DataFrame.from_records(rows, columns=columns)
+                yield df.astype(dtypes) if dtypes else df
+    finally:
+        cur.close()
+        if was_idle:
+            conn.rollback()
+
 def run_transaction(query, params):
     conn = init_connection()
     if conn:
@@ -57,10 +116,159 @@ def run_transaction(query, params):
     return False
 
 # --- Data Loaders ---
+# Also run by scheduler.py, which publishes the results as the "static" artifact
+PRODUCT_LIST_SQL = "SELECT product_id, name, category, barcode FROM products WHERE active ORDER BY name"
+CATEGORY_LIST_SQL = "SELECT DISTINCT category FROM products WHERE category IS NOT NULL ORDER BY category"
+
+def read_static_data(conn):
+    """Products, stores, the product -> trend keyword map, the active product list and categories."""
+    products = pd.read_sql("SELECT product_id, name FROM products ORDER BY name", conn)
+    stores = pd.read_sql("SELECT store_id, name FROM stores ORDER BY name", conn)
+    trends = pd.read_sql("SELECT product_id, keyword FROM product_trend_mapping", conn)
+    return {
+        "products": products,
+        "stores": stores,
+        "trend_map": dict(zip(trends['product_id'], trends['keyword'])),
+        "product_list": pd.read_sql(PRODUCT_LIST_SQL, conn),
+        "categories": pd.read_sql(CATEGORY_LIST_SQL, conn)['category'].tolist(),
+    }
+
+def published_static(key):
+    """`key` from the scheduler's "static" artifact, or None if it hasn't been published."""
+    from artifacts import latest_artifact
+    static = latest_artifact("static")
+    return static[key] if static else None
+
 @st.cache_data(ttl=60)
 def get_product_list():
-    return run_query("SELECT product_id, name, category FROM products ORDER BY name")
+    published = published_static("product_list")
+    if published is not None:
+        return published
+    return run_query(PRODUCT_LIST_SQL)
 
 @st.cache_data(ttl=60)
 def get_store_list():
-    return run_query("SELECT store_id, name FROM stores ORDER BY name")
\ No newline at end of file
+    return run_query("SELECT store_id, name FROM stores ORDER BY name")
+
+@st.cache_data(ttl=600)
+def get_category_list():
+    """Distinct product categories (cached, so the filter never scans inventory)."""
+    published = published_static("categories")
+    if published is not None:
+        return published
+    df = run_query(CATEGORY_LIST_SQL)
+    return df['category'].tolist() if not df.empty else []
+
+# Sort options for the Stock Room: label -> (column, direction)
+STOCK_SORTS = {
+    "Qty (Low → High)": ("i.stock_quantity", "ASC"),
+    "Qty (High → Low)": ("i.stock_quantity", "DESC"),
+    "Product (A → Z)": ("p.name", "ASC"),
+}
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_stock_page(store_id, category=None, search=None, sort="Qty (Low → High)", after=None, page_size=50):
+    """
+    One page of a store's stock, filtered and sorted in SQL.
+
+    Uses keyset pagination: `after` is the (sort value, product_id) of the
+    last row of the previous page, so every page is an index range scan no
+    matter how deep into the catalogue you are. Returns (df, next_cursor);
+    next_cursor is None on the last page.
+    """
+    sort_col, direction = STOCK_SORTS[sort]
+    op = ">" if direction == "ASC" else "<"
+
+    where = ["i.store_id = %(sid)s"]
+    params = {"sid": store_id, "limit": page_size + 1}
+    if category:
+        where.append("p.category = %(category)s")
+        params["category"] = category
+    if search:
+        where.append("p.name ILIKE %(search)s")
+        params["search"] = f"%{search}%"
+    if after is not None:
+        where.append(f"({sort_col}, i.product_id) {op} (%(after_val)s, %(after_id)s)")
+        params["after_val"], params["after_id"] = after
+
+    query = f"""
+        SELECT i.product_id, p.name as "Product", p.category as "Category", i.stock_quantity as "Qty", i.price as "Price",
+               {sort_col} as sort_key
+        FROM inventory i
+        JOIN products p ON i.product_id = p.product_id
+        WHERE {' AND '.join(where)}
+        ORDER BY {sort_col} {direction}, i.product_id {direction}
+        LIMIT %(limit)s
+    """
+    df = run_query(query, params)
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        sort_val = df.iloc[-1]['sort_key']
+        if hasattr(sort_val, 'item'):
+            sort_val = sort_val.item()  # numpy scalar -> plain Python for psycopg2
+        next_cursor = (sort_val, int(df.iloc[-1]['product_id']))
+    return df.drop(columns=['sort_key'], errors='ignore'), next_cursor
+
+def receive_shipment(store_id, manifest):
+    """
+    Applies a whole delivery manifest in one round trip and one transaction.
+
+    `manifest` is a DataFrame with product_id, quantity and an optional price
+    column (used only for products this store has never stocked; otherwise
+    the average price across stores is used). Product ids are validated
+    against the catalogue in the same statement; unknown ids are skipped and
+    reported. Returns a summary dict, or None if the transaction failed.
+    """
+    if 'price' not in manifest.columns:
+        manifest = manifest.assign(price=float('nan'))
+    # One row per product (a product may appear on several manifest lines)
+    lines = manifest.groupby('product_id', as_index=False).agg(quantity=('quantity', 'sum'), price=('price', 'max'))
+    query = """
+        WITH manifest AS (
+            SELECT * FROM unnest(%(pids)s::int[], %(qtys)s::int[], %(prices)s::numeric[]) AS m(product_id, qty, price)
+        ),
+        valid AS (
+            SELECT m.* FROM manifest m JOIN products p ON p.product_id = m.product_id
+        ),
+        applied AS (
+            INSERT INTO inventory (store_id, product_id, stock_quantity, price)
+            SELECT %(sid)s, v.product_id, v.qty,
+                   COALESCE(v.price, (SELECT AVG(x.price) FROM inventory x WHERE x.product_id = v.product_id), 0)
+            FROM valid v
+            ON CONFLICT (store_id, product_id)
+                DO UPDATE SET stock_quantity = inventory.stock_quantity + EXCLUDED.stock_quantity
+            RETURNING product_id, (xmax = 0) AS inserted
+        )
+        SELECT m.product_id, m.qty, a.product_id IS NOT NULL AS applied, COALESCE(a.inserted, FALSE) AS inserted
+        FROM manifest m LEFT JOIN applied a ON a.product_id = m.product_id
+    """
+    params = {
+        "sid": store_id,
+        "pids": [int(x) for x in lines['product_id']],
+        "qtys": [int(x) for x in lines['quantity']],
+        "prices": [None if pd.isna(x) else float(x) for x in lines['price']],
+    }
+
+    conn = init_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        st.error(f"Transaction failed: {e}")
+        return None
+
+    applied = [r for r in rows if r[2]]
+    return {
+        "lines": len(manifest),
+        "products": len(applied),
+        "units": sum(r[1] for r in applied),
+        "updated": sum(1 for r in applied if not r[3]),
+        "created": sum(1 for r in applied if r[3]),
+        "unknown_ids": sorted(r[0] for r in rows if not r[2]),
+    }
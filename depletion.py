@@ -0,0 +1,65 @@
+"""
+Store-wide stock depletion simulator.
+
+Takes the 14-day demand forecast for every product at once (a products x days
+matrix) together with the stock and price vectors, and works out the
+burn-down for the whole catalogue in a single NumPy pass: stockout day,
+days of cover, projected revenue and revenue lost to stockouts.
+"""
+import numpy as np
+import pandas as pd
+
+
+def simulate_depletion(product_ids, daily_demand, stock, price, start_date=None):
+    """Runs the burn-down for all products. Returns one row per product."""
+    daily_demand = np.clip(np.asarray(daily_demand, dtype=float), 0, None)
+    stock = np.asarray(stock, dtype=float)
+    price = np.asarray(price, dtype=float)
+    n_products, horizon = daily_demand.shape
+
+    cumulative = np.cumsum(daily_demand, axis=1)
+    projected = stock[:, None] - cumulative  # stock left at the end of each day
+
+    # First day on which projected stock goes negative (horizon if never)
+    runs_out = projected < 0
+    has_stockout = runs_out.any(axis=1)
+    stockout_day = np.where(has_stockout, runs_out.argmax(axis=1), horizon)
+
+    # Days of cover: full days covered + the fraction of the stockout day's demand still on the shelf
+    rows = np.arange(n_products)
+    day_idx = np.minimum(stockout_day, horizon - 1)
+    sold_before = np.where(stockout_day > 0, cumulative[rows, day_idx - 1], 0)
+    demand_on_day = daily_demand[rows, day_idx]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        partial = np.where(demand_on_day > 0, (stock - sold_before) / demand_on_day, 0)
+    days_of_cover = np.where(has_stockout, stockout_day + np.clip(partial, 0, 1), horizon)
+
+    total_demand = cumulative[:, -1]
+    units_sold = np.minimum(total_demand, np.maximum(stock, 0))
+
+    if start_date is None:
+        start_date = pd.Timestamp.now().normalize()
+    stockout_date = pd.Timestamp(start_date) + pd.to_timedelta(stockout_day, unit='D')
+
+    return pd.DataFrame({
+        "product_id": product_ids,
+        "current_stock": stock,
+        "forecasted_demand": total_demand,
+        "days_of_cover": np.round(days_of_cover, 1),
+        "stockout_date": pd.Series(stockout_date).where(has_stockout),
+        "status": np.where(has_stockout, "CRITICAL", "HEALTHY"),
+        "projected_revenue": total_demand * price,
+        "revenue_at_risk": (total_demand - units_sold) * price,
+        "end_stock": projected[:, -1],
+    })
+
+
+def query_depletion(df, status=None, max_days_of_cover=None, sort_by="days_of_cover", ascending=True, limit=None):
+    """Filters and sorts a depletion table (e.g. 'critical items running out within 3 days')."""
+    mask = np.ones(len(df), dtype=bool)
+    if status:
+        mask &= (df['status'] == status).to_numpy()
+    if max_days_of_cover is not None:
+        mask &= (df['days_of_cover'] <= max_days_of_cover).to_numpy()
+    result = df[mask].sort_values(sort_by, ascending=ascending, kind='stable')
+    return result.head(limit) if limit else result
@@ -0,0 +1,262 @@
+"""
+Forecast history and forecast-vs-actual tracking.
+
+Every forecast run is recorded in `forecast_history`: one row per
+(run date, product, store, horizon day) holding yhat and its band. Store 0
+is the chain-wide forecast; real stores get the same per-store share the
+app shows (forecast / STORE_DIVIDER). The table is range-partitioned by month of run
+date, so retention is a DROP of whole partitions rather than a big DELETE.
+
+Runs are written in bulk: COPY into a temporary staging table, then one
+INSERT ... ON CONFLICT, so recording a day twice just replaces it. Once a
+forecast's target date is complete in sales_history, fill_actuals() stores
+the actual units sold on the row itself. The forecast_accuracy view and
+error_trend() then read error trends straight off this table, without
+aggregating sales_history or running any model.
+
+Usage:
+    python forecast_history.py                 # fill actuals + prune (also run by scheduler.py)
+    python forecast_history.py --record        # record the currently published forecasts
+    python forecast_history.py --report        # products with the worst recent error
+"""
+import argparse
+from datetime import date
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+from forecasting import STORE_DIVIDER, forecast_matrix
+
+CHAIN_STORE_ID = 0
+DEFAULT_KEEP_DAYS = 365
+
+FORECAST_HISTORY_DDL = """
+    CREATE TABLE IF NOT EXISTS forecast_history (
+        run_date DATE NOT NULL,
+        product_id INTEGER NOT NULL,
+        store_id SMALLINT NOT NULL,
+        horizon SMALLINT NOT NULL,
+        target_date DATE NOT NULL,
+        yhat REAL NOT NULL,
+        yhat_lower REAL,
+        yhat_upper REAL,
+        actual REAL,
+        PRIMARY KEY (run_date, product_id, store_id, horizon)
+    ) PARTITION BY RANGE (run_date);
+    CREATE INDEX IF NOT EXISTS idx_forecast_history_product ON forecast_history (product_id, store_id, target_date);
+    CREATE INDEX IF NOT EXISTS idx_forecast_history_pending ON forecast_history (target_date) WHERE actual IS NULL;
+
+    CREATE OR REPLACE VIEW forecast_accuracy AS
+    SELECT run_date, product_id, store_id, horizon, target_date, yhat, yhat_lower, yhat_upper, actual,
+           yhat - actual AS error,
+           ABS(yhat - actual) AS abs_error,
+           CASE WHEN actual > 0 THEN ABS(yhat - actual) / actual END AS ape,
+           actual BETWEEN yhat_lower AND yhat_upper AS in_band
+    FROM forecast_history
+    WHERE actual IS NOT NULL;
+"""
+
+COLUMNS = ["run_date", "product_id", "store_id", "horizon", "target_date", "yhat", "yhat_lower", "yhat_upper"]
+
+
+def ensure_schema(conn):
+    with conn.cursor() as cur:
+        cur.execute(FORECAST_HISTORY_DDL)
+    conn.commit()
+
+
+def _partition_name(month_start):
+    return f"forecast_history_{month_start:%Y_%m}"
+
+
+def ensure_partitions(cur, run_dates):
+    """Creates the monthly partition for every month in `run_dates` (no-op if it exists)."""
+    for month_start in sorted({pd.Timestamp(d).to_period("M").start_time.date() for d in run_dates}):
+        next_month = (pd.Timestamp(month_start) + pd.offsets.MonthBegin(1)).date()
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {_partition_name(month_start)} PARTITION OF forecast_history
+            FOR VALUES FROM ('{month_start}') TO ('{next_month}')
+        """)
+
+
+def forecast_rows(forecasts, store_ids, run_date=None, horizon=14):
+    """Long-format rows for one run: the chain-wide forecast plus each store's share, built from matrices."""
+    run_date = run_date or date.today()
+    pids, yhat, dates = forecast_matrix(forecasts, 'yhat', horizon)
+    if len(pids) == 0:
+        return pd.DataFrame(columns=COLUMNS)
+    _, lower, _ = forecast_matrix(forecasts, 'yhat_lower', horizon)
+    _, upper, _ = forecast_matrix(forecasts, 'yhat_upper', horizon)
+
+    n_products, n_days = yhat.shape
+    store_ids = [CHAIN_STORE_ID] + list(store_ids)
+    scale = np.array([1.0] + [1.0 / STORE_DIVIDER] * (len(store_ids) - 1))
+    n = len(store_ids) * n_products * n_days
+    # Layout: store-major, then product, then horizon day
+    return pd.DataFrame({
+        "run_date": run_date,
+        "product_id": np.tile(np.repeat(pids, n_days), len(store_ids)),
+        "store_id": np.repeat(store_ids, n_products * n_days),
+        "horizon": np.tile(np.arange(1, n_days + 1), len(store_ids) * n_products),
+        "target_date": np.tile(dates.date, len(store_ids) * n_products),
+        "yhat": (yhat.ravel()[None, :] * scale[:, None]).ravel(),
+        "yhat_lower": (lower.ravel()[None, :] * scale[:, None]).ravel(),
+        "yhat_upper": (upper.ravel()[None, :] * scale[:, None]).ravel(),
+    }, index=pd.RangeIndex(n))[COLUMNS]
+
+
+def record_run(conn, forecasts, store_ids, run_date=None):
+    """Writes one forecast run with COPY + upsert (re-recording a run date replaces it). Returns rows written."""
+    rows = forecast_rows(forecasts, store_ids, run_date)
+    if rows.empty:
+        return 0
+    buf = StringIO()
+    rows.to_csv(buf, index=False, header=False, float_format="%.3f")
+    buf.seek(0)
+
+    with conn.cursor() as cur:
+        cur.execute(FORECAST_HISTORY_DDL)
+        ensure_partitions(cur, rows["run_date"].unique())
+        cur.execute("""
+            CREATE TEMP TABLE forecast_stage (LIKE forecast_history INCLUDING DEFAULTS) ON COMMIT DROP
+        """)
+        cur.copy_expert(f"COPY forecast_stage ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+        cur.execute(f"""
+            INSERT INTO forecast_history ({', '.join(COLUMNS)})
+            SELECT {', '.join(COLUMNS)} FROM forecast_stage
+            ON CONFLICT (run_date, product_id, store_id, horizon) DO UPDATE
+                SET target_date = EXCLUDED.target_date, yhat = EXCLUDED.yhat,
+                    yhat_lower = EXCLUDED.yhat_lower, yhat_upper = EXCLUDED.yhat_upper, actual = NULL
+        """)
+    conn.commit()
+    return len(rows)
+
+
+def fill_actuals(conn):
+    """
+    Stores actual units sold on forecast rows whose target date is complete.
+
+    A day counts as complete once sales_history has a later day, so the
+    latest (possibly still filling) day is left for the next call. Only the
+    date range of the pending rows is aggregated. Returns rows filled.
+    """
+    with conn.cursor() as cur:
+        cur.execute(FORECAST_HISTORY_DDL)
+        cur.execute("""
+            WITH bounds AS (
+                SELECT MIN(target_date) AS lo,
+                       LEAST(MAX(target_date), (SELECT MAX(sale_date) FROM sales_history) - 1) AS hi
+                FROM forecast_history WHERE actual IS NULL
+            ),
+            sold AS (
+                -- Per store, plus the chain-wide total (store_id NULL in the second grouping set)
+                SELECT s.product_id, s.sale_date, COALESCE(s.store_id, %(chain)s) AS store_id,
+                       SUM(s.quantity_sold) AS qty
+                FROM sales_history s, bounds b
+                WHERE s.sale_date BETWEEN b.lo AND b.hi
+                GROUP BY GROUPING SETS ((s.product_id, s.sale_date, s.store_id), (s.product_id, s.sale_date))
+            )
+            UPDATE forecast_history f
+            SET actual = sold.qty
+            FROM sold
+            WHERE f.actual IS NULL AND f.product_id = sold.product_id
+              AND f.target_date = sold.sale_date AND f.store_id = sold.store_id
+        """, {"chain": CHAIN_STORE_ID})
+        filled = cur.rowcount
+        # Nothing sold that day (no sales_history rows at all): the actual is zero
+        cur.execute("""
+            UPDATE forecast_history f
+            SET actual = 0
+            WHERE f.actual IS NULL AND f.target_date < (SELECT MAX(sale_date) FROM sales_history)
+        """)
+        filled += cur.rowcount
+    conn.commit()
+    return filled
+
+
+def prune(conn, keep_days=DEFAULT_KEEP_DAYS):
+    """Drops monthly partitions entirely older than `keep_days`, then trims the boundary one. Returns (dropped, deleted)."""
+    cutoff = date.today() - pd.Timedelta(days=keep_days)
+    dropped = []
+    with conn.cursor() as cur:
+        cur.execute(FORECAST_HISTORY_DDL)
+        cur.execute("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'forecast_history'::regclass
+        """)
+        for (name,) in cur.fetchall():
+            month_start = pd.Timestamp(name.replace("forecast_history_", "").replace("_", "-") + "-01")
+            if (month_start + pd.offsets.MonthBegin(1)).date() <= cutoff:
+                cur.execute(f"DROP TABLE {name}")
+                dropped.append(name)
+        cur.execute("DELETE FROM forecast_history WHERE run_date < %s", (cutoff,))
+        deleted = cur.rowcount
+    conn.commit()
+    return dropped, deleted
+
+
+# --- Queries ---
+TREND_GROUPS = {"run_date": "run_date", "target_date": "target_date", "horizon": "horizon"}
+
+
+def error_trend(conn, product_id, store_id=CHAIN_STORE_ID, by="target_date", days=90):
+    """MAE, MAPE, bias and band coverage for one product/store over runs from the last `days` days,
+    grouped `by` run_date, target_date or horizon."""
+    group = TREND_GROUPS[by]
+    return pd.read_sql(f"""
+        SELECT {group}, COUNT(*) AS n, AVG(actual) AS actual, AVG(yhat) AS forecast,
+               AVG(abs_error) AS mae, AVG(ape) AS mape, AVG(error) AS bias,
+               AVG(in_band::int) AS coverage
+        FROM forecast_accuracy
+        WHERE product_id = %(pid)s AND store_id = %(sid)s AND run_date >= CURRENT_DATE - %(days)s * INTERVAL '1 day'
+        GROUP BY {group} ORDER BY {group}
+    """, conn, params={"pid": int(product_id), "sid": int(store_id), "days": int(days)})
+
+
+def worst_products(conn, store_id=CHAIN_STORE_ID, days=30, limit=20):
+    """Products with the highest MAPE (on days with sales) over runs from the last `days` days."""
+    return pd.read_sql("""
+        SELECT a.product_id, p.name, COUNT(*) AS n, AVG(a.ape) AS mape, AVG(a.error) AS bias, AVG(a.abs_error) AS mae
+        FROM forecast_accuracy a JOIN products p USING (product_id)
+        WHERE a.store_id = %(sid)s AND a.ape IS NOT NULL AND a.run_date >= CURRENT_DATE - %(days)s * INTERVAL '1 day'
+        GROUP BY a.product_id, p.name ORDER BY mape DESC LIMIT %(limit)s
+    """, conn, params={"sid": int(store_id), "days": int(days), "limit": int(limit)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record forecasts, fill in actuals and prune old forecast history.")
+    parser.add_argument("--record", action="store_true", help="Record the forecasts currently published by scheduler.py")
+    parser.add_argument("--keep-days", type=int, default=DEFAULT_KEEP_DAYS)
+    parser.add_argument("--report", action="store_true", help="Print the products with the worst recent error")
+    args = parser.parse_args()
+
+    from artifacts import read_artifact
+    from db import new_connection
+
+    conn = new_connection()
+    try:
+        ensure_schema(conn)
+        if args.record:
+            published = read_artifact("forecasts")
+            if published is None:
+                print("No published forecasts. Run `python scheduler.py --once forecasts` first.")
+            else:
+                stores = pd.read_sql("SELECT store_id FROM stores", conn)['store_id'].tolist()
+                rows = record_run(conn, published["forecasts"], stores, published["published_at"].date())
+                print(f"Recorded {rows:,} forecast rows for {published['published_at']:%Y-%m-%d}.")
+
+        filled = fill_actuals(conn)
+        dropped, deleted = prune(conn, args.keep_days)
+        print(f"Filled {filled:,} actuals; pruned {len(dropped)} partition(s) and {deleted:,} rows "
+              f"older than {args.keep_days} days.")
+
+        if args.report:
+            print(worst_products(conn).to_string(index=False))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+# NOTE: Prophet is imported lazily inside load_prophet_model(). It pulls in
+# cmdstanpy/plotly and takes seconds to import, which every page paid on
+# startup even when the forecasts were already cached.
+
+@st.cache_resource(show_spinner=False)
+def load_prophet_model(product_id):
+    try:
+        from prophet.serialize import model_from_json
+        # --- UPDATE: Look in the 'models/' folder ---
+        with open(f"models/demand_model_product_{product_id}.json", 'r') as f:
+            return model_from_json(f.read())
+    except:
+        return None
+
+def generate_future_trend(future_dates, keyword):
+    # (Simplified seasonality logic)
+    day_of_year = future_dates['ds'].dt.dayofyear
+    base = 20
+    noise = np.random.normal(0, 3, len(future_dates))
+    seasonality = (np.sin(2 * np.pi * (day_of_year - 90) / 365.25) + 1) * 10
+    if keyword in ['Turkey Breast', 'Cranberry Sauce', 'Ground Turkey']:
+        seasonality = (np.sin(2 * np.pi * (day_of_year - 320) / 365.25) + 1) * 35 
+    return np.clip(base + seasonality + noise, 0, 100).astype(int)
+
+# Models forecast chain-wide demand; one store's share of it is the forecast divided by this
+STORE_DIVIDER = 5
+
+# Columns the pages use from a Prophet forecast ('interest' only exists for trend-linked products)
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'interest']
+
+def forecast_all_products(product_list, trend_map, horizon=14):
+    """{product_id: forecast} for every product with a saved model, trimmed to the future `horizon` days."""
+    forecast_cache = {}
+    for pid in product_list['product_id']:
+        model = load_prophet_model(pid)
+        if not model: continue
+
+        future = model.make_future_dataframe(periods=horizon, freq='D').iloc[-horizon:].copy()
+        future['on_sale'] = 0
+        if pid in trend_map:
+            future['interest'] = generate_future_trend(future, trend_map[pid])
+
+        forecast = model.predict(future)
+        forecast_cache[pid] = forecast[[c for c in FORECAST_COLUMNS if c in forecast.columns]].reset_index(drop=True)
+    return forecast_cache
+
+def triage_from_forecasts(product_list, forecast_cache, stock_map, store_id, horizon=14):
+    """Per-product 14-day demand vs. stock for one store (cheap: no model is run)."""
+    names = dict(zip(product_list['product_id'], product_list['name']))
+    triage_results = []
+    for pid, forecast in forecast_cache.items():
+        if pid not in names: continue
+        raw_demand = int(forecast['yhat'].iloc[-horizon:].sum())
+        final_demand = raw_demand if store_id == "ALL_STORES" else int(raw_demand / STORE_DIVIDER)
+        stock = stock_map.get(pid, 0)
+
+        triage_results.append({
+            "product_id": pid,
+            "product_name": names[pid],
+            "current_stock": stock,
+            "forecasted_demand": final_demand,
+            "shortfall": max(0, final_demand - stock)
+        })
+    return pd.DataFrame(triage_results)
+
+@st.cache_data(show_spinner=False)
+def run_all_forecasts(_product_list, _trend_map, _stock_map, store_id):
+    """Runs forecasts and returns results AND the cache (fallback when no published forecasts exist)."""
+    forecast_cache = forecast_all_products(_product_list, _trend_map)
+    return triage_from_forecasts(_product_list, forecast_cache, _stock_map, store_id), forecast_cache
+
+def load_published_forecasts():
+    """Forecasts published by the scheduler: (forecast_cache, published_at), or (None, None)."""
+    from artifacts import latest_artifact
+    published = latest_artifact("forecasts")
+    if not published:
+        return None, None
+    return published["forecasts"], published["published_at"]
+
+def forecast_matrix(forecast_cache, column='yhat', horizon=14):
+    """Stacks the last `horizon` days of every cached forecast into a (products x days) array."""
+    product_ids = np.array(list(forecast_cache.keys()))
+    if len(product_ids) == 0:
+        return product_ids, np.empty((0, horizon)), pd.DatetimeIndex([])
+    matrix = np.vstack([fc[column].to_numpy()[-horizon:] for fc in forecast_cache.values()])
+    dates = pd.DatetimeIndex(next(iter(forecast_cache.values()))['ds'].iloc[-horizon:])
+    return product_ids, matrix, dates
@@ -0,0 +1,203 @@
+"""
+Precomputed Business Health payloads.
+
+For every product x scope (each store, plus "ALL_STORES") this builds what
+the Business Health product view shows: the KPI row (price, stock, 14-day
+demand, projected revenue, stockout day, status, demand change), the 14-day
+burn-down, the weekday profile and the last 30 days of sales history. Everything is
+computed at once on (scope, product, day) arrays from three bulk inputs
+(published forecasts, the inventory table, one windowed history query) and
+published as the "health" artifact, so a product switch on the page is a
+dictionary lookup plus array slicing.
+
+Dates are stored relative to the build day, because the page shows the
+forecast starting today and the history ending yesterday. A payload built
+on an earlier day only needs its weekday profile rotated (see payload_for).
+
+Usage:
+    python health_payloads.py        # build and publish (also run by scheduler.py)
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecasting import STORE_DIVIDER, forecast_matrix
+
+ALL_STORES = "ALL_STORES"
+HORIZON = 14
+HISTORY_DAYS = 30
+HISTORY_LOOKBACK_DAYS = 120  # history older than this (before the latest sale) is not shown
+DAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+INVENTORY_SQL = "SELECT product_id, store_id, price, stock_quantity AS stock FROM inventory {where}"
+
+# Last 30 sale days per (product, store) and per product chain-wide (store_id 0), in one pass
+HISTORY_SQL = """
+    WITH daily AS (
+        SELECT product_id, CASE WHEN GROUPING(store_id) = 1 THEN 0 ELSE store_id END AS store_id,
+               sale_date, SUM(quantity_sold) AS qty
+        FROM sales_history
+        WHERE sale_date > (SELECT MAX(sale_date) FROM sales_history) - %(lookback)s {and_where}
+        GROUP BY GROUPING SETS ((product_id, store_id, sale_date), (product_id, sale_date))
+    ),
+    ranked AS (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY product_id, store_id ORDER BY sale_date DESC) AS rn
+        FROM daily
+    )
+    SELECT product_id, store_id, sale_date, qty, rn FROM ranked WHERE rn <= %(days)s
+"""
+
+
+def load_inputs(conn, product_ids=None):
+    """(inventory rows, ranked history rows, store ids), optionally for a few products only."""
+    params = {"lookback": HISTORY_LOOKBACK_DAYS, "days": HISTORY_DAYS}
+    where, and_where = "", ""
+    if product_ids is not None:
+        params["pids"] = [int(p) for p in product_ids]
+        where, and_where = "WHERE product_id = ANY(%(pids)s)", "AND product_id = ANY(%(pids)s)"
+    inventory = pd.read_sql(INVENTORY_SQL.format(where=where), conn, params=params)
+    history = pd.read_sql(HISTORY_SQL.format(and_where=and_where), conn, params=params)
+    store_ids = pd.read_sql("SELECT store_id FROM stores ORDER BY store_id", conn)['store_id'].tolist()
+    return inventory, history, store_ids
+
+
+def build_payloads(forecasts, inventory, history, store_ids, as_of=None):
+    """Arrays indexed [scope, product(, day)]: scope 0 is ALL_STORES, then `store_ids` in order."""
+    as_of = pd.Timestamp(as_of or pd.Timestamp.now()).normalize()
+    pids, yhat, _ = forecast_matrix(forecasts, 'yhat', HORIZON)
+    scopes = [ALL_STORES] + list(store_ids)
+    n_scopes, n_products = len(scopes), len(pids)
+    p_index = {pid: i for i, pid in enumerate(pids)}
+    s_index = {sid: i + 1 for i, sid in enumerate(store_ids)}
+
+    # Price & stock: store rows as they are, ALL_STORES = average price / total stock
+    price = np.zeros((n_scopes, n_products), dtype=np.float32)
+    stock = np.zeros((n_scopes, n_products), dtype=np.int64)
+    inv = inventory[inventory['product_id'].isin(p_index) & inventory['store_id'].isin(s_index)].astype({'price': float})
+    if not inv.empty:
+        p_idx = inv['product_id'].map(p_index).to_numpy()
+        s_idx = inv['store_id'].map(s_index).to_numpy()
+        price[s_idx, p_idx] = inv['price'].fillna(0).to_numpy()
+        stock[s_idx, p_idx] = inv['stock'].fillna(0).to_numpy()
+        chain = inv.groupby('product_id').agg(price=('price', 'mean'), stock=('stock', 'sum'))
+        chain_idx = chain.index.map(p_index).to_numpy()
+        price[0, chain_idx] = chain['price'].fillna(0).to_numpy()
+        stock[0, chain_idx] = chain['stock'].fillna(0).to_numpy()
+
+    # Burn-down: per-scope daily sales (whole units), cumulative, and remaining stock
+    divider = np.array([1.0] + [STORE_DIVIDER] * len(store_ids))[:, None, None]
+    daily = (yhat[None, :, :] / divider).astype(np.int64)
+    projected = stock[:, :, None] - daily.cumsum(axis=2)
+    below = projected < 0
+    stockout = np.where(below.any(axis=2), below.argmax(axis=2), -1)
+    # Same as the page's "(stockout date - now).days": the first day out of stock counts from tomorrow
+    days_left = np.where(stockout >= 0, np.maximum(stockout - 1, 0), HORIZON)
+
+    start, end = daily[:, :, 0], daily[:, :, -1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_change = np.where(start > 0, (end - start) / start * 100, 0.0)
+
+    # Weekday profile: day i of the forecast falls on weekday (as_of.weekday() + i) % 7
+    weekdays = (as_of.weekday() + np.arange(HORIZON)) % 7
+    onehot = np.eye(7)[weekdays]
+    profile = (daily @ onehot) / np.maximum(onehot.sum(axis=0), 1)
+
+    # History: newest first, padded to HISTORY_DAYS; days_ago counts back from each series' latest day
+    hist_qty = np.zeros((n_scopes, n_products, HISTORY_DAYS), dtype=np.int32)
+    hist_days_ago = np.zeros((n_scopes, n_products, HISTORY_DAYS), dtype=np.int16)
+    hist_len = np.zeros((n_scopes, n_products), dtype=np.int16)
+    hist = history[history['product_id'].isin(p_index) & history['store_id'].isin([0, *s_index])]
+    if not hist.empty:
+        dates = pd.to_datetime(hist['sale_date'])
+        latest = dates.groupby([hist['product_id'], hist['store_id']]).transform('max')
+        p_idx = hist['product_id'].map(p_index).to_numpy()
+        s_idx = hist['store_id'].map(lambda s: 0 if s == 0 else s_index[s]).to_numpy()
+        slot = hist['rn'].to_numpy() - 1
+        hist_qty[s_idx, p_idx, slot] = hist['qty'].to_numpy()
+        hist_days_ago[s_idx, p_idx, slot] = (latest - dates).dt.days.to_numpy()
+        np.maximum.at(hist_len, (s_idx, p_idx), slot + 1)
+
+    has_trend = np.array(['interest' in forecasts[pid].columns for pid in pids], dtype=bool)
+    total_demand = daily.sum(axis=2)
+    return {
+        "as_of": as_of,
+        "product_index": p_index,
+        "scope_index": {ALL_STORES: 0, **s_index},
+        "price": price,
+        "stock": stock,
+        "daily_sales": daily,
+        "projected_stock": projected,
+        "stockout_idx": stockout,
+        "days_until_stockout": days_left,
+        "total_demand": total_demand,
+        "projected_revenue": total_demand * price,
+        "pct_change": pct_change.astype(np.float32),
+        "weekday_profile": profile.astype(np.float32),
+        "has_trend": has_trend,
+        "history_qty": hist_qty,
+        "history_days_ago": hist_days_ago,
+        "history_len": hist_len,
+    }
+
+
+def payload_for(payloads, product_id, store_id, today=None):
+    """One product x scope as plain values/arrays (history in date order), or None if it isn't there."""
+    p = payloads["product_index"].get(product_id)
+    s = payloads["scope_index"].get(store_id)
+    if p is None or s is None:
+        return None
+    today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+    n_hist = int(payloads["history_len"][s, p])
+    return {
+        "price": float(payloads["price"][s, p]),
+        "stock": int(payloads["stock"][s, p]),
+        "daily_sales": payloads["daily_sales"][s, p],
+        "projected_stock": payloads["projected_stock"][s, p],
+        "stockout_idx": int(payloads["stockout_idx"][s, p]),
+        "days_until_stockout": int(payloads["days_until_stockout"][s, p]),
+        "status": "CRITICAL" if payloads["stockout_idx"][s, p] >= 0 else "HEALTHY",
+        "total_demand": int(payloads["total_demand"][s, p]),
+        "projected_revenue": float(payloads["projected_revenue"][s, p]),
+        "pct_change": float(payloads["pct_change"][s, p]),
+        "has_trend": bool(payloads["has_trend"][p]),
+        # Built on an earlier day: the forecast days now fall on later weekdays
+        "weekday_profile": np.roll(payloads["weekday_profile"][s, p], (today - payloads["as_of"]).days),
+        "history_qty": payloads["history_qty"][s, p, :n_hist][::-1],
+        "history_days_ago": payloads["history_days_ago"][s, p, :n_hist][::-1],
+    }
+
+
+def build_and_publish(conn, forecasts):
+    from artifacts import publish
+    inventory, history, store_ids = load_inputs(conn)
+    conn.rollback()
+    payloads = build_payloads(forecasts, inventory, history, store_ids)
+    publish("health", payloads)
+    return len(payloads["product_index"]), len(payloads["scope_index"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and publish the Business Health payloads.")
+    parser.parse_args()
+
+    from artifacts import read_artifact
+    from db import new_connection
+
+    published = read_artifact("forecasts")
+    if published is None:
+        print("No published forecasts. Run `python scheduler.py --once forecasts` first.")
+        return
+    conn = new_connection()
+    try:
+        start = time.perf_counter()
+        products, scopes = build_and_publish(conn, published["forecasts"])
+        print(f"Published payloads for {products:,} products x {scopes} scopes "
+              f"in {time.perf_counter() - start:.2f}s.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
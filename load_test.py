@@ -0,0 +1,326 @@
+"""
+Load generator for LocalLens.
+
+Simulates a crowd of cashiers and managers hitting the same data paths the
+Streamlit pages use (register checkouts, stock receipts, recipe lookups and
+dashboard forecast refreshes) and reports throughput, p50/p99 latency and
+how often sessions were stuck waiting on row locks.
+
+Usage:
+    python load_test.py --users 50 --duration 60
+    python load_test.py --users 50 --duration 60 --mode processes --rollback
+"""
+import argparse
+import multiprocessing
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import psycopg2
+import psycopg2.extras
+
+from db import LOCAL_DB
+from stock_reservation import reserve_stock
+
+# Share of each action in the simulated crowd (roughly: many tills, a few managers)
+DEFAULT_MIX = {
+    "checkout": 0.55,
+    "receipt": 0.10,
+    "recipe_lookup": 0.20,
+    "forecast_refresh": 0.15,
+}
+
+# Ingredient names a shopper might paste into the Recipe Finder
+RECIPE_INGREDIENTS = [
+    "ground beef", "mozzarella cheese", "tomato sauce", "onion", "garlic",
+    "olive oil", "butter", "eggs", "milk", "sugar", "flour", "chicken breasts",
+    "spinach", "white rice", "cream cheese", "salt", "black pepper", "parmesan cheese",
+]
+
+
+def connect(dsn):
+    """Opens a fresh connection (every simulated user gets its own)."""
+    if dsn:
+        return psycopg2.connect(dsn)
+    return psycopg2.connect(**LOCAL_DB)
+
+
+def load_catalogue(conn):
+    """Fetches the store and product ids the simulated users pick from."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT store_id FROM stores ORDER BY store_id")
+        store_ids = [r[0] for r in cur.fetchall()]
+        cur.execute("SELECT product_id FROM products ORDER BY product_id")
+        product_ids = [r[0] for r in cur.fetchall()]
+    conn.rollback()
+    return store_ids, product_ids
+
+
+# --- Simulated Actions (same SQL the pages issue) ---
+def finish(conn, rollback):
+    if rollback:
+        conn.rollback()
+    else:
+        conn.commit()
+
+
+def do_checkout(conn, rng, ctx):
+    """Sell Items page: guarded cart decrement at checkout + the sales rows the journal flusher adds."""
+    store_id = rng.choice(ctx["store_ids"])
+    cart = [{"id": pid, "qty": rng.randint(1, 3)} for pid in rng.sample(ctx["hot_products"], k=rng.randint(1, 5))]
+    with conn.cursor() as cur:
+        ok, _ = reserve_stock(cur, store_id, cart)
+        if ok:
+            psycopg2.extras.execute_values(
+                cur,
+                "INSERT INTO sales_history (sale_date, store_id, product_id, quantity_sold, on_sale) VALUES %s",
+                [(store_id, item["id"], item["qty"]) for item in cart],
+                template="(CURRENT_DATE, %s, %s, %s, 0)",
+            )
+    finish(conn, ctx["rollback"])
+
+
+def do_receipt(conn, rng, ctx):
+    """My Stock page: receive a shipment for one product."""
+    store_id = rng.choice(ctx["store_ids"])
+    pid = rng.choice(ctx["hot_products"])
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE inventory SET stock_quantity = stock_quantity + %s WHERE product_id = %s AND store_id = %s",
+            (rng.randint(10, 200), pid, store_id),
+        )
+    finish(conn, ctx["rollback"])
+
+
+def do_recipe_lookup(conn, rng, ctx):
+    """Recipe Finder page: the fuzzy ILIKE availability query."""
+    ingredients = rng.sample(RECIPE_INGREDIENTS, k=rng.randint(4, 10))
+    where_clauses = []
+    search_terms = []
+    for ingredient in ingredients:
+        words = ingredient.split()
+        where_clauses.append(f"({' AND '.join(['name ILIKE %s'] * len(words))})")
+        search_terms.extend(f"%{word}%" for word in words)
+
+    query = f"""
+        WITH FoundProducts AS (
+            SELECT product_id, name AS product_name
+            FROM products
+            WHERE {' OR '.join(where_clauses)}
+        )
+        SELECT s.name AS store_name, fp.product_name, i.stock_quantity, i.price
+        FROM inventory i
+        JOIN stores s ON i.store_id = s.store_id
+        JOIN FoundProducts fp ON i.product_id = fp.product_id
+        WHERE i.stock_quantity > 0;
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, search_terms)
+        cur.fetchall()
+    conn.rollback()
+
+
+def do_forecast_refresh(conn, rng, ctx):
+    """Dashboard: static data + stock map, optionally a few Prophet predictions."""
+    store_id = rng.choice(ctx["store_ids"] + ["ALL_STORES"])
+    with conn.cursor() as cur:
+        cur.execute("SELECT product_id, name FROM products ORDER BY name")
+        cur.fetchall()
+        cur.execute("SELECT store_id, name FROM stores ORDER BY name")
+        cur.fetchall()
+        cur.execute("SELECT product_id, keyword FROM product_trend_mapping")
+        cur.fetchall()
+        if store_id == "ALL_STORES":
+            cur.execute("SELECT product_id, SUM(stock_quantity) as total_stock FROM inventory GROUP BY product_id")
+        else:
+            cur.execute("SELECT product_id, stock_quantity as total_stock FROM inventory WHERE store_id = %s", (store_id,))
+        cur.fetchall()
+    conn.rollback()
+
+    for pid in rng.sample(ctx["product_ids"], k=min(ctx["forecast_models"], len(ctx["product_ids"]))):
+        model = load_model(pid)
+        if model is None:
+            continue
+        future = model.make_future_dataframe(periods=14, freq='D')
+        future['on_sale'] = 0
+        if 'interest' in model.extra_regressors:
+            future['interest'] = 20
+        model.predict(future)
+
+
+ACTIONS = {
+    "checkout": do_checkout,
+    "receipt": do_receipt,
+    "recipe_lookup": do_recipe_lookup,
+    "forecast_refresh": do_forecast_refresh,
+}
+
+_model_cache = {}
+
+def load_model(product_id):
+    """Loads a serialized Prophet model once per process (like st.cache_resource)."""
+    if product_id not in _model_cache:
+        try:
+            from prophet.serialize import model_from_json
+            with open(f"models/demand_model_product_{product_id}.json", 'r') as f:
+                _model_cache[product_id] = model_from_json(f.read())
+        except Exception:
+            _model_cache[product_id] = None
+    return _model_cache[product_id]
+
+
+# --- Workers ---
+def run_user(user_id, ctx):
+    """Runs one simulated user until the deadline; returns (action, seconds, ok) samples."""
+    rng = random.Random(ctx["seed"] + user_id)
+    names = list(ctx["mix"].keys())
+    weights = list(ctx["mix"].values())
+    samples = []
+
+    conn = connect(ctx["dsn"])
+    try:
+        while time.time() < ctx["deadline"]:
+            action = rng.choices(names, weights=weights)[0]
+            start = time.perf_counter()
+            ok = True
+            try:
+                ACTIONS[action](conn, rng, ctx)
+            except psycopg2.Error:
+                conn.rollback()
+                ok = False
+            samples.append((action, time.perf_counter() - start, ok))
+            if ctx["think_time"]:
+                time.sleep(rng.uniform(0, ctx["think_time"]))
+    finally:
+        conn.close()
+    return samples
+
+
+def _run_user_star(args):
+    return run_user(*args)
+
+
+class LockMonitor(threading.Thread):
+    """Samples pg_stat_activity for sessions blocked on a lock while the test runs."""
+
+    def __init__(self, dsn, interval=0.2):
+        super().__init__(daemon=True)
+        self.dsn = dsn
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = connect(self.dsn)
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                while not self._stop_event.is_set():
+                    cur.execute("""
+                        SELECT COUNT(*) FROM pg_stat_activity
+                        WHERE datname = current_database() AND wait_event_type = 'Lock'
+                    """)
+                    self.samples.append(cur.fetchone()[0])
+                    self._stop_event.wait(self.interval)
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def deadlock_count(dsn):
+    conn = connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()")
+            return cur.fetchone()[0]
+    finally:
+        conn.close()
+
+
+# --- Reporting ---
+def report(samples, elapsed, monitor, deadlocks):
+    print(f"\n--- Load Test Results ({elapsed:.1f}s) ---")
+    print(f"{'action':<18}{'ops':>8}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+
+    by_action = {}
+    for action, seconds, ok in samples:
+        by_action.setdefault(action, []).append((seconds, ok))
+
+    rows = sorted(by_action.items()) + [("TOTAL", [(s, ok) for _, s, ok in samples])]
+    for action, results in rows:
+        latencies = np.array([s for s, _ in results]) * 1000
+        errors = sum(1 for _, ok in results if not ok)
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0, 0)
+        print(f"{action:<18}{len(results):>8}{errors:>8}{len(results) / elapsed:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+
+    waits = np.array(monitor.samples) if monitor.samples else np.zeros(1)
+    print("\n--- Lock Waits ---")
+    print(f"Sessions waiting on locks: mean {waits.mean():.2f}, max {int(waits.max())} "
+          f"(sampled {len(monitor.samples)} times)")
+    print(f"Share of samples with a lock wait: {(waits > 0).mean() * 100:.1f}%")
+    print(f"Deadlocks during run: {deadlocks}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive LocalLens data paths with many concurrent users.")
+    parser.add_argument("--users", type=int, default=50, help="Number of concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--mode", choices=["threads", "processes"], default="threads")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (defaults to the local database)")
+    parser.add_argument("--hot-products", type=int, default=50, help="Size of the popular-product pool that carts draw from")
+    parser.add_argument("--forecast-models", type=int, default=0, help="Prophet models to predict per forecast refresh")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Max random pause between actions (seconds)")
+    parser.add_argument("--rollback", action="store_true", help="Roll back writes instead of committing them")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    conn = connect(args.dsn)
+    store_ids, product_ids = load_catalogue(conn)
+    conn.close()
+    if not store_ids or not product_ids:
+        print("Error: Stores or Products table is empty! Did you run populate_db.py?")
+        return
+
+    rng = random.Random(args.seed)
+    ctx = {
+        "dsn": args.dsn,
+        "store_ids": store_ids,
+        "product_ids": product_ids,
+        "hot_products": rng.sample(product_ids, k=min(args.hot_products, len(product_ids))),
+        "forecast_models": args.forecast_models,
+        "think_time": args.think_time,
+        "rollback": args.rollback,
+        "mix": DEFAULT_MIX,
+        "seed": args.seed,
+        "deadline": time.time() + args.duration,
+    }
+
+    print(f"Running {args.users} users for {args.duration:.0f}s using {args.mode}...")
+    deadlocks_before = deadlock_count(args.dsn)
+    monitor = LockMonitor(args.dsn)
+    monitor.start()
+    start = time.perf_counter()
+
+    jobs = [(user_id, ctx) for user_id in range(args.users)]
+    if args.mode == "threads":
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            results = list(pool.map(_run_user_star, jobs))
+    else:
+        with multiprocessing.Pool(processes=args.users) as pool:
+            results = pool.map(_run_user_star, jobs)
+
+    elapsed = time.perf_counter() - start
+    monitor.stop()
+    deadlocks = deadlock_count(args.dsn) - deadlocks_before
+
+    samples = [s for user_samples in results for s in user_samples]
+    report(samples, elapsed, monitor, deadlocks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Offline ingredient normalisation job.
+
+Parses every line of raw_ingredients.txt (or any file of scraped ingredient
+lines): common-shape lines by the rule-based fast path, the rest through the
+custom NER model in one nlp.pipe pass (see recipes.parse_lines). Normalises each
+line's INGREDIENT span (lowercase, prep words stripped, singular; see
+recipes.canonical_ingredient) and stores two tables:
+
+  ingredient_lines     raw line -> canonical ingredient, QTY and UNIT text
+  ingredient_products  canonical ingredient -> product ids in the catalogue
+
+The Recipe Finder resolves known lines and ingredients from these tables,
+so it only runs the NLP model for lines it has never seen.
+
+Usage:
+    python normalize_ingredients.py --n-process 4
+"""
+import argparse
+import time
+
+import pandas as pd
+import psycopg2.extras
+
+from recipes import INGREDIENT_TABLES_DDL, MODEL_PATH, line_key, match_products, parse_lines
+
+
+def read_lines(path):
+    """Distinct non-empty lines, keyed by line_key (first spelling wins)."""
+    lines = {}
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            text = " ".join(raw.split())
+            if text:
+                lines.setdefault(line_key(text), text)
+    return lines
+
+
+def normalize_lines(nlp, lines, n_process=1, batch_size=256, fast_path=True):
+    """({line_key: (canonical, qty, unit)}, lines served by the fast path); canonical is '' when no ingredient is found."""
+    parsed, from_rules = parse_lines(lines.values(), nlp, n_process=n_process, batch_size=batch_size,
+                                     fast_path=fast_path)
+    return dict(zip(lines.keys(), parsed)), from_rules
+
+
+def store_dictionary(conn, parsed):
+    """Upserts the line dictionary and rebuilds the ingredient -> product map. Returns (map, ingredients)."""
+    with conn.cursor() as cur:
+        cur.execute(INGREDIENT_TABLES_DDL)
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO ingredient_lines (line_key, canonical, qty, unit) VALUES %s
+            ON CONFLICT (line_key) DO UPDATE
+                SET canonical = EXCLUDED.canonical, qty = EXCLUDED.qty, unit = EXCLUDED.unit, updated_at = NOW()
+        """, [(key, *values) for key, values in parsed.items()], page_size=1000)
+
+        # Re-match every known ingredient (old lines too) against the current catalogue
+        cur.execute("SELECT DISTINCT canonical FROM ingredient_lines WHERE canonical <> ''")
+        ingredients = [r[0] for r in cur.fetchall()]
+        cur.execute("SELECT product_id, name FROM products WHERE active")
+        products = pd.DataFrame(cur.fetchall(), columns=["product_id", "name"])
+        matches = match_products(products, ingredients)
+
+        cur.execute("DELETE FROM ingredient_products")
+        rows = [(ingredient, pid) for ingredient, ids in matches.items() for pid in ids]
+        if rows:
+            psycopg2.extras.execute_values(
+                cur, "INSERT INTO ingredient_products (canonical, product_id) VALUES %s", rows, page_size=1000
+            )
+    conn.commit()
+    return matches, ingredients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalise scraped ingredient lines into the ingredient dictionary.")
+    parser.add_argument("--input", default="raw_ingredients.txt")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--n-process", type=int, default=1, help="Processes for nlp.pipe")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--ner-only", action="store_true", help="Skip the rule-based fast path (run NER on every line)")
+    args = parser.parse_args()
+
+    import spacy
+    from db import new_connection
+
+    lines = read_lines(args.input)
+    print(f"Loaded {len(lines):,} distinct ingredient lines from '{args.input}'.")
+
+    nlp = spacy.load(args.model)
+    start = time.perf_counter()
+    parsed, from_rules = normalize_lines(nlp, lines, n_process=args.n_process, batch_size=args.batch_size,
+                                         fast_path=not args.ner_only)
+    elapsed = time.perf_counter() - start
+    print(f"Parsed in {elapsed:.2f}s ({len(lines) / elapsed:,.0f} lines/sec, n_process={args.n_process}); "
+          f"{from_rules:,} lines ({from_rules / max(len(lines), 1):.0%}) by the fast path, "
+          f"{len(lines) - from_rules:,} by the NER model.")
+
+    conn = new_connection()
+    try:
+        matches, ingredients = store_dictionary(conn, parsed)
+    finally:
+        conn.close()
+
+    no_ingredient = sum(1 for canonical, _, _ in parsed.values() if not canonical)
+    print(f"{len(ingredients):,} canonical ingredients ({no_ingredient} lines had none); "
+          f"{len(matches):,} matched to {sum(len(v) for v in matches.values()):,} catalogue products.")
+
+
+if __name__ == "__main__":
+    main()
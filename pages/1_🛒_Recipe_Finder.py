@@ -1,9 +1,8 @@
 import streamlit as st
-import spacy
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
 from db import init_connection  # <--- IMPORT THE SHARED CONNECTION
+from recipes import scrape_recipe, resolve_ingredients, check_inventory
+from quantities import total_requirements
 
 # --- Page Config ---
 st.set_page_config(
@@ -20,142 +19,11 @@ Paste a recipe URL from **Food.com**, and we'll check which ingredients are in s
 # --- Connect to DB (Using Shared Logic) ---
 conn = init_connection()
 
-# --- Load NLP Model ---
-@st.cache_resource
-def load_nlp_model():
-    try:
-        # Load the custom model from the folder
-        nlp = spacy.load("./my_ingredient_model")
-        return nlp
-    except OSError:
-        st.error("NLP model not found. Please ensure 'my_ingredient_model' folder is uploaded.")
-        return None
-
-nlp = load_nlp_model()
-
-# --- Helper Functions ---
-def scrape_recipe(recipe_url):
-    """Scrapes a single Food.com URL for its ingredient list."""
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        page = requests.get(recipe_url, headers=headers)
-        page.raise_for_status()
-        soup = BeautifulSoup(page.content, "html.parser")
-        
-        # Food.com specific scraping logic
-        ingredients = []
-        # Try finding JSON-LD first (more reliable)
-        import json
-        script_tag = soup.find("script", type="application/ld+json")
-        if script_tag:
-            data = json.loads(script_tag.string)
-            if isinstance(data, list):
-                data = data[0] # Sometimes it's a list
-            if "recipeIngredient" in data:
-                return data["recipeIngredient"]
-
-        # Fallback to HTML classes if JSON fails
-        ingredient_elements = soup.find_all("div", class_="ingredient-text") # Common class
-        if not ingredient_elements:
-             ingredient_elements = soup.find_all("li", class_="ingredient") # Another common one
-
-        if not ingredient_elements:
-            return []
-            
-        return [el.get_text(strip=True) for el in ingredient_elements]
-        
-    except Exception as e:
-        st.error(f"Error scraping URL: {e}")
-        return []
-
-def parse_ingredients(ingredient_list):
-    """Uses our custom NLP model to parse a list of raw ingredient strings."""
-    if nlp is None: return []
-        
-    parsed_ingredients = []
-    for text in ingredient_list:
-        doc = nlp(text)
-        # Extract the *main* ingredient text
-        main_ingredient = None
-        for ent in doc.ents:
-            if ent.label_ == "INGREDIENT":
-                main_ingredient = ent.text
-                break 
-        
-        if main_ingredient:
-            parsed_ingredients.append(main_ingredient)
-            
-    return list(set(parsed_ingredients))
-
-def check_inventory(ingredient_names):
-    """Queries the database to find which stores have which ingredients."""
-    if conn is None:
-        st.error("Database connection is not available.")
-        return pd.DataFrame(), []
-
-    if not ingredient_names:
-        return pd.DataFrame(), []
-
-    # Build Dynamic Query for "Fuzzy Matching"
-    where_clauses = []
-    all_search_terms = []
-    
-    for ingredient in ingredient_names:
-        words = ingredient.split()
-        if not words: continue
-        word_clauses = []
-        for word in words:
-            word_clauses.append("name ILIKE %s")
-            all_search_terms.append(f"%{word}%")
-        where_clauses.append(f"({' AND '.join(word_clauses)})")
-
-    if not where_clauses:
-        return pd.DataFrame(), ingredient_names
-
-    dynamic_where_clause = " OR ".join(where_clauses)
-
-    query = f"""
-        WITH FoundProducts AS (
-            SELECT product_id, name AS product_name
-            FROM products
-            WHERE {dynamic_where_clause}
-        )
-        SELECT 
-            s.name AS store_name,
-            fp.product_name,
-            i.stock_quantity,
-            i.price
-        FROM inventory i
-        JOIN stores s ON i.store_id = s.store_id
-        JOIN FoundProducts fp ON i.product_id = fp.product_id
-        WHERE i.stock_quantity > 0;
-    """
-    
-    try:
-        df = pd.read_sql(query, conn, params=tuple(all_search_terms))
-    except Exception as e:
-        st.error(f"Database query failed: {e}")
-        return pd.DataFrame(), ingredient_names
-
-    # Check for missing items
-    found_in_db = df['product_name'].unique()
-    missing_ingredients = []
-    for name in ingredient_names:
-        is_found = False
-        for fi in found_in_db:
-            if all(word.lower() in fi.lower() for word in name.split()):
-                is_found = True
-                break
-        if not is_found:
-            missing_ingredients.append(name)
-    
-    return df, missing_ingredients
-
 # --- Main UI Logic ---
 url = st.text_input("Paste Recipe URL:", "https://www.food.com/recipe/worlds-best-lasagna-28123")
 
 if st.button("Find Ingredients"):
-    if conn is None or nlp is None:
+    if conn is None:
         st.error("System not initialized.")
     else:
         with st.spinner("Scraping recipe..."):
@@ -165,14 +33,21 @@ if st.button("Find Ingredients"):
             st.error("Could not find ingredients on this page. Try a different Food.com URL.")
         else:
             with st.spinner("Parsing ingredients (AI)..."):
-                parsed_ingredients = parse_ingredients(raw_ingredients)
+                # Known lines come from the ingredient dictionary, common shapes from the rule-based
+                # fast path; the NLP model only sees what's left
+                parsed_ingredients, from_dictionary, from_rules = resolve_ingredients(conn, raw_ingredients)
+                needed = total_requirements(parsed_ingredients)
                 
                 # Aesthetic List
                 st.subheader("📝 Shopping List")
-                st.markdown(", ".join([f"**{i}**" for i in parsed_ingredients]))
+                st.markdown(", ".join([f"**{i}** ×{n}" for i, n in needed.items()]))
+                from_model = len(raw_ingredients) - from_dictionary - from_rules
+                st.caption(f"{len(raw_ingredients)} lines: {from_dictionary} from the ingredient dictionary, "
+                           f"{from_rules} by the rule-based parser ({from_rules / len(raw_ingredients):.0%}), "
+                           f"{from_model} by the NLP model.")
             
             with st.spinner("Checking local stores..."):
-                inventory_df, missing = check_inventory(parsed_ingredients)
+                inventory_df, missing = check_inventory(conn, parsed_ingredients)
                 
             st.divider()
             
@@ -181,17 +56,21 @@ if st.button("Find Ingredients"):
             else:
                 st.header("🏪 Store Availability")
                 
-                # Summary Table
-                summary = inventory_df.groupby('store_name')['product_name'].count().reset_index()
-                summary.columns = ['Store', 'Items Found']
-                summary['Total Needed'] = len(parsed_ingredients)
-                summary['Match %'] = (summary['Items Found'] / len(parsed_ingredients)) * 100
+                # Summary Table: an ingredient counts for a store only if it has enough units of it
+                covered = inventory_df[inventory_df['sufficient']].groupby('store_name')['ingredient'].nunique()
+                carried = inventory_df.groupby('store_name')['ingredient'].nunique()
+                summary = pd.DataFrame({'Items Found': covered, 'Carried': carried}).fillna(0).astype(int)
+                summary['Short'] = summary['Carried'] - summary['Items Found']
+                summary = summary.drop(columns='Carried').rename_axis('Store').reset_index()
+                summary['Total Needed'] = len(needed)
+                summary['Match %'] = (summary['Items Found'] / len(needed)) * 100
                 summary = summary.sort_values('Match %', ascending=False)
                 
                 st.dataframe(
                     summary,
                     hide_index=True,
                     column_config={
+                        "Short": st.column_config.NumberColumn("Not Enough Stock"),
                         "Match %": st.column_config.ProgressColumn(format="%.0f%%", min_value=0, max_value=100)
                     },
                     use_container_width=True
@@ -203,12 +82,15 @@ if st.button("Find Ingredients"):
                     with st.expander(f"📦 {store} ({row['Items Found']} items)"):
                         store_items = inventory_df[inventory_df['store_name'] == store]
                         st.dataframe(
-                            store_items[['product_name', 'price', 'stock_quantity']],
+                            store_items[['ingredient', 'product_name', 'price', 'stock_quantity', 'units_needed', 'sufficient']],
                             hide_index=True,
                             column_config={
+                                "ingredient": "Ingredient",
                                 "product_name": "Product",
                                 "price": st.column_config.NumberColumn("Price", format="₹%.2f"),
-                                "stock_quantity": "Stock"
+                                "stock_quantity": "Stock",
+                                "units_needed": "Needed",
+                                "sufficient": st.column_config.CheckboxColumn("Enough?")
                             },
                             use_container_width=True
                         )
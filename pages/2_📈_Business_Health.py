@@ -1,59 +1,65 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from datetime import timedelta, datetime
-from app import init_connection
+from datetime import timedelta
+from db import init_connection, published_static
+from forecasting import STORE_DIVIDER, forecast_matrix, load_published_forecasts
+from forecast_history import CHAIN_STORE_ID, error_trend
+from depletion import simulate_depletion, query_depletion
+from artifacts import latest_artifact
+from health_payloads import DAY_ORDER, HORIZON, build_payloads, load_inputs, payload_for
 
 st.set_page_config(page_title="Deep Dive Analytics", page_icon="📈", layout="wide")
 
 # --- 1. Safety Checks ---
 if 'forecast_cache' not in st.session_state:
-    st.warning("⚠️ Please go to the **🏠 Homepage** first to generate the forecasts.")
-    st.stop()
+    # Forecasts published by scheduler.py don't need a visit to the homepage first
+    published, _ = load_published_forecasts()
+    published_products = published_static("products")
+    if published is None or published_products is None:
+        st.warning("⚠️ Please go to the **🏠 Homepage** first to generate the forecasts.")
+        st.stop()
+    st.session_state['forecast_cache'] = published
+    st.session_state['products_df'] = published_products
 
 # --- 2. Helper Functions ---
 @st.cache_data(show_spinner=False)
-def get_product_data(_conn, product_id, store_id):
-    """Get price, recent history, AND specific current stock."""
-    
-    # 1. Get Stock & Price
+def build_product_payloads(_conn, product_id, _fc):
+    """One product's payloads, for when scheduler.py hasn't published the "health" artifact."""
+    inventory, history, store_ids = load_inputs(_conn, [product_id])
+    return build_payloads({product_id: _fc}, inventory, history, store_ids)
+
+def get_product_payload(_conn, product_id, store_id, _fc):
+    """KPIs, burn-down, weekday profile and history of one product x scope: a lookup when precomputed."""
+    published = latest_artifact("health")
+    payload = payload_for(published, product_id, store_id) if published is not None else None
+    if payload is None:
+        payload = payload_for(build_product_payloads(_conn, int(product_id), _fc), int(product_id), store_id)
+    return payload
+
+@st.cache_data(show_spinner=False)
+def get_store_inventory(_conn, store_id):
+    """Price and stock for every product in one query (aggregated for ALL_STORES)."""
     if store_id == "ALL_STORES":
-        p_query = """
-            SELECT AVG(price) as price, SUM(stock_quantity) as stock 
-            FROM inventory WHERE product_id = %(pid)s
-        """
-        params = {"pid": product_id}
-        h_query = "SELECT sale_date, SUM(quantity_sold) as qty FROM sales_history WHERE product_id = %(pid)s GROUP BY sale_date ORDER BY sale_date DESC LIMIT 30"
+        query = "SELECT product_id, AVG(price) as price, SUM(stock_quantity) as stock FROM inventory GROUP BY product_id"
+        params = {}
     else:
-        p_query = """
-            SELECT price, stock_quantity as stock 
-            FROM inventory WHERE product_id = %(pid)s AND store_id = %(sid)s
-        """
-        params = {"pid": product_id, "sid": store_id}
-        h_query = "SELECT sale_date, quantity_sold as qty FROM sales_history WHERE product_id = %(pid)s AND store_id = %(sid)s ORDER BY sale_date DESC LIMIT 30"
-        
-    meta_df = pd.read_sql(p_query, _conn, params=params)
-    
-    if meta_df.empty:
-        price, stock = 0, 0
-    else:
-        price = meta_df.iloc[0]['price'] or 0 # Handle None price
-        # --- FIX FOR TYPEERROR: Convert None to 0 ---
-        stock = meta_df.iloc[0]['stock'] or 0 
+        query = "SELECT product_id, price, stock_quantity as stock FROM inventory WHERE store_id = %(sid)s"
+        params = {"sid": store_id}
+    return pd.read_sql(query, _conn, params=params).set_index('product_id')
 
-    # 2. Get History
-    history_df = pd.read_sql(h_query, _conn, params=params)
-    history_df = history_df.sort_values('sale_date')
-    
-    return price, stock, history_df
+@st.cache_data(ttl=600, show_spinner=False)
+def get_error_trend(_conn, product_id, store_id, by):
+    """Forecast error for one product/store from the recorded forecast history (no model is run)."""
+    try:
+        return error_trend(_conn, product_id, store_id, by=by)
+    except Exception:
+        _conn.rollback()  # forecast_history not created yet
+        return pd.DataFrame()
 
-def shift_dates_to_today(df, date_col):
-    if df.empty: return df
-    first_date = df[date_col].min()
-    today = pd.Timestamp.now().normalize()
-    shift = today - first_date
-    df[date_col] = df[date_col] + shift
-    return df
+def weighted_mean(values, weights):
+    known = values.notna()
+    return (values[known] * weights[known]).sum() / weights[known].sum() if known.any() else None
 
 # --- 3. Load Session Data ---
 forecast_cache = st.session_state['forecast_cache']
@@ -98,45 +104,33 @@ product_id = product_row.iloc[0]['product_id']
 if product_id not in forecast_cache:
     st.error("No forecast model available for this product.")
 else:
-    # Fetch Data
-    price, current_stock, history_df = get_product_data(conn, int(product_id), selected_store_id)
-    fc = forecast_cache[product_id].copy()
-    
-    divider = 5 if selected_store_id != "ALL_STORES" else 1
-    
-    future_14 = fc.iloc[-14:].copy()
-    future_14 = shift_dates_to_today(future_14, 'ds')
-    future_14['Daily Sales'] = (future_14['yhat'] / divider).astype(int)
+    # Fetch Data (precomputed by scheduler.py; built for this product only otherwise)
+    payload = get_product_payload(conn, product_id, selected_store_id, forecast_cache[product_id])
+    price, current_stock = payload['price'], payload['stock']
+    today = pd.Timestamp.now().normalize()
+
+    future_14 = pd.DataFrame({
+        'ds': pd.date_range(today, periods=HORIZON),
+        'Daily Sales': payload['daily_sales'],
+        'Projected_Stock': payload['projected_stock'],
+    })
     future_14['Date_Label'] = future_14['ds'].dt.strftime('%b %d')
-    future_14['Day'] = future_14['ds'].dt.day_name()
-    
+
     # Inventory Burn-Down
-    future_14['Cumulative_Sales'] = future_14['Daily Sales'].cumsum()
-    # This subtraction is now safe because current_stock is guaranteed to be an int/float
-    future_14['Projected_Stock'] = current_stock - future_14['Cumulative_Sales']
-    
-    stockout_row = future_14[future_14['Projected_Stock'] < 0]
-    if not stockout_row.empty:
-        days_until_stockout = (stockout_row.iloc[0]['ds'] - pd.Timestamp.now()).days
-        days_until_stockout = max(0, days_until_stockout)
-        stock_status = "CRITICAL"
-    else:
-        days_until_stockout = 14
-        stock_status = "HEALTHY"
-
-    # History Data Processing
-    if not history_df.empty:
-        history_df['sale_date'] = pd.to_datetime(history_df['sale_date'])
-        last_hist_date = history_df['sale_date'].max()
-        target_hist_end = pd.Timestamp.now().normalize() - timedelta(days=1)
-        hist_shift = target_hist_end - last_hist_date
-        history_df['sale_date'] = history_df['sale_date'] + hist_shift
-        history_df['qty'] = history_df['qty'].astype(int)
+    stock_status = payload['status']
+    days_until_stockout = payload['days_until_stockout']
+    stockout_label = future_14['Date_Label'].iloc[payload['stockout_idx']] if stock_status == "CRITICAL" else None
+
+    # History Data Processing: the latest sale day is shown as yesterday
+    history_df = pd.DataFrame({
+        'sale_date': today - timedelta(days=1) - pd.to_timedelta(payload['history_days_ago'], unit='D'),
+        'qty': payload['history_qty'].astype(int),
+    })
 
     # KPI Metrics
-    total_demand = future_14['Daily Sales'].sum()
-    proj_revenue = total_demand * price
-    
+    total_demand = payload['total_demand']
+    proj_revenue = payload['projected_revenue']
+
     # --- 6. KPI Row ---
     st.markdown("### 🚦 Key Performance Indicators")
     k1, k2, k3, k4 = st.columns(4)
@@ -154,10 +148,8 @@ else:
         st.metric("Current Inventory", f"{current_stock} units", help="Stock currently on hand")
 
     # --- 7. AI Insight Section ---
-    has_trend = 'interest' in fc.columns
-    start_sales = future_14['Daily Sales'].iloc[0]
-    end_sales = future_14['Daily Sales'].iloc[-1]
-    pct_change = ((end_sales - start_sales) / start_sales) * 100 if start_sales > 0 else 0
+    has_trend = payload['has_trend']
+    pct_change = payload['pct_change']
     
     with st.container(border=True):
         st.markdown("**🧠 AI Strategic Insight**")
@@ -173,7 +165,7 @@ else:
                 
         with insight_cols[1]:
             if stock_status == "CRITICAL":
-                st.markdown(f"**Critical Inventory Alert:** Based on the forecast, you will **run out of stock around {stockout_row.iloc[0]['Date_Label']}**. A purchase order is recommended immediately.")
+                st.markdown(f"**Critical Inventory Alert:** Based on the forecast, you will **run out of stock around {stockout_label}**. A purchase order is recommended immediately.")
             elif has_trend and pct_change > 5:
                 st.markdown(f"**Growth Opportunity:** '{selected_product}' is trending on Google Search, and local sales are rising ({pct_change:.1f}%). Ensure shelf visibility.")
             elif pct_change < -5:
@@ -231,13 +223,103 @@ else:
     with c_week:
         with st.container(border=True):
             st.subheader("🗓️ Weekly Buying Pattern")
-            day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            weekly = future_14.groupby('Day', as_index=False)['Daily Sales'].mean()
+            weekly = pd.DataFrame({'Day': DAY_ORDER, 'Daily Sales': payload['weekday_profile']})
             
             chart_weekly = alt.Chart(weekly).mark_bar().encode(
-                x=alt.X('Day', sort=day_order, title=None),
+                x=alt.X('Day', sort=DAY_ORDER, title=None),
                 y=alt.Y('Daily Sales', title="Avg Units"),
                 color=alt.value('#85C1E9'),
                 tooltip=['Day', 'Daily Sales']
             ).properties(height=250)
-            st.altair_chart(chart_weekly, use_container_width=True)
\ No newline at end of file
+            st.altair_chart(chart_weekly, use_container_width=True)
+
+    # --- 9b. Forecast vs. Actual ---
+    st.subheader("🎯 Forecast vs. Actual")
+    history_store_id = CHAIN_STORE_ID if selected_store_id == "ALL_STORES" else int(selected_store_id)
+    by_day = get_error_trend(conn, int(product_id), history_store_id, "target_date")
+
+    if by_day.empty:
+        st.info("No recorded forecasts with actual sales yet. Every forecast run is saved by "
+                "`scheduler.py` (see `forecast_history.py`) and scored here once the sales are in.")
+    else:
+        by_horizon = get_error_trend(conn, int(product_id), history_store_id, "horizon")
+        mape = weighted_mean(by_day['mape'], by_day['n'])
+        a1, a2, a3, a4 = st.columns(4)
+        a1.metric("Mean Abs. Error", f"{weighted_mean(by_day['mae'], by_day['n']):.1f} units/day")
+        a2.metric("MAPE", f"{mape:.0%}" if mape is not None else "n/a", help="On days with sales")
+        a3.metric("Bias", f"{weighted_mean(by_day['bias'], by_day['n']):+.1f} units/day",
+                  help="Positive: the forecast runs high")
+        a4.metric("Inside Forecast Band", f"{weighted_mean(by_day['coverage'], by_day['n']):.0%}")
+
+        c_err, c_hor = st.columns(2)
+        with c_err:
+            with st.container(border=True):
+                st.markdown("**Forecast vs. Actual by Day** (averaged over runs)")
+                compare = by_day.melt(id_vars='target_date', value_vars=['forecast', 'actual'],
+                                      var_name='series', value_name='units')
+                st.altair_chart(alt.Chart(compare).mark_line(point=True).encode(
+                    x=alt.X('target_date:T', title=None, axis=alt.Axis(format='%b %d')),
+                    y=alt.Y('units', title="Units"),
+                    color=alt.Color('series', title=None, scale=alt.Scale(range=['#E74C3C', '#5D6D7E'])),
+                    tooltip=[alt.Tooltip('target_date:T', format='%b %d'), 'series', alt.Tooltip('units', format='.1f')],
+                ).properties(height=250), use_container_width=True)
+        with c_hor:
+            with st.container(border=True):
+                st.markdown("**Error by Days Ahead**")
+                st.altair_chart(alt.Chart(by_horizon).mark_bar(color='#F5B041').encode(
+                    x=alt.X('horizon:O', title="Days ahead"),
+                    y=alt.Y('mae', title="Mean Abs. Error"),
+                    tooltip=['horizon', alt.Tooltip('mae', format='.1f'), alt.Tooltip('mape', format='.0%'), 'n'],
+                ).properties(height=250), use_container_width=True)
+
+# --- 10. Store-wide Risk Surface ---
+st.divider()
+st.subheader("🗺️ Store-wide Stockout Risk")
+st.markdown(f"Burn-down for **every product** in *{store_opts[selected_store_id]}* over the next 14 days.")
+
+store_divider = STORE_DIVIDER if selected_store_id != "ALL_STORES" else 1
+pids, yhat, _ = forecast_matrix(forecast_cache)
+inv = get_store_inventory(conn, selected_store_id).reindex(pids)
+risk_df = simulate_depletion(
+    pids,
+    (yhat / store_divider).astype(int),
+    inv['stock'].fillna(0).to_numpy(),
+    inv['price'].fillna(0).to_numpy(),
+)
+names = st.session_state['products_df'].set_index('product_id')['name']
+risk_df.insert(1, "product_name", risk_df['product_id'].map(names))
+
+r1, r2, r3 = st.columns(3)
+r1.metric("Products at Risk", f"{(risk_df['status'] == 'CRITICAL').sum()} / {len(risk_df)}")
+r2.metric("Revenue at Risk (14 Days)", f"₹{risk_df['revenue_at_risk'].sum():,.0f}")
+r3.metric("Projected Revenue (14 Days)", f"₹{risk_df['projected_revenue'].sum():,.0f}")
+
+with st.container(border=True):
+    q1, q2, q3 = st.columns(3)
+    only_critical = q1.toggle("Only stockout risks", value=True)
+    max_cover = q2.slider("Max days of cover", min_value=0, max_value=14, value=14)
+    sort_by = q3.selectbox("Sort by", ["days_of_cover", "revenue_at_risk", "projected_revenue", "current_stock"],
+                           format_func=lambda c: c.replace('_', ' ').title())
+
+    view = query_depletion(
+        risk_df,
+        status="CRITICAL" if only_critical else None,
+        max_days_of_cover=max_cover,
+        sort_by=sort_by,
+        ascending=(sort_by in ("days_of_cover", "current_stock")),
+    )
+    st.dataframe(
+        view.drop(columns=['product_id', 'end_stock']),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "product_name": "Product",
+            "current_stock": st.column_config.NumberColumn("In Stock", format="%d"),
+            "forecasted_demand": st.column_config.NumberColumn("Demand (14 Days)", format="%d"),
+            "days_of_cover": st.column_config.ProgressColumn("Days of Cover", format="%.1f", min_value=0, max_value=14),
+            "stockout_date": st.column_config.DateColumn("Stockout Date", format="MMM DD"),
+            "status": "Status",
+            "projected_revenue": st.column_config.NumberColumn("Projected Revenue", format="₹%.0f"),
+            "revenue_at_risk": st.column_config.NumberColumn("Revenue at Risk", format="₹%.0f"),
+        },
+    )
@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from db import init_connection, run_query, run_transaction, get_product_list, get_store_list
+from db import init_connection, run_query, run_transaction, get_product_list, get_store_list, get_category_list, get_stock_page, STOCK_SORTS, receive_shipment
 
 st.set_page_config(page_title="My Stock", page_icon="📦", layout="wide")
 
@@ -11,6 +11,8 @@ if 'my_store_id' not in st.session_state:
     st.session_state['my_store_id'] = stores.iloc[0]['store_id']
 selected_store_id = st.sidebar.selectbox("Manage Store:", options=store_opts.keys(), format_func=lambda x: store_opts[x], key='my_store_id_stock')
 
+PAGE_SIZE = 50
+
 st.title("📦 Stock Room")
 
 # --- TABBED INTERFACE ---
@@ -18,54 +20,108 @@ tab_view, tab_add = st.tabs(["👁️ View Stock", "➕ Add New Shipment"])
 
 # --- TAB 1: VIEW STOCK (The read-only view) ---
 with tab_view:
-    # Load data for THIS store only
-    query = """
-        SELECT p.name as "Product", p.category as "Category", i.stock_quantity as "Qty", i.price as "Price"
-        FROM inventory i
-        JOIN products p ON i.product_id = p.product_id
-        WHERE i.store_id = %(sid)s
-        ORDER BY i.stock_quantity ASC
-    """
-    df = run_query(query, {"sid": selected_store_id})
-    
-    # Filter
-    cat_filter = st.selectbox("Filter Category:", ["All"] + list(df['Category'].unique()))
-    if cat_filter != "All":
-        df = df[df['Category'] == cat_filter]
-        
+    # Filters & sorting run in SQL; only one page of rows is ever fetched
+    f1, f2, f3 = st.columns([2, 2, 1])
+    cat_filter = f1.selectbox("Filter Category:", ["All"] + get_category_list())
+    search = f2.text_input("Search Product:", placeholder="e.g. cheese")
+    sort = f3.selectbox("Sort:", list(STOCK_SORTS.keys()))
+
+    # Keyset cursors for the pages visited so far; reset whenever the view changes
+    view_key = (selected_store_id, cat_filter, search, sort)
+    if st.session_state.get('stock_view_key') != view_key:
+        st.session_state['stock_view_key'] = view_key
+        st.session_state['stock_cursors'] = [None]
+    cursors = st.session_state['stock_cursors']
+
+    df, next_cursor = get_stock_page(
+        selected_store_id,
+        category=None if cat_filter == "All" else cat_filter,
+        search=search.strip() or None,
+        sort=sort,
+        after=cursors[-1],
+        page_size=PAGE_SIZE,
+    )
+
     # Styling
     def highlight_low(val):
         return 'background-color: #ffcccc' if val < 20 else ''
 
     st.dataframe(
-        df.style.map(highlight_low, subset=['Qty']),
+        df.drop(columns=['product_id'], errors='ignore').style.map(highlight_low, subset=['Qty']),
         use_container_width=True,
         hide_index=True,
         column_config={"Price": st.column_config.NumberColumn(format="₹%.2f")}
     )
 
+    # Pager
+    p1, p2, p3 = st.columns([1, 2, 1])
+    if p1.button("⬅️ Previous", disabled=len(cursors) == 1, use_container_width=True):
+        cursors.pop()
+        st.rerun()
+    p2.caption(f"Page {len(cursors)} · {len(df)} items shown")
+    if p3.button("Next ➡️", disabled=next_cursor is None, use_container_width=True):
+        cursors.append(next_cursor)
+        st.rerun()
+
 # --- TAB 2: ADD STOCK (The Write Feature) ---
 with tab_add:
     st.header("Receive Shipment")
     st.markdown("Use this when a delivery truck arrives to add items to your shelf.")
-    
-    with st.form("add_stock_form"):
-        products = get_product_list()
-        p_opts = {row['product_id']: row['name'] for i, row in products.iterrows()}
-        
-        c1, c2 = st.columns(2)
-        pid_to_add = c1.selectbox("Select Product Received:", options=p_opts.keys(), format_func=lambda x: p_opts[x])
-        qty_to_add = c2.number_input("Quantity Received:", min_value=1, step=1)
-        
-        submitted = st.form_submit_button("✅ Update Inventory")
-        
-        if submitted:
-            # Update Query
-            q = "UPDATE inventory SET stock_quantity = stock_quantity + %s WHERE product_id = %s AND store_id = %s"
-            success = run_transaction(q, (qty_to_add, pid_to_add, selected_store_id))
+
+    mode = st.radio("Receiving Mode:", ["Single Item", "Bulk Manifest (CSV)"], horizontal=True)
+
+    if mode == "Single Item":
+        with st.form("add_stock_form"):
+            products = get_product_list()
+            p_opts = {row['product_id']: row['name'] for i, row in products.iterrows()}
+            
+            c1, c2 = st.columns(2)
+            pid_to_add = c1.selectbox("Select Product Received:", options=p_opts.keys(), format_func=lambda x: p_opts[x])
+            qty_to_add = c2.number_input("Quantity Received:", min_value=1, step=1)
             
-            if success:
-                st.success(f"Added {qty_to_add} units to {p_opts[pid_to_add]}!")
-                st.cache_data.clear() # Clear cache so "View Stock" updates immediately
+            submitted = st.form_submit_button("✅ Update Inventory")
+            
+            if submitted:
+                # Update Query
+                q = "UPDATE inventory SET stock_quantity = stock_quantity + %s WHERE product_id = %s AND store_id = %s"
+                success = run_transaction(q, (qty_to_add, pid_to_add, selected_store_id))
+                
+                if success:
+                    st.success(f"Added {qty_to_add} units to {p_opts[pid_to_add]}!")
+                    st.cache_data.clear() # Clear cache so "View Stock" updates immediately
+                else:
+                    st.error("Update failed.")
+    else:
+        st.caption("Upload the supplier's manifest: one line per item with `product_id` and `quantity` columns "
+                   "(optional `price`, used for products this store has never stocked).")
+        manifest_file = st.file_uploader("Manifest File:", type=["csv"])
+
+        if manifest_file is not None:
+            manifest = pd.read_csv(manifest_file)
+            missing_cols = {'product_id', 'quantity'} - set(manifest.columns)
+            if missing_cols:
+                st.error(f"Manifest is missing column(s): {', '.join(sorted(missing_cols))}")
             else:
-                st.error("Update failed.")
\ No newline at end of file
+                for col in ('product_id', 'quantity'):
+                    manifest[col] = pd.to_numeric(manifest[col], errors='coerce')
+                unreadable = manifest['product_id'].isna() | manifest['quantity'].isna()
+                if unreadable.any():
+                    st.warning(f"{int(unreadable.sum())} unreadable line(s) will be skipped.")
+                manifest = manifest[~unreadable]
+                bad_qty = manifest[manifest['quantity'] <= 0]
+                st.markdown(f"**{len(manifest)} lines**, {int(manifest['quantity'].sum()):,} units, "
+                            f"{manifest['product_id'].nunique()} distinct products.")
+                if not bad_qty.empty:
+                    st.warning(f"{len(bad_qty)} line(s) with a non-positive quantity will be skipped.")
+
+                if st.button("✅ Receive Whole Shipment", type="primary"):
+                    summary = receive_shipment(selected_store_id, manifest[manifest['quantity'] > 0])
+                    if summary is None:
+                        st.error("Update failed. Nothing was applied.")
+                    else:
+                        st.success(f"Received {summary['units']:,} units across {summary['products']} products "
+                                   f"({summary['updated']} restocked, {summary['created']} newly stocked).")
+                        if summary['unknown_ids']:
+                            st.warning(f"Skipped {len(summary['unknown_ids'])} unknown product id(s): "
+                                       + ", ".join(map(str, summary['unknown_ids'][:20])))
+                        st.cache_data.clear() # Clear cache so "View Stock" updates immediately
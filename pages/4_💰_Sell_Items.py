@@ -1,10 +1,45 @@
 import streamlit as st
 import pandas as pd
-from db import init_connection, run_query, run_transaction, get_product_list, get_store_list
+from db import init_connection, run_query, run_transaction, get_product_list, get_store_list, new_connection
+from register_index import get_product_index, load_store_table
+from sales_journal import SalesJournal, JournalFlusher, checkout, ensure_schema
 from datetime import datetime
 
 st.set_page_config(page_title="Digital Register", page_icon="💰", layout="wide")
 
+# --- Write-Behind Sales Journal ---
+@st.cache_resource
+def get_sales_journal():
+    """Local journal + the background thread that syncs it to Postgres (one per server)."""
+    journal = SalesJournal()
+    flusher = JournalFlusher(journal, new_connection)
+    flusher.start()
+    return journal, flusher
+
+@st.cache_resource(show_spinner=False)
+def ensure_sales_schema(_conn):
+    """applied_sales has to exist before the first checkout reserves a sale (retried until it works)."""
+    ensure_schema(_conn)
+    return True
+
+def till_connection():
+    """This session's own connection for checkouts: their row locks and commits must not share
+    a transaction with other tills or pages. None if the database is unreachable."""
+    conn = st.session_state.get('till_conn')
+    if conn is None or conn.closed:
+        conn = None
+        try:
+            conn = new_connection()
+            ensure_sales_schema(conn)
+        except Exception:
+            if conn is not None:
+                conn.close()
+            return None  # checkouts are journaled and checked on sync
+        st.session_state['till_conn'] = conn
+    return conn
+
+journal, flusher = get_sales_journal()
+
 # --- 1. Session State for Cart ---
 if 'cart' not in st.session_state:
     st.session_state['cart'] = []
@@ -29,33 +64,53 @@ st.title("💰 Digital Register")
 st.markdown(f"**Selling from:** {store_opts[selected_store_id]}")
 
 # --- 3. The "Add to Cart" Section ---
+# Search and price/stock checks are served from memory (no DB round trip per click).
+# The store table is reloaded after every checkout (reserved sales are already in Postgres)
+# and whenever the journal has pushed more sales there; only offline sales are subtracted on top.
+product_index = get_product_index()
+journal_stats = journal.stats()
+store_table = load_store_table(selected_store_id, (sum(journal_stats.values()), journal_stats.get('applied', 0)))
+pending_sold = journal.pending_quantities(selected_store_id)
+
+# Sync status
+waiting = journal_stats.get('pending', 0)
+if flusher.last_error:
+    st.sidebar.warning(f"🧾 {waiting} sale(s) waiting to sync (database unreachable). They are safe in the local journal.")
+elif waiting:
+    st.sidebar.caption(f"🧾 Syncing {waiting} sale(s)...")
+if journal_stats.get('oversold'):
+    st.sidebar.error(f"⚠️ {journal_stats['oversold']} sale(s) made while offline sold more than the recorded stock (stock set to 0). Please recount those items.")
+if journal_stats.get('rejected'):
+    st.sidebar.error(f"⚠️ {journal_stats['rejected']} sale(s) sold more than the recorded stock and were not applied. Please recount those items.")
+if journal_stats.get('failed'):
+    st.sidebar.error(f"⚠️ {journal_stats['failed']} sale(s) could not be synced because of a data error. See `python sales_journal.py`.")
+
 col1, col2 = st.columns([2, 1])
 
 with col1:
-    products = get_product_list()
-    # Create a nice dropdown list "Apple (Produce)"
-    product_opts = {row['product_id']: f"{row['name']} ({row['category']})" for i, row in products.iterrows()}
+    search_text = st.text_input("🔍 Search Item:", placeholder="Type a name or scan a barcode")
+    matches = product_index.search(search_text)
+    if search_text and not matches:
+        st.caption("No matching products.")
     
-    selected_product_id = st.selectbox("🔍 Search Item:", options=product_opts.keys(), format_func=lambda x: product_opts[x])
+    selected_product_id = st.selectbox("Matching Items:", options=matches, format_func=product_index.label)
 
 with col2:
     qty = st.number_input("Quantity:", min_value=1, value=1, step=1)
 
 # Add Button
-if st.button("➕ Add to Bill", use_container_width=True):
-    # Get Price
-    price_df = run_query(
-        "SELECT price, stock_quantity FROM inventory WHERE product_id = %(pid)s AND store_id = %(sid)s", 
-        {"pid": selected_product_id, "sid": selected_store_id}
-    )
+if st.button("➕ Add to Bill", use_container_width=True, disabled=selected_product_id is None):
+    item = store_table.lookup(selected_product_id)
     
-    if not price_df.empty:
-        price = price_df.iloc[0]['price']
-        current_stock = price_df.iloc[0]['stock_quantity']
+    if item is not None:
+        price, current_stock = item
+        # Units already on the bill, or sold but not yet synced, are not available any more
+        in_cart = sum(i['qty'] for i in st.session_state['cart'] if i['id'] == selected_product_id)
+        available = current_stock - in_cart - pending_sold.get(selected_product_id, 0)
         
-        if current_stock >= qty:
+        if available >= qty:
             # Add to session state cart
-            item_name = product_opts[selected_product_id].split(' (')[0]
+            item_name = product_index.name(selected_product_id)
             st.session_state['cart'].append({
                 "id": selected_product_id,
                 "name": item_name,
@@ -65,7 +120,7 @@ if st.button("➕ Add to Bill", use_container_width=True):
             })
             st.success(f"Added {qty} x {item_name}")
         else:
-            st.error(f"❌ Not enough stock! Only {current_stock} available.")
+            st.error(f"❌ Not enough stock! Only {available} available.")
     else:
         st.error("Item not found in this store's inventory.")
 
@@ -94,27 +149,20 @@ if st.session_state['cart']:
     
     with col_pay:
         if st.button("✅ Complete Sale", type="primary", use_container_width=True):
-            # 1. Update DB for each item
-            success = True
-            for item in st.session_state['cart']:
-                # Update Inventory (Subtract)
-                q1 = "UPDATE inventory SET stock_quantity = stock_quantity - %s WHERE product_id = %s AND store_id = %s"
-                # Add Sales History (Add)
-                q2 = "INSERT INTO sales_history (sale_date, store_id, product_id, quantity_sold, on_sale) VALUES (CURRENT_DATE, %s, %s, %s, 0)"
-                
-                t1 = run_transaction(q1, (item['qty'], item['id'], selected_store_id))
-                t2 = run_transaction(q2, (selected_store_id, item['id'], item['qty']))
-                
-                if not (t1 and t2):
-                    success = False
-            
-            if success:
+            # Stock is checked and decremented now; the journal carries the sale to sales_history
+            outcome, _, short = checkout(journal, till_connection(), selected_store_id, st.session_state['cart'], payment_mode)
+            if outcome == "refused":
+                for pid, requested, available in short:
+                    st.error(f"❌ Not enough stock for {product_index.name(pid)}: {requested} on the bill, only {available} left. Adjust the bill and try again.")
+            else:
+                flusher.wake()
                 st.balloons()
-                st.success("Sale Recorded! Inventory Updated.")
+                if outcome == "offline":
+                    st.warning("Sale saved locally. The database is unreachable, so stock will be checked when it syncs.")
+                else:
+                    st.success("Sale Recorded! Inventory Updated.")
                 st.session_state['cart'] = [] # Clear cart
                 st.rerun() # Refresh to update stock
-            else:
-                st.error("Transaction failed. Check database logs.")
 
     with col_clear:
         if st.button("🗑️ Clear Cart"):
@@ -0,0 +1,75 @@
+import streamlit as st
+import pandas as pd
+import altair as alt
+from datetime import datetime
+from artifacts import read_status, artifact_version
+from scheduler import JOBS
+
+st.set_page_config(page_title="Scheduler", page_icon="⏱️", layout="wide")
+
+st.title("⏱️ Background Jobs")
+st.markdown("Forecasts, rollups and caches precomputed by `scheduler.py`, so pages never compute them on demand.")
+
+status = read_status()
+jobs_state = status.get("jobs", {})
+
+# --- Scheduler Heartbeat ---
+scheduler = status.get("scheduler")
+if not scheduler:
+    st.warning("The scheduler has never run. Start it with `python scheduler.py`.")
+else:
+    heartbeat = scheduler.get("heartbeat") or scheduler.get("started_at")
+    age = (datetime.now() - datetime.fromisoformat(heartbeat)).total_seconds()
+    h1, h2, h3 = st.columns(3)
+    h1.metric("Scheduler", "Running" if age < 300 else "Stopped?", help=f"PID {scheduler.get('pid')}")
+    h2.metric("Last Heartbeat", f"{age / 60:.0f} min ago")
+    h3.metric("Started", datetime.fromisoformat(scheduler['started_at']).strftime('%b %d, %H:%M'))
+
+# --- Jobs ---
+st.subheader("📋 Jobs")
+rows = []
+for name, job in JOBS.items():
+    state = jobs_state.get(name, {})
+    artifact = job.get("artifact")
+    version = artifact_version(artifact) if artifact else None
+    rows.append({
+        "Job": name,
+        "Schedule": f"daily {job['at']}" if "at" in job else f"every {job['every'] // 60} min",
+        "Last Run": state.get("last_started"),
+        "Status": state.get("last_status", "never run"),
+        "Duration (s)": state.get("last_duration_s"),
+        "Trigger": state.get("last_reason"),
+        "Result": state.get("last_summary") or (state.get("last_error") or "").split("\n")[0] or None,
+        "Artifact Published": datetime.fromtimestamp(version / 1e9) if version else None,
+    })
+st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True,
+             column_config={"Artifact Published": st.column_config.DatetimeColumn(format="MMM DD, HH:mm")})
+
+# --- Durations ---
+runs = pd.DataFrame([
+    {"job": name, **run} for name, state in jobs_state.items() for run in state.get("runs", [])
+])
+if not runs.empty:
+    st.subheader("📈 Job Durations")
+    runs['started'] = pd.to_datetime(runs['started'])
+    chart = alt.Chart(runs).mark_line(point=True).encode(
+        x=alt.X('started', title=None),
+        y=alt.Y('duration_s', title="Seconds"),
+        color=alt.Color('job', title="Job"),
+        tooltip=['job', alt.Tooltip('started', format='%b %d %H:%M'), 'duration_s', 'status'],
+    ).properties(height=300)
+    st.altair_chart(chart, use_container_width=True)
+
+    summary = runs.groupby('job').agg(
+        runs=('duration_s', 'size'),
+        median_s=('duration_s', 'median'),
+        max_s=('duration_s', 'max'),
+        failures=('status', lambda s: int((s == 'failed').sum())),
+    ).reset_index()
+    st.dataframe(summary, hide_index=True, use_container_width=True)
+
+# --- Errors ---
+failed = {name: state for name, state in jobs_state.items() if state.get("last_status") == "failed"}
+for name, state in failed.items():
+    with st.expander(f"❌ {name} failed at {state.get('last_finished')}"):
+        st.code(state.get("last_error") or "")
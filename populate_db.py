@@ -2,6 +2,7 @@ import pandas as pd
 from faker import Faker
 import random
 from db import init_connection # <--- NEW IMPORT
+from sync_catalogue import read_catalogue, sync_products
 
 def create_stores(cursor):
     """Creates 5 fake stores and inserts them into the 'stores' table."""
@@ -22,24 +23,20 @@ def create_stores(cursor):
     print(f"Created 5 stores with IDs: {store_ids}")
     return store_ids
 
-def populate_products(cursor):
-    """Reads products.csv and inserts them into the 'products' table."""
+def populate_products(conn, cursor):
+    """Syncs products.csv into the 'products' table (see sync_catalogue.py) and returns the active ids."""
     try:
-        df = pd.read_csv("products.csv")
+        catalogue = read_catalogue("products.csv")
     except FileNotFoundError:
         print("Error: products.csv not found. Run scrape_products.py first.")
         return None
         
-    product_ids = []
-    print(f"Populating {len(df)} products...")
-    
-    for index, row in df.iterrows():
-        sql = "INSERT INTO products (name, category) VALUES (%s, %s) RETURNING product_id;"
-        cursor.execute(sql, (row['name'], row['category']))
-        
-        product_id = cursor.fetchone()[0]
-        product_ids.append(product_id)
-        
+    print(f"Populating {len(catalogue)} products...")
+    counts = sync_products(conn, catalogue, commit=False)
+    print(f"Products: {counts['inserted']} inserted, {counts['updated']} updated, {counts['deactivated']} soft-deleted.")
+
+    cursor.execute("SELECT product_id FROM products WHERE active ORDER BY product_id;")
+    product_ids = [row[0] for row in cursor.fetchall()]
     print(f"Populated {len(product_ids)} products.")
     return product_ids
 
@@ -60,7 +57,8 @@ def simulate_inventory(cursor, store_ids, product_ids):
             
             sql = """
             INSERT INTO inventory (store_id, product_id, stock_quantity, price)
-            VALUES (%s, %s, %s, %s);
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (store_id, product_id) DO NOTHING;
             """
             cursor.execute(sql, (store_id, product_id, stock_quantity, price))
             inventory_count += 1
@@ -78,7 +76,7 @@ def main():
     
     try:
         store_ids = create_stores(cursor)
-        product_ids = populate_products(cursor)
+        product_ids = populate_products(conn, cursor)
         
         if product_ids:
             simulate_inventory(cursor, store_ids, product_ids)
@@ -0,0 +1,128 @@
+"""
+Recipe quantities and units.
+
+Turns the QTY / UNIT text the ingredient model extracts ("1 1/2", "cups")
+into an amount in a base unit (g, ml or each), and that amount into the
+number of shelf units a shopper needs, using PACKAGE_SIZE as the assumed
+size of one stock unit. Inventory is counted in sellable packs, not grams,
+so that assumption is what makes "2 cups of flour" comparable with
+stock_quantity.
+"""
+import math
+import re
+
+# Assumed contents of one unit of stock, per base unit
+PACKAGE_SIZE = {"g": 500.0, "ml": 1000.0, "each": 1.0}
+
+TEXT_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "dozen": 12, "half": 0.5,
+    "quarter": 0.25, "couple": 2, "few": 3, "several": 3,
+}
+UNICODE_FRACTIONS = {"½": " 1/2", "¼": " 1/4", "¾": " 3/4", "⅓": " 1/3", "⅔": " 2/3", "⅛": " 1/8"}
+
+# unit -> (base unit, amount of base unit per 1 unit)
+UNITS = {
+    ("cup", "c"): ("ml", 240.0),
+    ("tablespoon", "tbsp", "tbs", "tbl", "tb"): ("ml", 15.0),
+    ("teaspoon", "tsp"): ("ml", 5.0),
+    ("fluid ounce", "fl oz", "fl. oz"): ("ml", 29.57),
+    ("milliliter", "millilitre", "ml"): ("ml", 1.0),
+    ("liter", "litre", "l"): ("ml", 1000.0),
+    ("pint", "pt"): ("ml", 473.0),
+    ("quart", "qt"): ("ml", 946.0),
+    ("gallon", "gal"): ("ml", 3785.0),
+    ("pinch",): ("ml", 0.3),
+    ("dash",): ("ml", 0.6),
+    ("drop",): ("ml", 0.05),
+    ("ounce", "oz"): ("g", 28.35),
+    ("pound", "lb"): ("g", 453.6),
+    ("gram", "g"): ("g", 1.0),
+    ("kilogram", "kg"): ("g", 1000.0),
+    ("can", "package", "pkg", "box", "jar", "bag", "bottle", "container", "carton", "envelope", "packet",
+     "bunch", "head", "clove", "stick", "slice", "loaf", "sprig", "stalk", "piece", "each"): ("each", 1.0),
+}
+
+
+def _build_unit_table():
+    """Every spelling we accept (singular, plural, abbreviation) -> (base, factor), built once."""
+    table = {}
+    for names, conversion in UNITS.items():
+        for name in names:
+            for form in (name, name + "s", name + "es"):
+                table.setdefault(form, conversion)
+    table["leaves"] = table["loaves"] = ("each", 1.0)
+    return table
+
+
+UNIT_TABLE = _build_unit_table()
+
+
+def _parse_single(text):
+    m = re.search(r"(\d+)\s+(\d+)/(\d+)", text)
+    if m:
+        return int(m.group(1)) + int(m.group(2)) / int(m.group(3))
+    m = re.search(r"(\d+)/(\d+)", text)
+    if m:
+        return int(m.group(1)) / int(m.group(2)) if int(m.group(2)) else None
+    m = re.search(r"\d+(?:\.\d+)?", text)
+    if m:
+        return float(m.group())
+    for word in re.findall(r"[a-z]+", text):
+        if word in TEXT_NUMBERS:
+            return float(TEXT_NUMBERS[word])
+    return None
+
+
+def parse_quantity(text):
+    """'1 1/2' -> 1.5, 'one' -> 1.0, '1/4-1/2' -> 0.5 (top of a range, to be safe). None if no number."""
+    if not text:
+        return None
+    text = str(text).lower()
+    for char, replacement in UNICODE_FRACTIONS.items():
+        text = text.replace(char, replacement)
+    parts = re.split(r"\s*(?:-|–|\bto\b|\bor\b)\s*", text)
+    values = [v for v in (_parse_single(p) for p in parts) if v is not None]
+    return max(values) if values else None
+
+
+def parse_unit(text):
+    """(base unit, factor) for unit text like 'cups', 'tbsp.' or '(8 ounce) package'; None if unknown."""
+    if not text:
+        return None
+    text = re.sub(r"\([^)]*\)", " ", str(text).lower()).replace(".", " ")
+    words = re.findall(r"[a-z]+", text)
+    # "fl oz" is the only two-word unit
+    for i in range(len(words) - 1):
+        if words[i] == "fl" and words[i + 1] == "oz":
+            return UNIT_TABLE["fl oz"]
+    # The last recognised word wins: "(8 ounce) package" is bought as a package
+    for word in reversed(words):
+        if word in UNIT_TABLE:
+            return UNIT_TABLE[word]
+    return None
+
+
+def requirement(ingredient, qty_text=None, unit_text=None):
+    """One recipe line as {ingredient, qty, base_unit, amount}. No quantity means one; no unit means 'each'."""
+    qty = parse_quantity(qty_text)
+    base, factor = parse_unit(unit_text) or ("each", 1.0)
+    qty = 1.0 if qty is None else qty
+    return {"ingredient": ingredient, "qty": qty, "base_unit": base, "amount": qty * factor}
+
+
+def units_needed(amount, base_unit):
+    """Whole stock units that cover `amount` of `base_unit` (at least one)."""
+    return max(1, math.ceil(amount / PACKAGE_SIZE.get(base_unit, 1.0) - 1e-9))
+
+
+def total_requirements(requirements):
+    """Sums recipe lines per ingredient -> {ingredient: stock units needed}."""
+    amounts = {}
+    for req in requirements:
+        key = (req["ingredient"], req["base_unit"])
+        amounts[key] = amounts.get(key, 0.0) + req["amount"]
+    needed = {}
+    for (ingredient, base), amount in amounts.items():
+        needed[ingredient] = needed.get(ingredient, 0) + units_needed(amount, base)
+    return needed
@@ -0,0 +1,69 @@
+"""
+Inter-store stock rebalancing.
+
+Given products x stores matrices of forecast demand and stock, suggests
+transfers from stores holding surplus to sister stores that will run short,
+before anyone places a new purchase order.
+
+Matching is greedy per product (largest surplus feeds largest shortfall),
+which moves the maximum possible number of units and therefore minimizes
+the remaining shortfall. It is done for every product at once: each
+product's donors and receivers are laid out as consecutive intervals on one
+number line, and the transfers are the overlaps between the two tilings.
+"""
+import numpy as np
+import pandas as pd
+
+
+def surplus_and_deficit(demand, stock, safety_stock=0):
+    """Units each store can spare (keeping demand + safety stock) and units it is short."""
+    demand = np.asarray(demand, dtype=float)
+    stock = np.asarray(stock, dtype=float)
+    keep = np.ceil(demand + safety_stock)
+    surplus = np.floor(np.clip(stock - keep, 0, None)).astype(np.int64)
+    deficit = np.ceil(np.clip(demand - stock, 0, None)).astype(np.int64)
+    return surplus, deficit
+
+
+def _interval_ends(amounts, totals, offsets):
+    """Sorts each row descending and returns the cumulative interval ends (clipped to the row total)."""
+    order = np.argsort(-amounts, axis=1, kind='stable')
+    ends = np.minimum(np.cumsum(np.take_along_axis(amounts, order, axis=1), axis=1), totals[:, None])
+    return order, (ends + offsets[:, None]).ravel()
+
+
+def plan_transfers(product_ids, store_ids, demand, stock, safety_stock=0, min_units=1):
+    """
+    Returns one row per suggested transfer:
+    product_id, from_store_id, to_store_id, units.
+    """
+    surplus, deficit = surplus_and_deficit(demand, stock, safety_stock)
+    n_products, n_stores = surplus.shape
+
+    movable = np.minimum(surplus.sum(axis=1), deficit.sum(axis=1))
+    offsets = np.cumsum(movable) - movable
+    total = int(movable.sum())
+    if total == 0:
+        return pd.DataFrame(columns=["product_id", "from_store_id", "to_store_id", "units"])
+
+    donor_order, donor_ends = _interval_ends(surplus, movable, offsets)
+    receiver_order, receiver_ends = _interval_ends(deficit, movable, offsets)
+
+    # Every donor/receiver interval boundary splits the line into transfer segments
+    breaks = np.unique(np.concatenate([[0], donor_ends, receiver_ends]))
+    starts, units = breaks[:-1], np.diff(breaks)
+
+    donor_flat = np.searchsorted(donor_ends, starts, side='right')
+    receiver_flat = np.searchsorted(receiver_ends, starts, side='right')
+    product_idx = donor_flat // n_stores
+
+    from_store = donor_order[product_idx, donor_flat % n_stores]
+    to_store = receiver_order[product_idx, receiver_flat % n_stores]
+
+    transfers = pd.DataFrame({
+        "product_id": np.asarray(product_ids)[product_idx],
+        "from_store_id": np.asarray(store_ids)[from_store],
+        "to_store_id": np.asarray(store_ids)[to_store],
+        "units": units.astype(int),
+    })
+    return transfers[transfers['units'] >= min_units].reset_index(drop=True)
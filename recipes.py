@@ -0,0 +1,326 @@
+import json
+import re
+import streamlit as st
+import pandas as pd
+
+from quantities import UNIT_TABLE, requirement, total_requirements
+
+# NOTE: spaCy, requests and BeautifulSoup are imported inside the functions
+# that need them, so opening the Recipe Finder page stays instant and the NLP
+# model is only loaded when the first recipe is parsed.
+
+MODEL_PATH = "./my_ingredient_model"
+
+# --- Ingredient Normalisation ---
+# Words that describe preparation / size rather than what to buy
+PREP_WORDS = {
+    "chopped", "diced", "minced", "sliced", "grated", "shredded", "crushed", "cubed", "halved", "quartered",
+    "beaten", "whisked", "softened", "melted", "cooked", "uncooked", "thawed", "drained", "undrained",
+    "rinsed", "peeled", "seeded", "cored", "trimmed", "divided", "optional", "packed", "sifted", "toasted",
+    "fresh", "freshly", "finely", "coarsely", "roughly", "thinly", "thickly", "lightly", "well", "very",
+    "large", "small", "medium", "md", "lg", "sm", "extra", "hard", "soft", "cold", "warm", "hot", "room",
+    "temperature", "to", "taste", "about", "plus", "more", "needed", "for", "serving", "garnish",
+    "of", "a", "an", "the", "and", "your", "favorite", "good", "quality",
+}
+NO_SINGULAR = {"molasses", "hummus", "couscous", "asparagus", "swiss", "brussels", "citrus", "series", "grits"}
+WORD_RE = re.compile(r"[a-z]+(?:-[a-z]+)*")
+
+
+def singularize(word):
+    """Cheap rule-based lemma for plural nouns (the custom model has no lemmatizer)."""
+    if word in NO_SINGULAR or len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes") or word.endswith(("ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def canonical_ingredient(text):
+    """'Tomatoes, diced (fresh)' -> 'tomato': lowercased, prep words stripped, singular."""
+    text = re.sub(r"\([^)]*\)", " ", str(text).lower())
+    text = re.split(r",| or ", text)[0]
+    words = [singularize(w) for w in WORD_RE.findall(text) if w not in PREP_WORDS]
+    return " ".join(words)
+
+
+def line_key(text):
+    """Whitespace/case-insensitive key for a raw ingredient line."""
+    return " ".join(str(text).lower().split())
+
+
+def match_products(products, canonicals):
+    """{canonical: [product_id, ...]}: products whose (singular) name has every word of the canonical."""
+    postings = {}
+    for pid, name in zip(products['product_id'], products['name']):
+        for word in {singularize(w) for w in WORD_RE.findall(str(name).lower())}:
+            postings.setdefault(word, set()).add(int(pid))
+    matches = {}
+    for canonical in canonicals:
+        words = canonical.split()
+        if not words:
+            continue
+        ids = set.intersection(*(postings.get(w, set()) for w in words))
+        if ids:
+            matches[canonical] = sorted(ids)
+    return matches
+
+
+# --- Ingredient Dictionary (built offline by normalize_ingredients.py) ---
+INGREDIENT_TABLES_DDL = """
+    CREATE TABLE IF NOT EXISTS ingredient_lines (
+        line_key TEXT PRIMARY KEY,
+        canonical TEXT NOT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+    );
+    CREATE TABLE IF NOT EXISTS ingredient_products (
+        canonical TEXT NOT NULL,
+        product_id INTEGER NOT NULL REFERENCES products(product_id),
+        PRIMARY KEY (canonical, product_id)
+    );
+    ALTER TABLE ingredient_lines ADD COLUMN IF NOT EXISTS qty TEXT;
+    ALTER TABLE ingredient_lines ADD COLUMN IF NOT EXISTS unit TEXT;
+"""
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_ingredient_dictionary(_conn):
+    """(line_key -> (canonical, qty, unit), canonical -> [product_id]); both empty if the job has never run."""
+    try:
+        lines = pd.read_sql("SELECT line_key, canonical, qty, unit FROM ingredient_lines", _conn)
+        products = pd.read_sql("SELECT canonical, product_id FROM ingredient_products", _conn)
+    except Exception:
+        _conn.rollback()
+        return {}, {}
+    return (
+        dict(zip(lines['line_key'], zip(lines['canonical'], lines['qty'], lines['unit']))),
+        products.groupby('canonical')['product_id'].apply(list).to_dict(),
+    )
+
+# --- Load NLP Model ---
+@st.cache_resource
+def load_nlp_model(model_path=None):
+    import spacy
+    try:
+        # Load the custom model from the folder (the slim build if one exists)
+        nlp = spacy.load(model_path or MODEL_PATH)
+        return nlp
+    except OSError:
+        st.error("NLP model not found. Please ensure 'my_ingredient_model' folder is uploaded.")
+        return None
+
+# --- Helper Functions ---
+def scrape_recipe(recipe_url):
+    """Scrapes a single Food.com URL for its ingredient list."""
+    import requests
+    from bs4 import BeautifulSoup
+    try:
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        page = requests.get(recipe_url, headers=headers)
+        page.raise_for_status()
+        soup = BeautifulSoup(page.content, "html.parser")
+
+        # Food.com specific scraping logic
+        # Try finding JSON-LD first (more reliable)
+        script_tag = soup.find("script", type="application/ld+json")
+        if script_tag:
+            data = json.loads(script_tag.string)
+            if isinstance(data, list):
+                data = data[0] # Sometimes it's a list
+            if "recipeIngredient" in data:
+                return data["recipeIngredient"]
+
+        # Fallback to HTML classes if JSON fails
+        ingredient_elements = soup.find_all("div", class_="ingredient-text") # Common class
+        if not ingredient_elements:
+             ingredient_elements = soup.find_all("li", class_="ingredient") # Another common one
+
+        if not ingredient_elements:
+            return []
+
+        return [el.get_text(strip=True) for el in ingredient_elements]
+
+    except Exception as e:
+        st.error(f"Error scraping URL: {e}")
+        return []
+
+def extract_line(doc):
+    """(canonical ingredient, QTY text, UNIT text) from one parsed line; ingredient is '' if none."""
+    found = {}
+    for ent in doc.ents:
+        found.setdefault(ent.label_, ent.text)
+    ingredient = found.get("INGREDIENT")
+    return (canonical_ingredient(ingredient) if ingredient else ""), found.get("QTY"), found.get("UNIT")
+
+# --- Rule-based Fast Path ---
+# Most scraped lines look like "<qty> [(size)] [unit] <ingredient>[, prep]". Those are
+# parsed with one precompiled regex and the unit lexicon from quantities.py; only
+# lines that don't fit (alternatives, "salt and pepper", "2 garlic cloves", ...) go
+# to the NER model.
+_NUMBER = r"(?:\d+\s*)?[½¼¾⅓⅔⅛]|\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?"
+_WORD_NUMBERS = "one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|dozen"
+_UNIT_NAMES = "|".join(re.escape(u).replace(r"\ ", r"\s+") for u in sorted(UNIT_TABLE, key=len, reverse=True))
+FAST_LINE_RE = re.compile(
+    rf"^(?:(?P<qty>(?:{_NUMBER})(?:\s*(?:-|–|to)\s*(?:{_NUMBER}))?|(?:{_WORD_NUMBERS})(?=\s))\s*"
+    rf"(?P<size>\([^)]*\)\s*)?"
+    rf"(?:(?P<unit>{_UNIT_NAMES})\.?(?=\s|$)\s*)?)?"
+    rf"(?P<rest>.*)$",
+    re.IGNORECASE,
+)
+# Alternatives, combinations and numbers in the ingredient part ("salt & pepper"; "half-and-half" is fine)
+AMBIGUOUS_HEAD_RE = re.compile(r"(?<![\w-])(?:or|and|with|plus|into|per)(?![\w-])|[/&+\d]")
+MAX_HEAD_WORDS = 4
+
+
+def fast_parse(text):
+    """(canonical, QTY text, UNIT text) for a common-shape line, or None if the NER model should decide."""
+    m = FAST_LINE_RE.match(" ".join(str(text).split()))
+    if not m or (m.group("size") and not m.group("unit")):
+        return None
+    # The ingredient is whatever comes before the first comma / bracket
+    head = re.split(r"[,(;:]", m.group("rest"), maxsplit=1)[0].lower()
+    if AMBIGUOUS_HEAD_RE.search(head):
+        return None
+    words = canonical_ingredient(head).split()
+    # "2 garlic cloves": a unit word inside the ingredient is the model's call
+    if not words or len(words) > MAX_HEAD_WORDS or any(w in UNIT_TABLE for w in words):
+        return None
+    qty = m.group("qty").strip() if m.group("qty") else None
+    unit = f"{m.group('size') or ''}{m.group('unit')}".strip() if m.group("unit") else None
+    return " ".join(words), qty, unit
+
+
+def parse_lines(lines, nlp=None, n_process=1, batch_size=256, fast_path=True):
+    """
+    (canonical, QTY, UNIT) for every line, in order, plus how many the fast path served.
+
+    Only lines fast_parse() can't handle go through nlp.pipe; with nlp=None the
+    model is loaded (load_nlp_model) only if such a line exists. Lines that end
+    up with no ingredient come back as ('', None, None).
+    """
+    lines = list(lines)
+    results = [fast_parse(text) for text in lines] if fast_path else [None] * len(lines)
+    pending = [i for i, r in enumerate(results) if r is None]
+    if pending:
+        nlp = nlp or load_nlp_model()
+        if nlp is not None:
+            docs = nlp.pipe((lines[i] for i in pending), n_process=n_process, batch_size=batch_size)
+            for i, doc in zip(pending, docs):
+                results[i] = extract_line(doc)
+    return [r or ("", None, None) for r in results], len(lines) - len(pending)
+
+def parse_ingredients(nlp, ingredient_list, n_process=1):
+    """Parses raw ingredient strings into requirements (see quantities.py). Returns (requirements, fast-path lines)."""
+    parsed, from_rules = parse_lines(ingredient_list, nlp, n_process=n_process)
+    # The *main* ingredient, with the line's quantity and unit
+    return [requirement(ingredient, qty, unit) for ingredient, qty, unit in parsed if ingredient], from_rules
+
+def resolve_ingredients(conn, ingredient_list):
+    """
+    Requirements ({ingredient, qty, base_unit, amount}) for raw recipe lines.
+
+    Lines already in the ingredient dictionary are resolved by lookup, then
+    common-shape lines by the rule-based fast path; the NLP model is only
+    loaded (and run) for whatever is left.
+    Returns (requirements, lines resolved from the dictionary, lines resolved by the fast path).
+    """
+    known_lines, _ = load_ingredient_dictionary(conn)
+    parsed, unknown = [], []
+    for text in ingredient_list:
+        key = line_key(text)
+        if key in known_lines:
+            ingredient, qty, unit = known_lines[key]
+            if ingredient:
+                parsed.append(requirement(ingredient, qty, unit))
+        else:
+            unknown.append(text)
+
+    from_rules = 0
+    if unknown:
+        new, from_rules = parse_ingredients(None, unknown)
+        parsed += new
+    return parsed, len(ingredient_list) - len(unknown), from_rules
+
+def check_inventory(conn, requirements):
+    """
+    Finds which stores can cover each ingredient, in the amounts the recipe needs.
+
+    `requirements` are resolve_ingredients() dicts (plain names count as one
+    unit each). One query fetches every candidate product's stock; matching
+    products to ingredients and comparing stock with the units needed is
+    then done on the whole result at once. Returns (df, missing) where df
+    has one row per (store, product, ingredient) with units_needed and
+    sufficient, and `missing` lists ingredients no store carries.
+    """
+    if conn is None:
+        st.error("Database connection is not available.")
+        return pd.DataFrame(), []
+
+    if not requirements:
+        return pd.DataFrame(), []
+
+    needed = total_requirements(requirement(r) if isinstance(r, str) else r for r in requirements)
+    ingredient_names = list(needed)
+
+    # Ingredients in the dictionary map straight to product ids; only the rest need fuzzy matching
+    _, product_map = load_ingredient_dictionary(conn)
+    mapped_ids = sorted({pid for name in ingredient_names for pid in product_map.get(name, [])})
+    where_clauses = ["product_id = ANY(%s::int[])"]
+    all_search_terms = [mapped_ids]
+
+    # Build Dynamic Query for "Fuzzy Matching"
+    fuzzy = [name for name in ingredient_names if name not in product_map and name.split()]
+    for ingredient in fuzzy:
+        word_clauses = []
+        for word in ingredient.split():
+            word_clauses.append("name ILIKE %s")
+            all_search_terms.append(f"%{word}%")
+        where_clauses.append(f"({' AND '.join(word_clauses)})")
+
+    dynamic_where_clause = " OR ".join(where_clauses)
+
+    query = f"""
+        WITH FoundProducts AS (
+            SELECT product_id, name AS product_name
+            FROM products
+            WHERE {dynamic_where_clause}
+        )
+        SELECT
+            s.name AS store_name,
+            fp.product_id,
+            fp.product_name,
+            i.stock_quantity,
+            i.price
+        FROM inventory i
+        JOIN stores s ON i.store_id = s.store_id
+        JOIN FoundProducts fp ON i.product_id = fp.product_id
+        WHERE i.stock_quantity > 0;
+    """
+
+    try:
+        df = pd.read_sql(query, conn, params=tuple(all_search_terms))
+    except Exception as e:
+        st.error(f"Database query failed: {e}")
+        return pd.DataFrame(), ingredient_names
+
+    # Attach each stock row to the ingredient(s) it covers
+    pairs = pd.DataFrame(
+        [(name, pid) for name in ingredient_names for pid in product_map.get(name, [])],
+        columns=['ingredient', 'product_id'],
+    )
+    pieces = [df.merge(pairs, on='product_id')]
+    lowered = df['product_name'].str.lower()
+    for name in fuzzy:
+        mask = pd.Series(True, index=df.index)
+        for word in name.split():
+            mask &= lowered.str.contains(word.lower(), regex=False)
+        pieces.append(df[mask].assign(ingredient=name))
+    matched = pd.concat(pieces, ignore_index=True)
+
+    matched['units_needed'] = matched['ingredient'].map(needed).astype(int)
+    matched['sufficient'] = matched['stock_quantity'] >= matched['units_needed']
+
+    missing_ingredients = [name for name in ingredient_names if name not in set(matched['ingredient'])]
+    return matched, missing_ingredients
@@ -0,0 +1,116 @@
+"""
+In-memory lookup service for the Digital Register.
+
+ProductIndex serves typeahead search over product names (token prefixes)
+and barcodes (code prefixes) without touching the database. StoreTable
+holds one store's price and stock as compact NumPy arrays, so adding an
+item to the bill is a binary search instead of a query. Both are rebuilt
+only when their inputs change (catalogue refresh / stock version bump).
+"""
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+import numpy as np
+import streamlit as st
+
+from db import run_query, get_product_list
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+class ProductIndex:
+    """Token-prefix and barcode-prefix index over the product catalogue."""
+
+    def __init__(self, products):
+        products = products.reset_index(drop=True)
+        self.product_ids = products['product_id'].to_numpy()
+        self.names = products['name'].astype(str).tolist()
+        categories = products['category'] if 'category' in products.columns else [None] * len(products)
+        self.labels = [f"{n} ({c})" if c else n for n, c in zip(self.names, categories)]
+        self.row_of = {int(pid): row for row, pid in enumerate(self.product_ids)}
+
+        postings = {}
+        for row, name in enumerate(self.names):
+            for token in set(tokenize(name)):
+                postings.setdefault(token, []).append(row)
+        self.tokens = sorted(postings)
+        self.postings = [np.array(postings[t], dtype=np.int32) for t in self.tokens]
+
+        self.barcodes, self.barcode_rows = [], np.empty(0, dtype=np.int32)
+        if 'barcode' in products.columns:
+            codes = products['barcode'].dropna().astype(str)
+            order = np.argsort(codes.to_numpy(), kind='stable')
+            self.barcodes = codes.to_numpy()[order].tolist()
+            self.barcode_rows = codes.index.to_numpy()[order].astype(np.int32)
+
+        self._rows_for_prefix = lru_cache(maxsize=4096)(self._rows_for_prefix_uncached)
+
+    def _rows_for_prefix_uncached(self, prefix):
+        """Rows whose name has a token starting with `prefix` (sorted, unique)."""
+        lo = bisect_left(self.tokens, prefix)
+        hi = bisect_left(self.tokens, prefix + "\uffff")
+        if lo == hi:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(self.postings[lo:hi]))
+
+    def _rows_for_barcode(self, prefix):
+        lo = bisect_left(self.barcodes, prefix)
+        hi = bisect_left(self.barcodes, prefix + "\uffff")
+        return np.sort(self.barcode_rows[lo:hi])
+
+    def search(self, query, limit=25):
+        """Product ids matching every typed word (as a prefix), in catalogue order."""
+        terms = tokenize(query)
+        if not terms:
+            rows = np.arange(min(limit, len(self.product_ids)))
+        elif len(terms) == 1 and terms[0].isdigit() and self.barcodes:
+            rows = np.union1d(self._rows_for_barcode(terms[0]), self._rows_for_prefix(terms[0]))
+        else:
+            rows = self._rows_for_prefix(terms[0])
+            for term in terms[1:]:
+                if len(rows) == 0:
+                    break
+                rows = np.intersect1d(rows, self._rows_for_prefix(term), assume_unique=True)
+        return [int(pid) for pid in self.product_ids[rows[:limit]]]
+
+    def label(self, product_id):
+        return self.labels[self.row_of[int(product_id)]]
+
+    def name(self, product_id):
+        return self.names[self.row_of[int(product_id)]]
+
+
+class StoreTable:
+    """One store's price and stock, sorted by product id for binary-search lookups."""
+
+    def __init__(self, df):
+        df = df.reindex(columns=['product_id', 'price', 'stock_quantity']).sort_values('product_id')
+        self.product_ids = df['product_id'].to_numpy(dtype=np.int64)
+        self.price = df['price'].to_numpy(dtype=float)
+        self.stock = df['stock_quantity'].to_numpy(dtype=np.int64)
+
+    def lookup(self, product_id):
+        """(price, stock) or None if the store does not carry the product."""
+        i = np.searchsorted(self.product_ids, product_id)
+        if i < len(self.product_ids) and self.product_ids[i] == product_id:
+            return float(self.price[i]), int(self.stock[i])
+        return None
+
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def get_product_index():
+    return ProductIndex(get_product_list())
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_store_table(store_id, version):
+    """Preloads a store's price/stock. Bump `version` after a sale to force a refresh."""
+    return StoreTable(run_query(
+        "SELECT product_id, price, stock_quantity FROM inventory WHERE store_id = %(sid)s",
+        {"sid": store_id},
+    ))
@@ -0,0 +1,88 @@
+"""
+Reorder-point / order-quantity engine with service-level safety stock.
+
+Prophet already gives us an uncertainty band (yhat_lower / yhat_upper) for
+every forecast day. We turn that band back into a daily standard deviation,
+accumulate it over the supplier lead time, and size safety stock for a
+target service level. Everything is array maths over the last axis (days),
+so one call covers the whole catalogue, or the whole chain when the
+forecasts are broadcast against a products x stores stock matrix.
+"""
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from forecasting import STORE_DIVIDER
+
+# Prophet's default uncertainty interval (interval_width=0.80)
+PROPHET_INTERVAL_WIDTH = 0.80
+
+
+def replenishment_policy(yhat, yhat_lower, yhat_upper, stock, lead_time_days=3, review_days=7,
+                         service_level=0.95, interval_width=PROPHET_INTERVAL_WIDTH, pack_size=1):
+    """
+    Computes safety stock, reorder point and order quantity.
+
+    yhat / yhat_lower / yhat_upper have days on the last axis; stock must
+    broadcast against their leading axes. Orders are placed when stock is at
+    or below the reorder point and bring it up to the order-up-to level,
+    rounded up to whole packs.
+    """
+    yhat = np.clip(np.asarray(yhat, dtype=float), 0, None)
+    horizon = yhat.shape[-1]
+    lead = int(np.clip(lead_time_days, 1, horizon))
+    protection = int(np.clip(lead_time_days + review_days, lead, horizon))
+
+    # Width of the Prophet band -> daily sigma (assuming a normal forecast error)
+    z_band = NormalDist().inv_cdf(0.5 + interval_width / 2)
+    sigma = np.clip(np.asarray(yhat_upper, dtype=float) - np.asarray(yhat_lower, dtype=float), 0, None) / (2 * z_band)
+    variance = np.cumsum(sigma ** 2, axis=-1)
+    demand = np.cumsum(yhat, axis=-1)
+
+    z = NormalDist().inv_cdf(service_level)
+    safety_stock = z * np.sqrt(variance[..., lead - 1])
+    reorder_point = demand[..., lead - 1] + safety_stock
+    order_up_to = demand[..., protection - 1] + z * np.sqrt(variance[..., protection - 1])
+
+    stock = np.asarray(stock, dtype=float)
+    needs_order = stock <= reorder_point
+    raw_qty = np.where(needs_order, np.maximum(order_up_to - stock, 0), 0)
+    order_qty = np.ceil(raw_qty / pack_size) * pack_size
+
+    return {
+        "safety_stock": np.ceil(safety_stock),
+        "reorder_point": np.ceil(reorder_point),
+        "order_up_to": np.ceil(order_up_to),
+        "order_qty": order_qty.astype(int),
+    }
+
+
+def plan_store(product_ids, yhat, yhat_lower, yhat_upper, stock, divider=1, **policy):
+    """One row per product for a single store (or the aggregated chain)."""
+    plan = replenishment_policy(yhat / divider, yhat_lower / divider, yhat_upper / divider, stock, **policy)
+    return pd.DataFrame({"product_id": product_ids, **plan})
+
+
+def plan_full_chain(product_ids, store_ids, yhat, yhat_lower, yhat_upper, stock_matrix, divider=STORE_DIVIDER, **policy):
+    """
+    One row per product x store that needs an order.
+
+    stock_matrix is (products x stores); the per-product forecasts are split
+    evenly across stores, as on the dashboard.
+    """
+    plan = replenishment_policy(
+        yhat[:, None, :] / divider,
+        yhat_lower[:, None, :] / divider,
+        yhat_upper[:, None, :] / divider,
+        stock_matrix,
+        **policy,
+    )
+    n_products, n_stores = stock_matrix.shape
+    df = pd.DataFrame({
+        "product_id": np.repeat(product_ids, n_stores),
+        "store_id": np.tile(store_ids, n_products),
+        "current_stock": np.asarray(stock_matrix).ravel(),
+        **{k: np.broadcast_to(v, stock_matrix.shape).ravel() for k, v in plan.items()},
+    })
+    return df[df['order_qty'] > 0].reset_index(drop=True)
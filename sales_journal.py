@@ -0,0 +1,388 @@
+"""
+Write-behind sales journal for the Digital Register.
+
+Checkout (see checkout()) checks and decrements the cart's stock in
+Postgres straight away, so an oversell is refused at the till, and commits
+the sale to a local SQLite file (an append-only journal). A background
+flusher drains the journal into Postgres in batches. Each batch is one
+Postgres transaction that
+
+  1. claims the batch's sale ids in `applied_sales` (ON CONFLICT DO NOTHING;
+     sales reserved at checkout are already there),
+  2. decrements stock for sales recorded while Postgres was unreachable,
+     clamped at zero (see stock_reservation.py), and
+  3. bulk-inserts the sales_history rows of every sale,
+
+so replaying a batch after a crash (e.g. the app died between the Postgres
+commit and marking the journal) never double-counts a sale.
+
+Only connection-level errors are retried. A batch that fails for any other
+reason (bad data, a constraint) is replayed one sale at a time, and the sale
+that fails is marked 'failed' with its error so it stops blocking the rest.
+
+Usage (manual replay of anything still pending):
+    python sales_journal.py --flush
+    python sales_journal.py --retry-failed   # requeue failed sales once the cause is fixed
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+import psycopg2
+import psycopg2.extras
+
+from stock_reservation import decrement_clamped, reserve_stock
+
+JOURNAL_PATH = "sales_journal.db"
+# Lost connection / server gone: worth retrying. Anything else won't fix itself.
+TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+APPLIED_SALES_DDL = """
+    CREATE TABLE IF NOT EXISTS applied_sales (
+        sale_uuid UUID PRIMARY KEY,
+        store_id INTEGER,
+        applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+    );
+    ALTER TABLE applied_sales ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'applied';
+    ALTER TABLE applied_sales ADD COLUMN IF NOT EXISTS detail TEXT;
+"""
+
+
+def ensure_schema(conn):
+    with conn.cursor() as cur:
+        cur.execute(APPLIED_SALES_DDL)
+    conn.commit()
+
+
+class SalesJournal:
+    """Local, crash-safe queue of completed sales waiting to reach Postgres."""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                sale_uuid TEXT UNIQUE NOT NULL,
+                store_id INTEGER NOT NULL,
+                created_at TEXT NOT NULL,
+                payment_mode TEXT,
+                items TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                applied_at TEXT,
+                detail TEXT,
+                reserved INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_journal_status ON journal (status, seq)")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(journal)")}
+        if "detail" not in columns:  # journals created before failures were recorded
+            self._db.execute("ALTER TABLE journal ADD COLUMN detail TEXT")
+        if "reserved" not in columns:  # ... or before checkouts reserved stock
+            self._db.execute("ALTER TABLE journal ADD COLUMN reserved INTEGER NOT NULL DEFAULT 0")
+
+    def record_sale(self, store_id, items, payment_mode=None, sale_uuid=None, reserved=False):
+        """
+        Durably records a sale; `items` is a list of {"id", "qty"} dicts. Returns the sale id.
+
+        `reserved` means the sale's stock is already decremented in Postgres
+        (see checkout()).
+        """
+        sale_uuid = sale_uuid or str(uuid.uuid4())
+        lines = [{"id": int(i["id"]), "qty": int(i["qty"])} for i in items]
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO journal (sale_uuid, store_id, created_at, payment_mode, items, reserved) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (sale_uuid, int(store_id), datetime.now().isoformat(), payment_mode, json.dumps(lines), int(reserved)),
+            )
+        return sale_uuid
+
+    def unreserve(self, sale_uuid):
+        """The reservation didn't commit: the sale's stock is decremented when it syncs instead."""
+        with self._lock:
+            self._db.execute("UPDATE journal SET reserved = 0 WHERE sale_uuid = ?", (sale_uuid,))
+
+    def pending(self, limit=500):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sale_uuid, store_id, created_at, items FROM journal WHERE status = 'pending' ORDER BY seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"sale_uuid": r[0], "store_id": r[1], "created_at": r[2], "items": json.loads(r[3])}
+            for r in rows
+        ]
+
+    def pending_quantities(self, store_id):
+        """Units per product sold at `store_id` whose stock isn't decremented in Postgres yet."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT items FROM journal WHERE status = 'pending' AND reserved = 0 AND store_id = ?",
+                (int(store_id),),
+            ).fetchall()
+        totals = {}
+        for (items,) in rows:
+            for item in json.loads(items):
+                totals[item["id"]] = totals.get(item["id"], 0) + item["qty"]
+        return totals
+
+    def mark(self, sale_uuids, status, detail=None):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE journal SET status = ?, applied_at = ?, detail = ? WHERE sale_uuid = ?",
+                [(status, datetime.now().isoformat(), detail, u) for u in sale_uuids],
+            )
+
+    def failed(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sale_uuid, store_id, created_at, detail FROM journal WHERE status = 'failed' ORDER BY seq"
+            ).fetchall()
+        return [{"sale_uuid": r[0], "store_id": r[1], "created_at": r[2], "detail": r[3]} for r in rows]
+
+    def retry_failed(self):
+        """Puts failed sales back in the queue (after the data problem has been fixed)."""
+        with self._lock:
+            return self._db.execute(
+                "UPDATE journal SET status = 'pending', applied_at = NULL, detail = NULL WHERE status = 'failed'"
+            ).rowcount
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM journal GROUP BY status").fetchall()
+        return dict(rows)
+
+
+def checkout(journal, conn, store_id, items, payment_mode=None):
+    """
+    Completes a sale at the till: the cart is checked against stock and
+    decremented in Postgres now, while the customer is still there.
+
+    Returns (outcome, sale_uuid, short):
+      "reserved"  stock decremented and the sale journaled (the flusher only
+                  adds its sales_history rows)
+      "refused"   not enough stock; nothing is recorded and `short` lists
+                  (product_id, requested, available)
+      "offline"   Postgres is unreachable; the sale is journaled and its
+                  stock is decremented when it syncs
+    The journal entry is written before the Postgres commit, so a crash or a
+    failed commit leaves a pending sale that the flusher applies normally.
+
+    `conn` must belong to this till alone (not the shared init_connection()):
+    the transaction holds row locks and is committed or rolled back here, and
+    every path that doesn't commit rolls back.
+    """
+    sale_uuid = str(uuid.uuid4())
+    journaled, committed = False, False
+    try:
+        if conn is None or conn.closed:
+            raise psycopg2.OperationalError("no database connection")
+        with conn.cursor() as cur:
+            ok, short = reserve_stock(cur, store_id, items)
+            if not ok:
+                return "refused", None, short
+            cur.execute(
+                "INSERT INTO applied_sales (sale_uuid, store_id, status) VALUES (%s, %s, 'reserved')",
+                (sale_uuid, int(store_id)),
+            )
+        journal.record_sale(store_id, items, payment_mode, sale_uuid=sale_uuid, reserved=True)
+        journaled = True
+        conn.commit()
+        committed = True
+        return "reserved", sale_uuid, []
+    except TRANSIENT_ERRORS:
+        if journaled:
+            journal.unreserve(sale_uuid)  # the commit failed
+        else:
+            journal.record_sale(store_id, items, payment_mode, sale_uuid=sale_uuid)
+        return "offline", sale_uuid, []
+    finally:
+        if not committed and conn is not None and not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass  # connection already broken; the server drops the transaction and its locks
+
+
+def apply_batch(conn, sales):
+    """
+    Applies a batch of journal entries to Postgres in one idempotent transaction.
+
+    Every sale reaches sales_history: it has already happened at the till.
+    Sales reserved at checkout only need that. Sales recorded while Postgres
+    was unreachable get their stock decremented now, clamped at zero; one
+    that sold more than the stock on record is kept but flagged 'oversold'
+    (stock on record disagrees with the shelf) for a manager to recount.
+    Returns {sale_uuid: status}.
+    """
+    outcome, oversold = {}, []
+    ids = [s["sale_uuid"] for s in sales]
+    with conn.cursor() as cur:
+        # 1. Claim the sale ids; ones reserved at checkout or handled by an earlier (crashed) flush come back empty
+        claimed = psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO applied_sales (sale_uuid, store_id) VALUES %s ON CONFLICT DO NOTHING RETURNING sale_uuid",
+            [(s["sale_uuid"], s["store_id"]) for s in sales],
+            fetch=True,
+        )
+        new_ids = {str(r[0]) for r in claimed}
+        cur.execute(
+            """
+            UPDATE applied_sales SET status = 'applied', applied_at = NOW()
+            WHERE sale_uuid = ANY(%s::uuid[]) AND status = 'reserved'
+            RETURNING sale_uuid
+            """,
+            ([i for i in ids if i not in new_ids],),
+        )
+        reserved_ids = {str(r[0]) for r in cur.fetchall()}
+        # Replayed ids keep the outcome stored by the flush that claimed them
+        replayed = [i for i in ids if i not in new_ids and i not in reserved_ids]
+        stored = {}
+        if replayed:
+            cur.execute("SELECT sale_uuid, status FROM applied_sales WHERE sale_uuid = ANY(%s::uuid[])", (replayed,))
+            stored = {str(sale_uuid): status for sale_uuid, status in cur.fetchall()}
+
+        # 2. Stock for sales that weren't reserved, then coalesce the lines per (day, store, product)
+        totals = {}
+        for sale in sales:
+            sale_uuid = sale["sale_uuid"]
+            if sale_uuid in stored:
+                outcome[sale_uuid] = stored[sale_uuid]
+                continue
+            outcome[sale_uuid] = "applied"
+            if sale_uuid in new_ids:
+                short = decrement_clamped(cur, sale["store_id"], sale["items"])
+                if short:
+                    outcome[sale_uuid] = "oversold"
+                    oversold.append((sale_uuid, json.dumps(short)))
+            sale_date = sale["created_at"][:10]
+            for item in sale["items"]:
+                key = (sale_date, sale["store_id"], item["id"])
+                totals[key] = totals.get(key, 0) + item["qty"]
+
+        if totals:
+            psycopg2.extras.execute_values(
+                cur,
+                "INSERT INTO sales_history (sale_date, store_id, product_id, quantity_sold, on_sale) VALUES %s",
+                [(d, s, p, q, 0) for (d, s, p), q in totals.items()],
+            )
+        if oversold:
+            psycopg2.extras.execute_values(
+                cur,
+                """
+                UPDATE applied_sales a SET status = 'oversold', detail = r.detail
+                FROM (VALUES %s) AS r(sale_uuid, detail)
+                WHERE a.sale_uuid = r.sale_uuid::uuid
+                """,
+                oversold,
+            )
+    conn.commit()
+    return outcome
+
+
+class JournalFlusher(threading.Thread):
+    """Background thread that drains the journal into Postgres every `interval` seconds."""
+
+    def __init__(self, journal, connect, interval=1.0, batch_size=500):
+        super().__init__(daemon=True, name="sales-journal-flusher")
+        self.journal = journal
+        self.connect = connect
+        self.interval = interval
+        self.batch_size = batch_size
+        self.last_error = None
+        self._wake = threading.Event()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = self.connect()
+            ensure_schema(self._conn)
+        return self._conn
+
+    def flush_once(self):
+        """Applies everything pending (in batches). Returns the number of sales applied."""
+        applied_total = 0
+        while True:
+            batch = self.journal.pending(self.batch_size)
+            if not batch:
+                return applied_total
+            conn = self._connection()
+            try:
+                outcome = apply_batch(conn, batch)
+            except TRANSIENT_ERRORS:
+                raise
+            except Exception:
+                conn.rollback()
+                outcome = self._apply_one_by_one(conn, batch)
+            by_status = {}
+            for sale_uuid, status in outcome.items():
+                by_status.setdefault(status, []).append(sale_uuid)
+            for status, sale_uuids in by_status.items():
+                self.journal.mark(sale_uuids, status)
+            applied_total += len(outcome) - len(by_status.get("rejected", []))
+
+    def _apply_one_by_one(self, conn, batch):
+        """Isolates the sale(s) that made a batch fail; each one is marked 'failed' with its error."""
+        outcome = {}
+        for sale in batch:
+            try:
+                outcome.update(apply_batch(conn, [sale]))
+            except TRANSIENT_ERRORS:
+                raise
+            except Exception as e:
+                conn.rollback()
+                self.journal.mark([sale["sale_uuid"]], "failed", f"{type(e).__name__}: {e}")
+        return outcome
+
+    def wake(self):
+        """Flush now instead of waiting for the next tick (e.g. right after a checkout)."""
+        self._wake.set()
+
+    def run(self):
+        while True:
+            try:
+                self.flush_once()
+                self.last_error = None
+            except TRANSIENT_ERRORS as e:
+                # Network blip / DB down: sales stay in the journal and are retried next tick
+                self.last_error = str(e)
+                if self._conn is not None and not self._conn.closed:
+                    self._conn.close()
+                self._conn = None
+            except Exception as e:
+                # e.g. the local journal itself; pending sales stay where they are
+                self.last_error = str(e)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay the local sales journal.")
+    parser.add_argument("--path", default=JOURNAL_PATH)
+    parser.add_argument("--flush", action="store_true", help="Apply all pending sales to Postgres now")
+    parser.add_argument("--retry-failed", action="store_true", help="Requeue sales that failed with a data error")
+    args = parser.parse_args()
+
+    from db import new_connection
+
+    journal = SalesJournal(args.path)
+    print(f"Journal '{args.path}': {journal.stats()}")
+    for sale in journal.failed():
+        print(f"  failed {sale['sale_uuid']} (store {sale['store_id']}, {sale['created_at']}): {sale['detail']}")
+    if args.retry_failed:
+        print(f"Requeued {journal.retry_failed()} failed sales.")
+    if args.flush:
+        flusher = JournalFlusher(journal, new_connection)
+        print(f"Applied {flusher.flush_once()} pending sales.")
+        print(f"Journal '{args.path}': {journal.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Background precompute scheduler.
+
+Runs the expensive work ahead of time so that pages only read precomputed
+artifacts (see artifacts.py) instead of computing them for the first user
+after a restart or cache clear:
+
+  snapshot   hourly, and when new sales arrive: incremental Parquet rollup of
+             sales and trends (snapshot.py)
+  retrain    nightly: retrains every Prophet model (train_all_models.py, in a
+             subprocess, from the snapshot when there is one)
+  forecasts  every morning and after a retrain: 14-day forecasts for every
+             product, published as the "forecasts" artifact and recorded in
+             forecast_history
+  static     every 10 minutes, and when the catalogue changes: products,
+             stores, the trend keyword map and the category list, published
+             as the "static" artifact
+  accuracy   hourly, and after forecasts / new sales: fills in actuals on the
+             recorded forecast history and prunes old runs (forecast_history.py)
+  health     hourly, and after forecasts / stock changes: the Business Health
+             payload of every product x store (health_payloads.py), published
+             as the "health" artifact
+
+A job also runs at once if its artifact has never been published. Jobs run
+one at a time in this process; each run's duration and outcome is recorded
+in artifacts/_status.json, which the ⏱️ Scheduler page shows.
+
+Usage:
+    python scheduler.py                      # run forever
+    python scheduler.py --once static forecasts
+    python scheduler.py --list
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import forecast_history
+import health_payloads
+from artifacts import artifact_version, publish, read_artifact, read_status, write_status
+from db import new_connection, read_static_data
+
+HISTORY_RUNS = 50
+RETRY_SECONDS = 600  # a failed job waits this long before it is retried
+
+
+# --- Jobs ---
+def job_snapshot(conn):
+    import snapshot
+    snapshot.sync(conn)
+    return "snapshot synced"
+
+
+def job_retrain(conn):
+    import snapshot
+    args = ["--from-snapshot"] if os.path.exists(os.path.join(snapshot.SNAPSHOT_DIR, "sales_history")) else ["--stream"]
+    result = subprocess.run([sys.executable, "train_all_models.py", *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"train_all_models.py exited with {result.returncode}: {result.stderr.strip()[-500:]}")
+    return f"retrained ({' '.join(args)})"
+
+
+def job_forecasts(conn):
+    from forecasting import forecast_all_products, load_prophet_model
+    static = read_static_data(conn)
+    conn.rollback()
+    load_prophet_model.clear()  # pick up models written by a retrain since the last run
+    forecasts = forecast_all_products(static["products"], static["trend_map"])
+    publish("forecasts", {"forecasts": forecasts, "horizon": 14})
+    rows = forecast_history.record_run(conn, forecasts, static["stores"]["store_id"].tolist())
+    return f"{len(forecasts)} products forecast, {rows:,} history rows"
+
+
+def job_forecast_accuracy(conn):
+    filled = forecast_history.fill_actuals(conn)
+    dropped, deleted = forecast_history.prune(conn)
+    return f"{filled:,} actuals filled, {len(dropped)} partitions / {deleted:,} rows pruned"
+
+
+def job_static(conn):
+    static = read_static_data(conn)
+    conn.rollback()
+    publish("static", static)
+    return f"{len(static['products'])} products, {len(static['stores'])} stores"
+
+
+def job_health(conn):
+    published = read_artifact("forecasts")
+    if published is None:
+        raise RuntimeError("no published forecasts yet")
+    products, scopes = health_payloads.build_and_publish(conn, published["forecasts"])
+    return f"{products} products x {scopes} scopes"
+
+
+CATALOGUE_WATCH = """
+    SELECT (SELECT COUNT(*) FROM products WHERE active), (SELECT MAX(product_id) FROM products),
+           (SELECT COUNT(*) FROM stores), (SELECT COUNT(*) FROM product_trend_mapping)
+"""
+SALES_WATCH = "SELECT MAX(sale_id) FROM sales_history"
+INVENTORY_WATCH = "SELECT COUNT(*), SUM(stock_quantity), SUM(price), (SELECT MAX(sale_id) FROM sales_history) FROM inventory"
+
+# name -> schedule. at: daily "HH:MM"; every: seconds; watch: SQL whose result changing means
+# "run again" (at most every min_interval seconds); after: run when one of these jobs succeeds;
+# artifact: published by the job
+JOBS = {
+    "snapshot": {"run": job_snapshot, "every": 3600, "watch": SALES_WATCH, "min_interval": 900},
+    "retrain": {"run": job_retrain, "at": "02:00"},
+    "forecasts": {"run": job_forecasts, "at": "06:00", "after": ["retrain"], "artifact": "forecasts"},
+    "static": {"run": job_static, "every": 600, "watch": CATALOGUE_WATCH, "artifact": "static"},
+    "accuracy": {"run": job_forecast_accuracy, "every": 3600, "after": ["forecasts"], "watch": SALES_WATCH,
+                 "min_interval": 900},
+    "health": {"run": job_health, "every": 3600, "after": ["forecasts"], "watch": INVENTORY_WATCH,
+               "min_interval": 300, "artifact": "health"},
+}
+
+
+# --- Scheduling ---
+def _parse(ts):
+    return datetime.fromisoformat(ts) if ts else None
+
+
+def fingerprint(conn, job):
+    if "watch" not in job:
+        return None
+    with conn.cursor() as cur:
+        cur.execute(job["watch"])
+        value = repr(cur.fetchone())
+    conn.rollback()
+    return value
+
+
+def due_reason(name, job, jobs_state, now, started_at, current_fingerprint):
+    """Why `name` should run now, or None."""
+    state = jobs_state.get(name, {})
+    last = _parse(state.get("last_started"))
+
+    if state.get("last_status") == "failed" and (now - last).total_seconds() < RETRY_SECONDS:
+        return None
+    if job.get("artifact") and artifact_version(job["artifact"]) is None:
+        return "artifact missing"
+    for upstream in job.get("after", []):
+        finished = _parse(jobs_state.get(upstream, {}).get("last_success"))
+        if finished and (last is None or finished > last):
+            return f"after {upstream}"
+    if "every" in job and (last is None or (now - last).total_seconds() >= job["every"]):
+        return "interval"
+    if "at" in job:
+        hour, minute = map(int, job["at"].split(":"))
+        scheduled = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if scheduled > now:
+            scheduled -= timedelta(days=1)
+        # A daily job waits for its first slot after the scheduler starts
+        if scheduled > (last or started_at):
+            return f"daily {job['at']}"
+    if current_fingerprint is not None and current_fingerprint != state.get("fingerprint"):
+        # Busy tables change all the time; min_interval stops that from meaning "run every poll"
+        if last is None or (now - last).total_seconds() >= job.get("min_interval", 0):
+            return "data changed"
+    return None
+
+
+def run_job(conn, name, job, status, reason, current_fingerprint=None):
+    """Runs one job and records its duration/outcome in `status` (and on disk). Returns True on success."""
+    state = status.setdefault("jobs", {}).setdefault(name, {})
+    started = datetime.now()
+    state["last_started"] = started.isoformat(timespec="seconds")
+    write_status(status)
+    print(f"[{started:%H:%M:%S}] {name}: starting ({reason})")
+
+    start = time.perf_counter()
+    try:
+        summary = job["run"](conn)
+        ok, error = True, None
+    except Exception as e:
+        conn.rollback()
+        summary, ok, error = None, False, f"{e}\n{traceback.format_exc(limit=3)}"
+    duration = time.perf_counter() - start
+
+    finished = datetime.now().isoformat(timespec="seconds")
+    state.update({
+        "last_finished": finished,
+        "last_duration_s": round(duration, 2),
+        "last_status": "ok" if ok else "failed",
+        "last_summary": summary,
+        "last_error": error,
+        "last_reason": reason,
+    })
+    if ok:
+        state["last_success"] = finished
+        if current_fingerprint is not None:
+            state["fingerprint"] = current_fingerprint
+    runs = state.setdefault("runs", [])
+    runs.append({"started": state["last_started"], "duration_s": round(duration, 2), "status": state["last_status"]})
+    del runs[:-HISTORY_RUNS]
+    write_status(status)
+
+    print(f"[{datetime.now():%H:%M:%S}] {name}: {'done' if ok else 'FAILED'} in {duration:.1f}s"
+          + (f" ({summary})" if ok else f"\n{error}"))
+    return ok
+
+
+def run_forever(poll_seconds=60):
+    status = read_status()
+    started_at = datetime.now()
+    status["scheduler"] = {"pid": os.getpid(), "started_at": started_at.isoformat(timespec="seconds")}
+    conn = None
+    print(f"Scheduler started with jobs: {', '.join(JOBS)} (poll every {poll_seconds}s)")
+    while True:
+        try:
+            if conn is None or conn.closed:
+                conn = new_connection()
+            for name, job in JOBS.items():
+                current = fingerprint(conn, job)
+                reason = due_reason(name, job, status.get("jobs", {}), datetime.now(), started_at, current)
+                if reason:
+                    run_job(conn, name, job, status, reason, current)
+        except Exception as e:
+            # Lost the database: drop the connection and retry on the next poll
+            print(f"Scheduler error: {e}")
+            if conn is not None and not conn.closed:
+                conn.close()
+            conn = None
+        status["scheduler"]["heartbeat"] = datetime.now().isoformat(timespec="seconds")
+        write_status(status)
+        time.sleep(poll_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute forecasts, rollups and caches in the background.")
+    parser.add_argument("--once", nargs="+", metavar="JOB", help="Run these jobs now and exit")
+    parser.add_argument("--list", action="store_true", help="Show the jobs and their last runs")
+    parser.add_argument("--poll", type=int, default=60, help="Seconds between schedule checks")
+    args = parser.parse_args()
+
+    if args.list:
+        jobs_state = read_status().get("jobs", {})
+        for name, job in JOBS.items():
+            state = jobs_state.get(name, {})
+            when = f"daily {job['at']}" if "at" in job else f"every {job['every']}s"
+            print(f"{name:<10} {when:<14} last: {state.get('last_started', 'never')} "
+                  f"{state.get('last_status', '')} {state.get('last_duration_s', '')}")
+        return
+
+    if args.once:
+        unknown = set(args.once) - set(JOBS)
+        if unknown:
+            parser.error(f"unknown job(s): {', '.join(sorted(unknown))} (choose from {', '.join(JOBS)})")
+        status = read_status()
+        conn = new_connection()
+        try:
+            failed = [name for name in args.once if not run_job(conn, name, JOBS[name], status, "manual",
+                                                                fingerprint(conn, JOBS[name]))]
+        finally:
+            conn.close()
+        sys.exit(1 if failed else 0)
+
+    run_forever(args.poll)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,24 @@
--- Drop tables if they already exist, so we can re-run this file
-DROP TABLE IF EXISTS inventory;
-DROP TABLE IF EXISTS products;
-DROP TABLE IF EXISTS stores;
+-- Safe to re-run: existing tables (and their stock) are left alone.
+-- Refresh the catalogue with `python sync_catalogue.py`, not by re-creating tables.
 
 -- Table for the physical stores
-CREATE TABLE stores (
+CREATE TABLE IF NOT EXISTS stores (
     store_id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     address VARCHAR(255)
 );
 
 -- Table for all the products we might sell
-CREATE TABLE products (
+CREATE TABLE IF NOT EXISTS products (
     product_id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
-    category VARCHAR(255)
+    category VARCHAR(255),
+    barcode VARCHAR(64) UNIQUE,
+    active BOOLEAN NOT NULL DEFAULT TRUE  -- FALSE = soft-deleted (dropped from the catalogue)
 );
 
 -- This is the "linking" table. It connects stores and products.
-CREATE TABLE inventory (
+CREATE TABLE IF NOT EXISTS inventory (
     inventory_id SERIAL PRIMARY KEY,
     store_id INTEGER NOT NULL,
     product_id INTEGER NOT NULL,
@@ -31,4 +31,14 @@ CREATE TABLE inventory (
 
     -- Ensure a store can't list the same product twice
     UNIQUE(store_id, product_id)
-);
\ No newline at end of file
+);
+
+-- Databases created before barcodes / soft deletes: the CREATE TABLE above leaves them as they were
+ALTER TABLE products ADD COLUMN IF NOT EXISTS barcode VARCHAR(64) UNIQUE;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS active BOOLEAN NOT NULL DEFAULT TRUE;
+
+-- Indexes for the Stock Room's keyset pagination (filter by store, sort by qty or name)
+CREATE INDEX IF NOT EXISTS idx_inventory_store_qty ON inventory (store_id, stock_quantity, product_id);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products (category);
+CREATE INDEX IF NOT EXISTS idx_products_name ON products (name, product_id);
+CREATE INDEX IF NOT EXISTS idx_products_natural_key ON products ((COALESCE('b:' || barcode, 'n:' || name)));
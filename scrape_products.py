@@ -1,58 +1,233 @@
+"""
+Product catalogue ingester for Open Food Facts.
+
+Fetches catalogue pages concurrently (a bounded thread pool, one pooled
+requests.Session per worker, timeouts and retries), dedupes products by
+barcode (or by name when a product has none) and appends each finished
+page to products.csv straight away. A checkpoint file records the pages
+already done, so a run that fails at page 9 resumes at page 9 instead of
+starting over. With --to-db every page is also upserted into `products`
+as it arrives.
+
+To test without hitting the real site, record some pages once and serve
+them locally:
+    python scrape_products.py --record recorded_pages/
+    python -m http.server 8000 --directory recorded_pages/
+    python scrape_products.py --base-url http://localhost:8000 --fresh
+
+Usage:
+    python scrape_products.py                      # pages 2-11 (resumes if interrupted)
+    python scrape_products.py --end 2000 --workers 16 --to-db
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-print("Starting product scrape...")
+BASE_URL = "https://world.openfoodfacts.org"
+OUTPUT = "products.csv"
+CHECKPOINT = "scrape_checkpoint.json"
+FIELDS = ["barcode", "name", "category"]
 
-products_list = []
-for i in range(2, 12): # This loops from 1 to 5
+_local = threading.local()
 
-    # --- THIS IS THE FIX ---
+
+def get_session(timeout_retries=3):
+    """One pooled Session per worker thread (requests.Session is not thread-safe)."""
+    if not hasattr(_local, "session"):
+        session = requests.Session()
+        retry = Retry(total=timeout_retries, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        session.mount("http://", HTTPAdapter(max_retries=retry))
+        session.mount("https://", HTTPAdapter(max_retries=retry))
+        session.headers["User-Agent"] = "LocalLens-catalogue-ingest/1.0"
+        _local.session = session
+    return _local.session
+
+
+def fetch_page(base_url, page, timeout=15, record_dir=None):
+    """Downloads one catalogue page and returns its raw product dicts."""
     # We get the JSON data endpoint instead of the HTML page
-    URL = f"https://world.openfoodfacts.org/{i}.json"
-    print(f"Scraping page {i}: {URL}")
+    response = get_session().get(f"{base_url.rstrip('/')}/{page}.json", timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if record_dir:
+        with open(os.path.join(record_dir, f"{page}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    if "products" not in data:
+        print(f"Warning: 'products' key not found on page {page}")
+    return data.get("products", [])
+
+
+def clean_product(product):
+    # We use .get() to avoid errors if a key is missing; empty strings count as missing too
+    return {
+        "barcode": (product.get("code") or "").strip() or None,
+        "name": (product.get("product_name") or "").strip() or "Unknown Name",
+        # The categories are in a single string, e.g., "Snacks, Sweet snacks"
+        "category": (product.get("categories") or "").strip() or "Uncategorized",
+    }
+
+
+def dedupe_key(product):
+    return ("code", product["barcode"]) if product["barcode"] else ("name", product["name"].lower())
+
+
+# --- Checkpoint ---
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return set(json.load(f).get("done_pages", []))
+    return set()
+
+
+def save_checkpoint(path, done_pages):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    with open(path + ".tmp", "w") as f:
+        json.dump({"done_pages": sorted(done_pages)}, f)
+    os.replace(path + ".tmp", path)
+
+
+def load_seen(output):
+    """Dedupe keys of everything already in products.csv (from earlier, interrupted runs)."""
+    seen = set()
+    if os.path.exists(output):
+        with open(output, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames and reader.fieldnames != FIELDS:
+                raise SystemExit(f"'{output}' has columns {reader.fieldnames}, expected {FIELDS}. "
+                                 f"Re-run with --fresh to start a new catalogue.")
+            for row in reader:
+                seen.add(dedupe_key({"barcode": row.get("barcode") or None, "name": row["name"]}))
+    return seen
+
+
+# --- Database ---
+def upsert_products(conn, products):
+    """Upserts a page of products: barcoded ones by barcode, the rest only if the name is new."""
+    import psycopg2.extras
+
+    with conn.cursor() as cur:
+        with_code = [(p["barcode"], p["name"], p["category"]) for p in products if p["barcode"]]
+        without_code = [(p["name"], p["category"]) for p in products if not p["barcode"]]
+        if with_code:
+            psycopg2.extras.execute_values(cur, """
+                INSERT INTO products (barcode, name, category) VALUES %s
+                ON CONFLICT (barcode) DO UPDATE SET name = EXCLUDED.name, category = EXCLUDED.category
+            """, with_code)
+        if without_code:
+            psycopg2.extras.execute_values(cur, """
+                INSERT INTO products (name, category)
+                SELECT v.name, v.category FROM (VALUES %s) AS v(name, category)
+                WHERE NOT EXISTS (SELECT 1 FROM products p WHERE p.name = v.name)
+            """, without_code)
+    conn.commit()
+
+
+def ingest(pages, base_url=BASE_URL, workers=8, timeout=15, output=OUTPUT, checkpoint=CHECKPOINT,
+           conn=None, record_dir=None):
+    """Fetches `pages` concurrently, appending new products to `output` page by page. Returns a summary."""
+    done = load_checkpoint(checkpoint)
+    todo = [p for p in pages if p not in done]
+    seen = load_seen(output)
+    if done:
+        print(f"Resuming: {len(done)} pages already done, {len(todo)} to go.")
+
+    new_file = not os.path.exists(output)
+    stats = {"pages": 0, "failed": [], "fetched": 0, "new": 0, "duplicates": 0}
+    with open(output, "a", newline="", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if new_file:
+            writer.writeheader()
+
+        # Keep at most 2x `workers` pages in flight so thousands of pages don't pile up in memory
+        pending, queue = {}, iter(todo)
+        for page in queue:
+            pending[pool.submit(fetch_page, base_url, page, timeout, record_dir)] = page
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            future = next(as_completed(pending))
+            page = pending.pop(future)
+            try:
+                raw = future.result()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Error fetching page {page}: {e}")
+                stats["failed"].append(page)
+            else:
+                fresh = []
+                for product in map(clean_product, raw):
+                    key = dedupe_key(product)
+                    if key in seen:
+                        stats["duplicates"] += 1
+                        continue
+                    seen.add(key)
+                    fresh.append(product)
+                # DB first: the upsert is idempotent, so a crash before the CSV/checkpoint write just redoes it
+                if conn is not None and fresh:
+                    upsert_products(conn, fresh)
+                writer.writerows(fresh)
+                f.flush()
+                done.add(page)
+                save_checkpoint(checkpoint, done)
+                stats["pages"] += 1
+                stats["fetched"] += len(raw)
+                stats["new"] += len(fresh)
+                print(f"Page {page}: {len(raw)} products, {len(fresh)} new")
+            for page in queue:
+                pending[pool.submit(fetch_page, base_url, page, timeout, record_dir)] = page
+                break
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape the Open Food Facts catalogue into products.csv.")
+    parser.add_argument("--start", type=int, default=2, help="First page")
+    parser.add_argument("--end", type=int, default=11, help="Last page (inclusive)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent page fetches")
+    parser.add_argument("--timeout", type=float, default=15, help="Per-request timeout (seconds)")
+    parser.add_argument("--base-url", default=BASE_URL, help="Catalogue host, e.g. a local stub server")
+    parser.add_argument("--output", default=OUTPUT)
+    parser.add_argument("--checkpoint", default=CHECKPOINT)
+    parser.add_argument("--fresh", action="store_true", help="Ignore the checkpoint and start a new products.csv")
+    parser.add_argument("--to-db", action="store_true", help="Also upsert each page into the products table")
+    parser.add_argument("--record", default=None, metavar="DIR", help="Save each raw page's JSON into DIR")
+    args = parser.parse_args()
+
+    print("Starting product scrape...")
+    if args.fresh:
+        for path in (args.output, args.checkpoint):
+            if os.path.exists(path):
+                os.remove(path)
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+
+    conn = None
+    if args.to_db:
+        from db import new_connection
+        conn = new_connection()
+        with conn.cursor() as cur:
+            cur.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS barcode VARCHAR(64) UNIQUE")
+        conn.commit()
 
     try:
-        # 1. Send the request
-        page = requests.get(URL)
-        page.raise_for_status() # This will raise an error if the page request fails
-
-        # 2. Parse the JSON data
-        # .json() is a built-in requests method
-        data = page.json()
-
-        # 3. Check if the 'products' key exists
-        if "products" in data:
-            
-            # 4. Loop through each product in the 'products' list
-            for product in data["products"]:
-                
-                # 5. Extract the data by key
-                # We use .get() to avoid errors if a key is missing
-                product_name = product.get("product_name", "Unknown Name")
-                
-                # The categories are in a single string, e.g., "Snacks, Sweet snacks"
-                product_category = product.get("categories", "Uncategorized")
-
-                # Handle cases where product_name might be an empty string
-                if not product_name:
-                    product_name = "Unknown Name"
-
-                # 6. Add our findings to our master list
-                products_list.append({
-                    "name": product_name,
-                    "category": product_category
-                })
-        else:
-            print(f"Warning: 'products' key not found on page {i}")
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching page {i}: {e}")
-    except requests.exceptions.JSONDecodeError:
-        print(f"Error decoding JSON from page {i}. The page might be empty or not valid JSON.")
-
-
-# 7. Save to a CSV file
-df = pd.DataFrame(products_list)
-df.to_csv("products.csv", index=False)
-
-print(f"Done! Scraped {len(df)} products and saved to products.csv")
\ No newline at end of file
+        stats = ingest(range(args.start, args.end + 1), base_url=args.base_url, workers=args.workers,
+                       timeout=args.timeout, output=args.output, checkpoint=args.checkpoint,
+                       conn=conn, record_dir=args.record)
+    finally:
+        if conn is not None:
+            conn.close()
+
+    print(f"Done! {stats['pages']} pages, {stats['fetched']} products fetched, {stats['new']} new "
+          f"({stats['duplicates']} duplicates skipped); catalogue in {args.output}")
+    if stats["failed"]:
+        print(f"⚠️ {len(stats['failed'])} pages failed: {sorted(stats['failed'])}. Re-run to retry just those.")
+
+
+if __name__ == "__main__":
+    main()
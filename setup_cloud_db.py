@@ -1,7 +1,8 @@
+import argparse
 import psycopg2
 from db import init_connection
 
-def create_tables():
+def create_tables(reset=False):
     print("Connecting to Cloud Database...")
     conn = init_connection()
     
@@ -13,25 +14,30 @@ def create_tables():
     
     print("Creating tables...")
     
-    # This SQL matches your original schema.sql
-    schema_sql = """
+    # Dropping wipes all stock and history; only done when explicitly asked for
+    reset_sql = """
     DROP TABLE IF EXISTS inventory CASCADE;
     DROP TABLE IF EXISTS products CASCADE;
     DROP TABLE IF EXISTS stores CASCADE;
-    
-    CREATE TABLE stores (
+    """
+
+    # This SQL matches your original schema.sql
+    schema_sql = """
+    CREATE TABLE IF NOT EXISTS stores (
         store_id SERIAL PRIMARY KEY,
         name VARCHAR(255) NOT NULL,
         address VARCHAR(255)
     );
     
-    CREATE TABLE products (
+    CREATE TABLE IF NOT EXISTS products (
         product_id SERIAL PRIMARY KEY,
         name VARCHAR(255) NOT NULL,
-        category VARCHAR(100)
+        category VARCHAR(100),
+        barcode VARCHAR(64) UNIQUE,
+        active BOOLEAN NOT NULL DEFAULT TRUE
     );
     
-    CREATE TABLE inventory (
+    CREATE TABLE IF NOT EXISTS inventory (
         inventory_id SERIAL PRIMARY KEY,
         store_id INTEGER NOT NULL,
         product_id INTEGER NOT NULL,
@@ -41,9 +47,21 @@ def create_tables():
         FOREIGN KEY (product_id) REFERENCES products(product_id),
         UNIQUE(store_id, product_id)
     );
+
+    -- Existing databases: CREATE TABLE IF NOT EXISTS leaves an older products table as it was
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS barcode VARCHAR(64) UNIQUE;
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS active BOOLEAN NOT NULL DEFAULT TRUE;
+
+    CREATE INDEX IF NOT EXISTS idx_inventory_store_qty ON inventory (store_id, stock_quantity, product_id);
+    CREATE INDEX IF NOT EXISTS idx_products_category ON products (category);
+    CREATE INDEX IF NOT EXISTS idx_products_name ON products (name, product_id);
+    CREATE INDEX IF NOT EXISTS idx_products_natural_key ON products ((COALESCE('b:' || barcode, 'n:' || name)));
     """
     
     try:
+        if reset:
+            print("⚠️ --reset: dropping existing tables...")
+            cursor.execute(reset_sql)
         cursor.execute(schema_sql)
         conn.commit()
         print("✅ Tables created successfully!")
@@ -55,4 +73,6 @@ def create_tables():
         conn.close()
 
 if __name__ == "__main__":
-    create_tables()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create the Local Lens tables (existing ones are kept).")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables (deletes all data!)")
+    create_tables(reset=parser.parse_args().reset)
\ No newline at end of file
@@ -3,13 +3,13 @@ import numpy as np
 import psycopg2
 import psycopg2.extras 
 from db import init_connection # We'll re-use our connection function!
+from trend_alignment import TrendMatrix
+from trend_mapping import KeywordMatcher
 import random
 from io import StringIO
 
 print("Starting smart sales simulation...")
 
-product_trend_map = [] 
-
 # --- 1. Load Data ---
 try:
     # Read the CSV and tell pandas the date format
@@ -41,9 +41,15 @@ if products_df.empty or stores_df.empty:
 # ---------------------
 
 # --- 2. Create Date Range ---
+# Expand every keyword's weekly trend to daily once, instead of once per product per store
+trend_matrix = TrendMatrix(trends_df.reset_index())
 start_date = trends_df.index.min()
 end_date = trends_df.index.max()
-dates = pd.date_range(start=start_date, end=end_date, freq='D')
+dates = trend_matrix.dates
+
+# Match every product to its trend keyword once (token index, see trend_mapping.py)
+keyword_for = KeywordMatcher(trends_df['keyword'].unique()).match_all(products_df)
+product_trend_map = list(keyword_for.items())
 
 print(f"Generating sales data from {start_date} to {end_date}...")
 
@@ -68,18 +74,11 @@ for store_id in stores_df['store_id']:
         seasonality = (np.sin(2 * np.pi * (day_of_year - 90) / days_in_year) + 1) * 10
 
         # 3. Add Google Trend influence
-        matching_keyword = None
-        for keyword in trends_df['keyword'].unique():
-            if all(word.lower() in product_name.lower() for word in keyword.lower().split()):
-                matching_keyword = keyword
-                break
+        matching_keyword = keyword_for.get(product_id)
 
         trend_influence = 0
         if matching_keyword:
-            product_trend_map.append((product_id, matching_keyword))
-            
-            product_trend = trends_df[trends_df['keyword'] == matching_keyword]['interest']
-            daily_trend = product_trend.resample('D').ffill().reindex(dates, method='ffill')
+            daily_trend = trend_matrix.column(matching_keyword)
             trend_influence = (daily_trend / 100) * base_sales * 3 
 
         # 4. Add "On Sale" influence
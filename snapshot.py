@@ -0,0 +1,240 @@
+"""
+Columnar local snapshot of sales_history and trend_data.
+
+Keeps a Hive-partitioned Parquet copy of both tables under data/snapshot/
+(one directory per month), appended incrementally: each sync only pulls rows
+whose serial id is past the last synced id. Training and analytics read the
+snapshot with memory-mapped Parquet instead of pulling years of history
+through psycopg2 row by row. Syncing streams through db.stream_query, so
+memory stays bounded by the chunk size however long the history is.
+
+Serial ids are handed out at INSERT but become visible at COMMIT, so a row
+can show up below the synced id (the register's journal flusher or a load
+test writing during a sync). Ids missing below the synced id are kept as
+gaps and re-read on the next syncs, for the last RECHECK_IDS ids.
+
+A table that was dropped and recreated (e.g. simulate_sales.py re-run) is
+detected from a fingerprint taken at each sync (lowest id, row count up to
+the synced id, and the row at the synced id) and rebuilt from scratch.
+
+Usage:
+    python snapshot.py           # incremental sync
+    python snapshot.py --full    # rebuild from scratch
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from db import stream_query
+
+SNAPSHOT_DIR = os.path.join("data", "snapshot")
+STATE_FILE = "_state.json"
+RECHECK_IDS = 50_000  # a late-committing row this far below the synced id is still picked up
+
+# table -> (serial id column, date column, columns to copy, Arrow schema)
+TABLES = {
+    "sales_history": (
+        "sale_id", "sale_date",
+        ["sale_id", "sale_date", "store_id", "product_id", "quantity_sold", "on_sale"],
+        pa.schema([
+            ("sale_id", pa.int64()), ("sale_date", pa.date32()), ("store_id", pa.int32()),
+            ("product_id", pa.int32()), ("quantity_sold", pa.int32()), ("on_sale", pa.int8()),
+        ]),
+    ),
+    "trend_data": (
+        "trend_id", "date",
+        ["trend_id", "date", "keyword", "interest"],
+        pa.schema([
+            ("trend_id", pa.int64()), ("date", pa.date32()), ("keyword", pa.string()), ("interest", pa.int16()),
+        ]),
+    ),
+}
+
+
+def _load_state(root):
+    path = os.path.join(root, STATE_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def _save_state(root, state):
+    # Write-then-rename so a crash never leaves a half-written state file
+    path = os.path.join(root, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _write_chunk(root, table, df, schema, date_col, id_col):
+    """Writes one chunk as a new Parquet file in each month partition it touches."""
+    df = df.copy()
+    df[date_col] = pd.to_datetime(df[date_col])
+    months = df[date_col].dt.strftime("%Y-%m")
+    for month, part in df.groupby(months, sort=True):
+        part_dir = os.path.join(root, table, f"month={month}")
+        os.makedirs(part_dir, exist_ok=True)
+        arrow = pa.Table.from_pandas(part.assign(**{date_col: part[date_col].dt.date}), schema=schema, preserve_index=False)
+        pq.write_table(arrow, os.path.join(part_dir, f"part-{int(part[id_col].min()):012d}.parquet"))
+
+
+def fingerprint(conn, table, last_id):
+    """(lowest id, rows with id <= last_id, the row at last_id) as the database has them now."""
+    id_col, _, columns, _ = TABLES[table]
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT MIN({id_col}), COUNT(*) FILTER (WHERE {id_col} <= %(last_id)s) FROM {table}",
+            {"last_id": last_id},
+        )
+        min_id, rows = cur.fetchone()
+        cur.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {id_col} = %(last_id)s", {"last_id": last_id})
+        anchor = cur.fetchone()
+    conn.rollback()
+    return min_id, rows, None if anchor is None else [str(v) for v in anchor]
+
+
+def _new_gaps(prev_id, ids):
+    """[lo, hi] id ranges missing between prev_id and the sorted `ids`."""
+    edges = np.concatenate([[prev_id], ids])
+    holes = np.flatnonzero(np.diff(edges) > 1)
+    return [[int(edges[i]) + 1, int(edges[i + 1]) - 1] for i in holes]
+
+
+def _fill_gaps(gaps, ids):
+    """`gaps` with the (sorted) ids that have now been synced taken out."""
+    if len(ids) == 0:
+        return gaps
+    remaining = []
+    for lo, hi in gaps:
+        inside = ids[np.searchsorted(ids, lo):np.searchsorted(ids, hi, side="right")]
+        remaining += _new_gaps(lo - 1, np.append(inside, hi + 1)) if len(inside) else [[lo, hi]]
+    return remaining
+
+
+def _in_gaps(ids, gaps):
+    """Which of the sorted `ids` fall in one of the sorted, disjoint `gaps`."""
+    if not gaps:
+        return np.zeros(len(ids), dtype=bool)
+    lo, hi = np.array(gaps, dtype=np.int64).T
+    i = np.searchsorted(lo, ids, side="right") - 1
+    return (i >= 0) & (ids <= hi[np.maximum(i, 0)])
+
+
+def sync_table(conn, table, root=SNAPSHOT_DIR, full=False, chunksize=200_000):
+    """Appends rows newer than the last synced id (and late rows below it). Returns the number of rows written."""
+    id_col, date_col, columns, schema = TABLES[table]
+    state = _load_state(root)
+    table_state = {} if full else state.get(table, {})
+    last_id = table_state.get("last_id", 0)
+
+    # Table was recreated (e.g. simulate_sales.py re-run): its rows no longer match the snapshot, rebuild
+    if last_id and "min_id" not in table_state:
+        print(f"{table}: snapshot has no fingerprint yet, rebuilding...")
+        last_id = 0
+    elif last_id:
+        min_id, rows, anchor = fingerprint(conn, table, last_id)
+        if min_id != table_state["min_id"] or rows < table_state["rows"] or anchor != table_state["anchor"]:
+            print(f"{table}: table was recreated in the database, rebuilding snapshot...")
+            last_id = 0
+    if last_id == 0:
+        shutil.rmtree(os.path.join(root, table), ignore_errors=True)
+        table_state = {"last_id": 0, "rows": 0, "gaps": []}
+    gaps = table_state.get("gaps", [])
+    synced_rows = table_state.get("rows", 0)
+
+    # Server-side cursor: only one chunk of the table is ever held in memory. Re-reads from the
+    # oldest gap; rows already in the snapshot are skipped.
+    start_id = gaps[0][0] - 1 if gaps else last_id
+    query = f"SELECT {', '.join(columns)} FROM {table} WHERE {id_col} > %(start_id)s ORDER BY {id_col}"
+    written = 0
+    for chunk in stream_query(query, {"start_id": start_id}, fetch_size=chunksize, conn=conn):
+        ids = chunk[id_col].to_numpy(dtype=np.int64)
+        late = _in_gaps(ids, gaps)
+        new = ids > last_id
+        chunk = chunk[late | new]
+        if chunk.empty:
+            continue
+        _write_chunk(root, table, chunk, schema, date_col, id_col)
+        written += len(chunk)
+        synced_rows += len(chunk)
+
+        gaps = _fill_gaps(gaps, ids[late]) + _new_gaps(last_id, ids[new])
+        last_id = max(last_id, int(ids[new].max()) if new.any() else last_id)
+        # Older gaps are rolled-back inserts, not late commits
+        floor = last_id - RECHECK_IDS
+        gaps = [[max(lo, floor + 1), hi] for lo, hi in gaps if hi > floor]
+
+        table_state.update({"last_id": last_id, "rows": synced_rows, "gaps": gaps,
+                            "synced_at": pd.Timestamp.now().isoformat()})
+        state[table] = table_state
+        _save_state(root, state)
+
+    if last_id:
+        min_id, _, anchor = fingerprint(conn, table, last_id)
+        table_state.update({"min_id": min_id, "anchor": anchor})
+        state[table] = table_state
+        _save_state(root, state)
+    return written
+
+
+def sync(conn, root=SNAPSHOT_DIR, full=False):
+    os.makedirs(root, exist_ok=True)
+    for table in TABLES:
+        start = time.perf_counter()
+        written = sync_table(conn, table, root=root, full=full)
+        print(f"{table}: {written:,} new rows in {time.perf_counter() - start:.1f}s")
+
+
+# --- Readers ---
+def read_table(table, columns=None, filters=None, root=SNAPSHOT_DIR):
+    """Memory-maps the snapshot of `table` (optionally only some columns / a filtered subset)."""
+    path = os.path.join(root, table)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No snapshot for '{table}'. Run `python snapshot.py` first.")
+    return pq.read_table(path, columns=columns, filters=filters, memory_map=True, partitioning="hive").to_pandas()
+
+
+def read_sales(product_ids=None, start=None, columns=None, root=SNAPSHOT_DIR):
+    filters = []
+    if product_ids is not None:
+        filters.append(("product_id", "in", list(product_ids)))
+    if start is not None:
+        filters.append(("sale_date", ">=", pd.Timestamp(start).date()))
+    return read_table("sales_history", columns=columns, filters=filters or None, root=root)
+
+
+def daily_sales(root=SNAPSHOT_DIR):
+    """Chain-wide daily sales per product (ds, y, on_sale), the shape Prophet trains on."""
+    sales = read_table("sales_history", columns=["sale_date", "product_id", "quantity_sold", "on_sale"], root=root)
+    daily = sales.groupby(["product_id", "sale_date"], sort=True).agg(y=("quantity_sold", "sum"), on_sale=("on_sale", "max"))
+    daily = daily.reset_index().rename(columns={"sale_date": "ds"})
+    daily["ds"] = pd.to_datetime(daily["ds"])
+    return daily
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the local Parquet snapshot of sales and trend data.")
+    parser.add_argument("--full", action="store_true", help="Rebuild the snapshot from scratch")
+    parser.add_argument("--root", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    from db import new_connection
+
+    conn = new_connection()
+    try:
+        sync(conn, root=args.root, full=args.full)
+    finally:
+        conn.close()
+    print(f"Snapshot up to date in '{args.root}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Concurrency-safe stock decrements.
+
+The register used to read stock_quantity when an item was added to the bill
+and blindly subtract at checkout, so two tills selling the last units of a
+product could drive stock negative. reserve_stock() replaces that with a
+single conditional UPDATE per cart: it locks the cart's inventory rows in
+product_id order (so concurrent carts can never deadlock), checks every
+line against the locked stock, and decrements all lines or none.
+
+decrement_clamped() is for sales that have already happened (recorded while
+the database was unreachable): every line is applied, but stock stops at
+zero, and the lines that sold more than the stock on record are reported.
+"""
+
+RESERVE_SQL = """
+    WITH wanted AS (
+        SELECT * FROM unnest(%(pids)s::int[], %(qtys)s::int[]) AS w(product_id, qty)
+    ),
+    locked AS (
+        SELECT i.inventory_id, i.product_id, i.stock_quantity, w.qty
+        FROM inventory i
+        JOIN wanted w ON w.product_id = i.product_id
+        WHERE i.store_id = %(sid)s
+        ORDER BY i.product_id
+        FOR UPDATE OF i
+    ),
+    verdict AS (
+        SELECT COUNT(*) = %(n)s AND COALESCE(BOOL_AND(stock_quantity >= qty), FALSE) AS ok FROM locked
+    ),
+    updated AS (
+        UPDATE inventory i SET stock_quantity = i.stock_quantity - l.qty
+        FROM locked l, verdict v
+        WHERE i.inventory_id = l.inventory_id AND v.ok
+        RETURNING i.product_id
+    )
+    SELECT w.product_id, w.qty, l.stock_quantity, (SELECT ok FROM verdict)
+    FROM wanted w
+    LEFT JOIN locked l ON l.product_id = w.product_id
+"""
+
+CLAMPED_SQL = """
+    WITH wanted AS (
+        SELECT * FROM unnest(%(pids)s::int[], %(qtys)s::int[]) AS w(product_id, qty)
+    ),
+    locked AS (
+        SELECT i.inventory_id, i.product_id, i.stock_quantity, w.qty
+        FROM inventory i
+        JOIN wanted w ON w.product_id = i.product_id
+        WHERE i.store_id = %(sid)s
+        ORDER BY i.product_id
+        FOR UPDATE OF i
+    ),
+    updated AS (
+        UPDATE inventory i SET stock_quantity = GREATEST(i.stock_quantity - l.qty, 0)
+        FROM locked l
+        WHERE i.inventory_id = l.inventory_id
+        RETURNING i.product_id
+    )
+    SELECT w.product_id, w.qty, l.stock_quantity
+    FROM wanted w
+    LEFT JOIN locked l ON l.product_id = w.product_id
+"""
+
+
+def cart_lines(items):
+    """Collapses cart items ({"id", "qty"}) into sorted (product_id, qty) pairs."""
+    totals = {}
+    for item in items:
+        totals[int(item["id"])] = totals.get(int(item["id"]), 0) + int(item["qty"])
+    return sorted(totals.items())
+
+
+def reserve_stock(cur, store_id, items):
+    """
+    Atomically decrements stock for a whole cart, in the caller's transaction.
+
+    Returns (ok, short) where `short` lists (product_id, requested, available)
+    for every line that could not be filled. On failure nothing is changed.
+    """
+    lines = cart_lines(items)
+    if not lines:
+        return True, []
+    cur.execute(RESERVE_SQL, {
+        "sid": int(store_id),
+        "pids": [pid for pid, _ in lines],
+        "qtys": [qty for _, qty in lines],
+        "n": len(lines),
+    })
+    rows = cur.fetchall()
+    ok = bool(rows[0][3])
+    short = [(pid, qty, stock or 0) for pid, qty, stock, _ in rows if stock is None or stock < qty]
+    return ok, short
+
+
+def decrement_clamped(cur, store_id, items):
+    """
+    Decrements stock for a sale that has already happened, never below zero.
+
+    Returns the (product_id, requested, available) lines that sold more than
+    the stock on record; the stock of those lines is now zero.
+    """
+    lines = cart_lines(items)
+    if not lines:
+        return []
+    cur.execute(CLAMPED_SQL, {
+        "sid": int(store_id),
+        "pids": [pid for pid, _ in lines],
+        "qtys": [qty for _, qty in lines],
+    })
+    return [(pid, qty, stock or 0) for pid, qty, stock in cur.fetchall() if stock is None or stock < qty]
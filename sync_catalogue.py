@@ -0,0 +1,148 @@
+"""
+Incremental catalogue sync: products.csv -> products, without touching stock.
+
+The incoming catalogue is COPYed into a temporary staging table and merged
+with three set-based statements (update changed rows, insert new ones, soft
+delete ones that disappeared), all in one transaction. Products are matched
+on a natural key: the barcode, or the name for products without one.
+Nothing is dropped or re-inserted, so product ids, inventory and sales
+history stay intact, and only the rows that actually changed are written.
+
+Rows loaded before the catalogue had barcodes are adopted by name on the
+first sync (they get the barcode), rather than duplicated.
+
+Soft-deleted products keep their row (and history) with active = FALSE,
+and come back to life if they reappear in a later catalogue.
+
+Usage:
+    python sync_catalogue.py                     # sync products.csv
+    python sync_catalogue.py new_items.csv --partial   # add/update only, no soft deletes
+    python sync_catalogue.py --dry-run
+"""
+import argparse
+import time
+from io import StringIO
+
+import pandas as pd
+
+MIGRATE_SQL = """
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS barcode VARCHAR(64) UNIQUE;
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS active BOOLEAN NOT NULL DEFAULT TRUE;
+    CREATE INDEX IF NOT EXISTS idx_products_natural_key ON products ((COALESCE('b:' || barcode, 'n:' || name)));
+"""
+
+# Natural key: barcode if the product has one, else its name
+NATURAL_KEY = "COALESCE('b:' || {t}.barcode, 'n:' || {t}.name)"
+
+MERGE_SQL = {
+    # Rows loaded before barcodes existed: give them the barcode of the incoming product with their name
+    "adopted": """
+        UPDATE products p SET barcode = s.barcode
+        FROM (
+            SELECT DISTINCT ON (name) name, barcode FROM staging_products st
+            WHERE barcode IS NOT NULL AND NOT EXISTS (SELECT 1 FROM products x WHERE x.barcode = st.barcode)
+            ORDER BY name, barcode
+        ) s
+        WHERE p.barcode IS NULL AND p.name = s.name
+          AND p.product_id = (SELECT MIN(y.product_id) FROM products y WHERE y.name = p.name AND y.barcode IS NULL)
+    """,
+    "updated": f"""
+        UPDATE products p SET name = s.name, category = s.category, active = TRUE
+        FROM staging_products s
+        WHERE {NATURAL_KEY.format(t='p')} = s.nkey
+          AND (p.name, p.category, p.active) IS DISTINCT FROM (s.name, s.category, TRUE)
+    """,
+    "inserted": f"""
+        INSERT INTO products (barcode, name, category)
+        SELECT s.barcode, s.name, s.category FROM staging_products s
+        WHERE NOT EXISTS (SELECT 1 FROM products p WHERE {NATURAL_KEY.format(t='p')} = s.nkey)
+    """,
+    "deactivated": f"""
+        UPDATE products p SET active = FALSE
+        WHERE p.active
+          AND NOT EXISTS (SELECT 1 FROM staging_products s WHERE s.nkey = {NATURAL_KEY.format(t='p')})
+    """,
+}
+
+
+def read_catalogue(path):
+    """Loads a catalogue CSV (barcode, name, category; barcode optional) and dedupes it by natural key."""
+    df = pd.read_csv(path, dtype=str)
+    if 'barcode' not in df.columns:
+        df['barcode'] = None
+    df = df[['barcode', 'name', 'category']].copy()
+    df['name'] = df['name'].str.strip()
+    df = df.dropna(subset=['name'])
+    barcode = df['barcode'].str.strip()
+    df['barcode'] = barcode.where(barcode != '')
+    key = df['barcode'].radd('b:').fillna('n:' + df['name'])
+    return df[~key.duplicated(keep='last')]
+
+
+def sync_products(conn, catalogue, partial=False, dry_run=False, commit=True):
+    """
+    Merges a catalogue DataFrame into products. Returns counts per kind of change.
+
+    With commit=False the changes are left in the caller's open transaction.
+    """
+    start = time.perf_counter()
+    counts = {"incoming": len(catalogue)}
+    with conn.cursor() as cur:
+        cur.execute(MIGRATE_SQL)
+        cur.execute("""
+            CREATE TEMP TABLE staging_products (
+                barcode VARCHAR(64),
+                name VARCHAR(255) NOT NULL,
+                category VARCHAR(255)
+            ) ON COMMIT DROP
+        """)
+        buf = StringIO()
+        catalogue.to_csv(buf, index=False, header=False)
+        buf.seek(0)
+        cur.copy_expert("COPY staging_products (barcode, name, category) FROM STDIN WITH (FORMAT csv)", buf)
+        cur.execute("ALTER TABLE staging_products ADD COLUMN nkey TEXT")
+        cur.execute(f"UPDATE staging_products s SET nkey = {NATURAL_KEY.format(t='s')}")
+        cur.execute("CREATE INDEX ON staging_products (nkey)")
+        cur.execute("ANALYZE staging_products")
+
+        for kind in ("adopted", "updated", "inserted", "deactivated"):
+            if kind == "deactivated" and partial:
+                counts[kind] = 0
+                continue
+            cur.execute(MERGE_SQL[kind])
+            counts[kind] = cur.rowcount
+    if dry_run:
+        conn.rollback()
+    elif commit:
+        conn.commit()
+    counts["unchanged"] = counts["incoming"] - counts["updated"] - counts["inserted"]
+    counts["seconds"] = time.perf_counter() - start
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the products table with a catalogue CSV.")
+    parser.add_argument("path", nargs="?", default="products.csv")
+    parser.add_argument("--partial", action="store_true",
+                        help="The file is only part of the catalogue: insert/update, never soft delete")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes, then roll back")
+    args = parser.parse_args()
+
+    from db import new_connection
+
+    catalogue = read_catalogue(args.path)
+    print(f"Read {len(catalogue):,} products from '{args.path}'.")
+    conn = new_connection()
+    try:
+        counts = sync_products(conn, catalogue, partial=args.partial, dry_run=args.dry_run)
+    finally:
+        conn.close()
+
+    print(f"{'Dry run: ' if args.dry_run else ''}{counts['inserted']:,} inserted, {counts['updated']:,} updated, "
+          f"{counts['deactivated']:,} soft-deleted, {counts['unchanged']:,} unchanged ({counts['seconds']:.2f}s)")
+    if counts['adopted']:
+        print(f"Matched {counts['adopted']:,} existing products without a barcode to their barcode by name.")
+
+
+if __name__ == "__main__":
+    main()
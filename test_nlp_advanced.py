@@ -1,3 +1,6 @@
+import argparse
+import time
+
 import spacy
 from spacy.scorer import Scorer
 from spacy.training import Example
@@ -43,72 +46,96 @@ GOLD_STANDARD_TEST_DATA = [
     )
 ]
 
-# --- 2. LOAD YOUR TRAINED MODEL ---
-print("Loading custom model from './my_ingredient_model'...")
-model_path = "./my_ingredient_model"
-nlp = spacy.load(model_path)
-
-# --- 3. CALCULATE PERFORMANCE METRICS (NEW ROBUST WAY) ---
-print("Calculating model performance...")
-scorer = Scorer()
-examples = []
-all_docs_to_visualize = []
-
-for text, annotations in GOLD_STANDARD_TEST_DATA:
-    
-    # Run the text through the trained model to get the PREDICTION
-    predicted_doc = nlp(text)
-    all_docs_to_visualize.append(predicted_doc) # Add for visualization
-    
-    # Create the "gold standard" REFERENCE doc
-    reference_doc = nlp.make_doc(text)
+MODEL_PATH = "./my_ingredient_model"
+COLORS = {"QTY": "#FFC107", "UNIT": "#4CAF50", "INGREDIENT": "#2196F3"}
+
+
+def reference_doc(nlp, text, annotations, verbose=True):
+    """The "gold standard" REFERENCE doc for one labelled example."""
+    doc = nlp.make_doc(text)
     ents = []
     for start, end, label in annotations["entities"]:
-        span = reference_doc.char_span(start, end, label=label, alignment_mode="contract")
-        
+        span = doc.char_span(start, end, label=label, alignment_mode="contract")
+
         if span is None:
-            # This is our own, better error message
-            print(f"--- !!! ERROR IN TEST DATA !!! ---")
-            print(f"Could not create span for: {(start, end, label)} in '{text}'")
-            print("This test example will be SKIPPED. Fix the indices above.")
-            print(f"------------------------------------")
+            if verbose:
+                # This is our own, better error message
+                print(f"--- !!! ERROR IN TEST DATA !!! ---")
+                print(f"Could not create span for: {(start, end, label)} in '{text}'")
+                print("This span will be SKIPPED. Fix the indices above.")
+                print(f"------------------------------------")
         else:
             ents.append(span)
-            
-    reference_doc.ents = ents
-    
-    # Create the Example object and add it to our list
-    example = Example(predicted_doc, reference_doc)
-    examples.append(example)
-
-# Score the list of Examples
-scores = scorer.score(examples)
-
-print("\n--- MODEL PERFORMANCE (STRICT) ---")
-print(f"Overall Precision (p): {scores['ents_p']:.3f}")
-print(f"Overall Recall (r):    {scores['ents_r']:.3f}")
-print(f"Overall F1-score (f):  {scores['ents_f']:.3f}")
-print("\n--- SCORES BY ENTITY TYPE ---")
-if 'ents_per_type' in scores:
-    for entity_type, metrics in scores['ents_per_type'].items():
-        print(f"  {entity_type}:")
-        print(f"    Precision: {metrics['p']:.3f}")
-        print(f"    Recall:    {metrics['r']:.3f}")
-        print(f"    F1-score:  {metrics['f']:.3f}")
-else:
-    print("Could not calculate scores per entity type.")
-
-
-# --- 4. CREATE VISUALIZATION ---
-print("\n--- GENERATING VISUALIZATION ---")
-output_path = Path("test_visualization.html")
-
-# Render the HTML
-html = render(all_docs_to_visualize, style="ent", page=True, 
-              options={"colors": {"QTY": "#FFC107", "UNIT": "#4CAF50", "INGREDIENT": "#2196F3"}})
-
-# Save the HTML to a file
-output_path.open("w", encoding="utf-8").write(html)
-
-print(f"\nSuccess! Open '{output_path.name}' in your browser to see the model's predictions.")
 
+    doc.ents = ents
+    return doc
+
+
+def score_model(nlp, data=GOLD_STANDARD_TEST_DATA, n_process=1, batch_size=64, verbose=True):
+    """
+    Scores `nlp` on labelled (text, annotations) pairs.
+
+    Predictions are made with nlp.pipe (across `n_process` processes), and
+    the inference speed is returned as scores["words_per_sec"]. Returns
+    (scores, predicted_docs).
+    """
+    texts = [text for text, _ in data]
+    start = time.perf_counter()
+    predicted = list(nlp.pipe(texts, n_process=n_process, batch_size=batch_size))
+    elapsed = time.perf_counter() - start
+
+    examples = [Example(pred, reference_doc(nlp, text, annotations, verbose))
+                for pred, (text, annotations) in zip(predicted, data)]
+    scores = Scorer().score(examples)
+    scores["words_per_sec"] = sum(len(doc) for doc in predicted) / elapsed if elapsed else 0.0
+    return scores, predicted
+
+
+def print_scores(scores):
+    print("\n--- MODEL PERFORMANCE (STRICT) ---")
+    print(f"Overall Precision (p): {scores['ents_p']:.3f}")
+    print(f"Overall Recall (r):    {scores['ents_r']:.3f}")
+    print(f"Overall F1-score (f):  {scores['ents_f']:.3f}")
+    print(f"Inference speed:       {scores['words_per_sec']:,.0f} words/sec")
+    print("\n--- SCORES BY ENTITY TYPE ---")
+    if scores.get('ents_per_type'):
+        for entity_type, metrics in scores['ents_per_type'].items():
+            print(f"  {entity_type}:")
+            print(f"    Precision: {metrics['p']:.3f}")
+            print(f"    Recall:    {metrics['r']:.3f}")
+            print(f"    F1-score:  {metrics['f']:.3f}")
+    else:
+        print("Could not calculate scores per entity type.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the ingredient NER model on the gold standard set.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--n-process", type=int, default=1, help="Processes used by nlp.pipe")
+    parser.add_argument("--output", default="test_visualization.html")
+    args = parser.parse_args()
+
+    # --- 2. LOAD YOUR TRAINED MODEL ---
+    print(f"Loading custom model from '{args.model}'...")
+    nlp = spacy.load(args.model)
+
+    # --- 3. CALCULATE PERFORMANCE METRICS (NEW ROBUST WAY) ---
+    print("Calculating model performance...")
+    scores, predicted = score_model(nlp, n_process=args.n_process)
+    print_scores(scores)
+
+    # --- 4. CREATE VISUALIZATION ---
+    print("\n--- GENERATING VISUALIZATION ---")
+    output_path = Path(args.output)
+
+    # Render the HTML
+    html = render(predicted, style="ent", page=True, options={"colors": COLORS})
+
+    # Save the HTML to a file
+    output_path.open("w", encoding="utf-8").write(html)
+
+    print(f"\nSuccess! Open '{output_path.name}' in your browser to see the model's predictions.")
+
+
+if __name__ == "__main__":
+    main()
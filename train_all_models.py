@@ -5,14 +5,31 @@ from prophet import Prophet
 from prophet.serialize import model_to_json
 from prophet.plot import plot_plotly, plot_components_plotly 
 import plotly.io as pio
-from db import init_connection
+from db import init_connection, stream_query
+from trend_alignment import TrendMatrix, load_trend_matrix
 import os # <--- NEW IMPORT
+import argparse
 
 # Create the models directory if it doesn't exist
 if not os.path.exists('models'):
     os.makedirs('models')
 
-def load_training_data(conn, product_id, keyword=None):
+def prepare_training_frame(sales_df, trends=None, keyword=None):
+    """Joins daily sales (ds, y, on_sale) with a keyword's daily interest from a TrendMatrix."""
+    sales_df = sales_df.copy()
+    sales_df['ds'] = pd.to_datetime(sales_df['ds'])
+    sales_df = sales_df.set_index('ds')
+
+    if keyword:
+        if trends is None or keyword not in trends: return sales_df.reset_index()
+
+        train_df = sales_df.join(trends.series(keyword)).dropna().reset_index()
+    else:
+        train_df = sales_df.reset_index()
+
+    return train_df if not train_df.empty else None
+
+def load_training_data(conn, product_id, keyword=None, trends=None):
     """Loads training data (Sales + Trends)."""
     sql_sales = """
         SELECT sale_date AS ds, SUM(quantity_sold) AS y, MAX(on_sale) AS on_sale
@@ -24,28 +41,45 @@ def load_training_data(conn, product_id, keyword=None):
     try:
         sales_df = pd.read_sql(sql_sales, conn, params={"product_id": product_id})
         if sales_df.empty: return None
-            
-        sales_df['ds'] = pd.to_datetime(sales_df['ds'])
-        sales_df = sales_df.set_index('ds')
-
-        if keyword:
-            sql_trend = "SELECT date, interest FROM trend_data WHERE keyword = %(keyword)s ORDER BY date;"
-            trend_df = pd.read_sql(sql_trend, conn, params={"keyword": keyword})
-            if trend_df.empty: return sales_df.reset_index()
-
-            trend_df['date'] = pd.to_datetime(trend_df['date'])
-            trend_df = trend_df.set_index('date')
-            daily_trend_df = trend_df.resample('D').ffill()
-            train_df = sales_df.join(daily_trend_df).dropna().reset_index()
-        else:
-            train_df = sales_df.reset_index()
-        
-        return train_df if not train_df.empty else None
+
+        return prepare_training_frame(sales_df, trends, keyword)
 
     except Exception as e:
         print(f"Error loading data: {e}")
         return None
 
+def load_snapshot_training_data():
+    """Reads all sales & trends once from the Parquet snapshot (see snapshot.py)."""
+    import snapshot
+    print("Reading sales and trends from the local snapshot...")
+    sales = {pid: df.drop(columns='product_id') for pid, df in snapshot.daily_sales().groupby('product_id')}
+    trends = TrendMatrix(snapshot.read_table("trend_data", columns=["date", "keyword", "interest"]))
+    return sales, trends
+
+def stream_training_data(conn, fetch_size=50_000):
+    """
+    Yields (product_id, daily sales df) for every product from one streamed query.
+
+    Rows come back ordered by product through a server-side cursor, so only
+    one chunk (plus the product it ends in) is held in memory at a time.
+    """
+    sql_sales = """
+        SELECT product_id, sale_date AS ds, SUM(quantity_sold) AS y, MAX(on_sale) AS on_sale
+        FROM sales_history
+        GROUP BY product_id, sale_date ORDER BY product_id, sale_date;
+    """
+    carry = None
+    for chunk in stream_query(sql_sales, fetch_size=fetch_size, dtypes={'y': 'int64', 'on_sale': 'int64'}, conn=conn):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        # The last product in the chunk may continue in the next one; hold it back
+        last_pid = chunk['product_id'].iloc[-1]
+        carry = chunk[chunk['product_id'] == last_pid]
+        for pid, df in chunk[chunk['product_id'] != last_pid].groupby('product_id', sort=False):
+            yield pid, df.drop(columns='product_id')
+    if carry is not None and not carry.empty:
+        yield carry['product_id'].iloc[0], carry.drop(columns='product_id')
+
 def generate_future_trend(future_dates, keyword):
     """Generates synthetic future trend."""
     day_of_year = future_dates['ds'].dt.dayofyear
@@ -72,6 +106,13 @@ def generate_future_trend(future_dates, keyword):
     return np.clip(future_trend, 0, 100).astype(int)
 
 def main():
+    parser = argparse.ArgumentParser(description="Train one Prophet demand model per product.")
+    parser.add_argument("--from-snapshot", action="store_true",
+                        help="Read history from the Parquet snapshot instead of querying Postgres per product")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream all sales history from Postgres in one server-side cursor (bounded memory)")
+    args = parser.parse_args()
+
     conn = init_connection()
     if conn is None: return
 
@@ -79,16 +120,36 @@ def main():
     products = pd.read_sql("SELECT product_id, name FROM products", conn)
     trend_map_df = pd.read_sql("SELECT product_id, keyword FROM product_trend_mapping", conn)
     trend_map = dict(zip(trend_map_df['product_id'], trend_map_df['keyword']))
-    
+    product_names = dict(zip(products['product_id'], products['name']))
+
+    # Every keyword expanded to daily once; each product's regressor is then a column slice
+    if args.from_snapshot:
+        snapshot_sales, trends = load_snapshot_training_data()
+    else:
+        print("Aligning trend data...")
+        trends = load_trend_matrix(conn)
+
+    def training_frames():
+        """(product_id, keyword, train_df) for each product, from whichever source was chosen."""
+        if args.stream:
+            for pid, sales_df in stream_training_data(conn):
+                keyword = trend_map.get(pid)
+                yield pid, keyword, prepare_training_frame(sales_df, trends, keyword)
+            return
+        for pid in products['product_id']:
+            keyword = trend_map.get(pid)
+            if args.from_snapshot:
+                if pid not in snapshot_sales: continue
+                yield pid, keyword, prepare_training_frame(snapshot_sales[pid], trends, keyword)
+            else:
+                yield pid, keyword, load_training_data(conn, pid, keyword, trends)
+
     models_trained = 0
     
-    for index, product in products.iterrows():
-        pid, pname = product['product_id'], product['name']
+    for pid, keyword, train_df in training_frames():
+        pname = product_names.get(pid, pid)
         print(f"Training: {pname}...")
 
-        keyword = trend_map.get(pid)
-        train_df = load_training_data(conn, pid, keyword)
-
         if train_df is None: continue
 
         model = Prophet()
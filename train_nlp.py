@@ -1,7 +1,15 @@
-import spacy
+import argparse
+import json
 import random
+import time
+from pathlib import Path
+
+import spacy
 from spacy.util import minibatch, compounding
 from spacy.training import Example
+from spacy.tokens import DocBin
+
+from test_nlp_advanced import GOLD_STANDARD_TEST_DATA, score_model
 
 # 1. Import our hard-earned labeled data
 try:
@@ -16,8 +24,63 @@ if not TRAIN_DATA:
     print("Please add at least 20-30 labeled examples.")
     exit()
 
-def main(n_iter=30, model_dir="./my_ingredient_model"):
+CORPUS_DIR = Path("corpus")
+
+
+def to_docbin(nlp, data):
+    """
+    Converts (text, annotations) pairs to a DocBin once.
+
+    An entity whose offsets don't line up with token boundaries is expanded
+    to whole tokens. If it then overlaps another entity, its tokens are left
+    unannotated ("missing", not "outside"), as Example.from_dict does, and
+    the rest of the example is kept.
+    """
+    db = DocBin()
+    unannotated = 0
+    for text, annots in data:
+        doc = nlp.make_doc(text)
+        spans, missing = [], []
+        for start, end, label in sorted(annots.get("entities")):
+            span = doc.char_span(start, end, label=label, alignment_mode="expand")
+            if span is None or (spans and span.start < spans[-1].end):
+                print(f"Warning: {label} entity {text[start:end]!r} left unannotated in {text!r}")
+                unannotated += 1
+                if span is not None:
+                    missing.extend(range(span.start, span.end))
+                continue
+            spans.append(span)
+        covered = {i for span in spans for i in range(span.start, span.end)}
+        doc.set_ents(spans, missing=[doc[i:i + 1] for i in sorted(set(missing) - covered)], default="outside")
+        db.add(doc)
+    return db, unannotated
+
+
+def load_examples(nlp, db):
+    """Example objects from a DocBin (built once, reused on every iteration)."""
+    return [Example(nlp.make_doc(doc.text), doc) for doc in db.get_docs(nlp.vocab)]
+
+
+def prepare_corpus(nlp, dev_split, seed):
+    """Splits TRAIN_DATA into train/dev, writes corpus/train.spacy and corpus/dev.spacy, returns Examples."""
+    data = list(TRAIN_DATA)
+    random.Random(seed).shuffle(data)
+    n_dev = max(1, int(len(data) * dev_split)) if dev_split > 0 else 0
+    dev_data, train_data = data[:n_dev], data[n_dev:]
+
+    CORPUS_DIR.mkdir(exist_ok=True)
+    train_db, unannotated = to_docbin(nlp, train_data)
+    dev_db, dev_unannotated = to_docbin(nlp, dev_data)
+    train_db.to_disk(CORPUS_DIR / "train.spacy")
+    dev_db.to_disk(CORPUS_DIR / "dev.spacy")
+    print(f"Corpus: {len(train_db)} train / {len(dev_db)} dev examples ({unannotated + dev_unannotated} entities left unannotated), "
+          f"saved to '{CORPUS_DIR}/'")
+    return load_examples(nlp, train_db), load_examples(nlp, dev_db)
+
+
+def main(n_iter=30, model_dir="./my_ingredient_model", patience=5, dev_split=0.2, seed=0, n_process=1):
     """Main function to train the custom NER model."""
+    random.seed(seed)
 
     # 2. Create a blank English "nlp" object
     nlp = spacy.blank("en")
@@ -25,10 +88,7 @@ def main(n_iter=30, model_dir="./my_ingredient_model"):
 
     # 3. Create the "ner" (Named Entity Recognition)
     # pipeline component and add it to the pipeline
-    if "ner" not in nlp.pipe_names:
-        ner = nlp.add_pipe("ner", last=True)
-    else:
-        ner = nlp.get_pipe("ner")
+    ner = nlp.add_pipe("ner", last=True)
 
     # 4. Add our custom labels (QTY, UNIT, INGREDIENT)
     # to the NER component
@@ -36,50 +96,84 @@ def main(n_iter=30, model_dir="./my_ingredient_model"):
         for ent in annotations.get("entities"):
             ner.add_label(ent[2]) # ent[2] is the "LABEL"
 
+    train_examples, dev_examples = prepare_corpus(nlp, dev_split, seed)
+    if not train_examples:
+        print("Error: no valid training examples left after the dev split.")
+        return
+
     # 5. Start the training!
-    # We'll disable other pipelines, so we only train the NER
-    other_pipes = [pipe for pipe in nlp.pipe_names if pipe != "ner"]
-
-    with nlp.disable_pipes(*other_pipes):
-        print("Starting training...")
-        optimizer = nlp.begin_training()
-
-        for itn in range(n_iter):
-            # Shuffle the training data on each iteration
-            random.shuffle(TRAIN_DATA)
-            losses = {}
-
-            # Batch up the examples
-            batches = minibatch(TRAIN_DATA, size=compounding(4.0, 32.0, 1.001))
-
-            for batch in batches:
-                examples = []
-                for text, annots in batch:
-                    try:
-                        # Create an "Example" object for spaCy
-                        doc = nlp.make_doc(text)
-                        examples.append(Example.from_dict(doc, annots))
-                    except ValueError as e:
-                        # This catches bad labels (e.g., overlaps)
-                        print(f"Warning: Skipping one bad example. Error: {e}")
-
-                # 6. THIS IS THE CORE STEP:
-                # Only update if we have valid examples in the batch
-                if examples:
-                    nlp.update(
-                        examples,
-                        drop=0.3, # Dropout - makes model more robust
-                        sgd=optimizer,
-                        losses=losses,
-                    )
-
-            print(f"Iteration {itn + 1}/{n_iter}, Losses: {losses}")
-
-    # 7. Save our newly trained, custom model to a folder
+    print("Starting training...")
+    optimizer = nlp.initialize(lambda: train_examples)
+
+    best_f, best_itn, best_weights = -1.0, 0, None
+    words_trained, train_seconds = 0, 0.0
+    for itn in range(n_iter):
+        # Shuffle the training data on each iteration
+        random.shuffle(train_examples)
+        losses = {}
+
+        start = time.perf_counter()
+        # Batch up the examples
+        for batch in minibatch(train_examples, size=compounding(4.0, 32.0, 1.001)):
+            # 6. THIS IS THE CORE STEP:
+            nlp.update(
+                batch,
+                drop=0.3, # Dropout - makes model more robust
+                sgd=optimizer,
+                losses=losses,
+            )
+            words_trained += sum(len(eg.reference) for eg in batch)
+        train_seconds += time.perf_counter() - start
+
+        # Early stopping on the held-out examples (or the training loss when there is no dev set)
+        if dev_examples:
+            dev_f = nlp.evaluate(dev_examples)["ents_f"] or 0.0
+        else:
+            dev_f = -losses.get("ner", 0.0)
+        print(f"Iteration {itn + 1}/{n_iter}, Losses: {losses}, Dev F1: {dev_f:.3f}")
+
+        if dev_f > best_f:
+            best_f, best_itn, best_weights = dev_f, itn + 1, nlp.get_pipe("ner").to_bytes()
+        elif itn + 1 - best_itn >= patience:
+            print(f"No improvement for {patience} iterations, stopping early.")
+            break
+
+    if best_weights is not None:
+        nlp.get_pipe("ner").from_bytes(best_weights)
+    print(f"Best model: iteration {best_itn} (dev F1 {best_f:.3f})")
+
+    # Score the kept weights on the hand-checked gold set, timing inference with nlp.pipe
+    gold_scores, _ = score_model(nlp, GOLD_STANDARD_TEST_DATA, n_process=n_process, verbose=False)
+    train_wps = words_trained / train_seconds if train_seconds else 0.0
+    print(f"Gold F1: {gold_scores['ents_f']:.3f} | Training: {train_wps:,.0f} words/sec | "
+          f"Inference: {gold_scores['words_per_sec']:,.0f} words/sec (n_process={n_process})")
+
+    # 7. Save our newly trained, custom model to a folder, with its training record
+    nlp.meta["training"] = {
+        "iterations": itn + 1,
+        "best_iteration": best_itn,
+        "dev_ents_f": best_f if dev_examples else None,
+        "gold_ents_f": gold_scores["ents_f"],
+        "train_words_per_sec": round(train_wps, 1),
+        "inference_words_per_sec": round(gold_scores["words_per_sec"], 1),
+        "inference_n_process": n_process,
+        "train_examples": len(train_examples),
+        "dev_examples": len(dev_examples),
+    }
     nlp.to_disk(model_dir)
     print(f"Training complete! Model saved to: {model_dir}")
+    print(json.dumps(nlp.meta["training"], indent=2))
 
 
 # This just runs our main function when we call "python train_nlp.py"
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the ingredient NER model.")
+    parser.add_argument("--n-iter", type=int, default=30, help="Maximum number of iterations")
+    parser.add_argument("--patience", type=int, default=5, help="Stop after this many iterations without a dev F1 gain")
+    parser.add_argument("--dev-split", type=float, default=0.2, help="Share of TRAIN_DATA held out for early stopping")
+    parser.add_argument("--n-process", type=int, default=1, help="Processes for the final nlp.pipe evaluation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model-dir", default="./my_ingredient_model")
+    args = parser.parse_args()
+    main(n_iter=args.n_iter, model_dir=args.model_dir, patience=args.patience,
+         dev_split=args.dev_split, seed=args.seed, n_process=args.n_process)
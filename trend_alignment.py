@@ -0,0 +1,90 @@
+"""
+Daily-aligned Google Trends regressors for every keyword at once.
+
+trend_data is weekly and long-format (date, keyword, interest). Training and
+the sales simulator both need it as a daily, forward-filled series per
+keyword; doing that with one query + resample('D') per product re-expands
+the same weeks over and over. TrendMatrix pivots all keywords once into a
+dense date x keyword array, so a product's regressor is a column slice.
+
+load_trend_matrix() caches the matrix per trend-data version (row count,
+max id, max date), so it is rebuilt only when trend_data actually changes.
+"""
+import numpy as np
+import pandas as pd
+
+from db import stream_query
+
+TREND_VERSION_SQL = "SELECT COUNT(*), COALESCE(MAX(trend_id), 0), MAX(date) FROM trend_data"
+
+_MATRIX_CACHE = {}
+
+
+class TrendMatrix:
+    """Dense daily date x keyword interest matrix, forward-filled per keyword."""
+
+    def __init__(self, trends_df):
+        trends_df = trends_df[['date', 'keyword', 'interest']].copy()
+        trends_df['date'] = pd.to_datetime(trends_df['date'])
+        wide = trends_df.pivot_table(index='date', columns='keyword', values='interest', aggfunc='last')
+        if wide.empty:
+            self.dates = pd.DatetimeIndex([])
+            self.keywords = []
+            self.values = np.empty((0, 0))
+            self.last_row = np.empty(0, dtype=np.int64)
+        else:
+            self.dates = pd.date_range(wide.index.min(), wide.index.max(), freq='D')
+            wide = wide.reindex(self.dates)
+            # Last day each keyword has a real observation; ffill past it is an extrapolation
+            observed = wide.notna().to_numpy()
+            self.last_row = len(self.dates) - 1 - np.argmax(observed[::-1], axis=0)
+            self.keywords = wide.columns.tolist()
+            self.values = np.ascontiguousarray(wide.ffill().to_numpy(dtype=float))
+        self.col_of = {kw: i for i, kw in enumerate(self.keywords)}
+
+    def __contains__(self, keyword):
+        return keyword in self.col_of
+
+    def column(self, keyword, extend=True):
+        """
+        Daily interest for `keyword` as a NumPy view over self.dates.
+
+        With extend=False the slice stops at the keyword's last observed
+        week, like resample('D').ffill() on that keyword alone.
+        """
+        col = self.col_of[keyword]
+        stop = len(self.dates) if extend else self.last_row[col] + 1
+        return self.values[:stop, col]
+
+    def series(self, keyword, extend=False):
+        """The same column as a pd.Series named 'interest', indexed by day."""
+        values = self.column(keyword, extend=extend)
+        return pd.Series(values, index=self.dates[:len(values)], name='interest')
+
+    def align(self, keyword, dates):
+        """Interest on arbitrary `dates` (NaN outside the matrix range)."""
+        dates = pd.DatetimeIndex(dates)
+        rows = self.dates.get_indexer(dates)
+        out = np.full(len(dates), np.nan)
+        hit = rows >= 0
+        out[hit] = self.values[rows[hit], self.col_of[keyword]]
+        return out
+
+
+def trend_version(conn):
+    with conn.cursor() as cur:
+        cur.execute(TREND_VERSION_SQL)
+        version = cur.fetchone()
+    conn.rollback()
+    return tuple(str(v) for v in version)
+
+
+def load_trend_matrix(conn):
+    """TrendMatrix over all of trend_data, rebuilt only when the table's version changes."""
+    version = trend_version(conn)
+    if version not in _MATRIX_CACHE:
+        chunks = list(stream_query("SELECT date, keyword, interest FROM trend_data", conn=conn))
+        trends_df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=['date', 'keyword', 'interest'])
+        _MATRIX_CACHE.clear()
+        _MATRIX_CACHE[version] = TrendMatrix(trends_df)
+    return _MATRIX_CACHE[version]
@@ -0,0 +1,144 @@
+"""
+Product -> Google Trends keyword matching.
+
+A keyword matches a product when every word of the keyword starts one of
+the words in the product name ("Onion" matches "Red Onions 1kg"). Keyword
+words are indexed once, so each product costs one set lookup per prefix of
+each of its name tokens instead of a scan over every keyword. When several
+keywords match, the most specific wins: most words first, then
+alphabetical, so the mapping is the same on every run.
+
+sync_mapping() brings product_trend_mapping in line with the current
+catalogue and keyword list by inserting / deleting only the rows that
+changed, so adding products or keywords no longer means re-running the
+whole sales simulation.
+
+Usage:
+    python trend_mapping.py             # sync product_trend_mapping
+    python trend_mapping.py --dry-run   # just report what would change
+"""
+import argparse
+import re
+import time
+
+import psycopg2.extras
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+class KeywordMatcher:
+    """Token index over the keyword list."""
+
+    def __init__(self, keywords):
+        # Most specific first: more words, then alphabetical
+        self.keywords = sorted({str(k) for k in keywords}, key=lambda k: (-len(set(tokenize(k))), k))
+        self.word_count = [len(set(tokenize(k))) for k in self.keywords]
+        self.keywords_with = {}
+        for rank, keyword in enumerate(self.keywords):
+            for word in set(tokenize(keyword)):
+                self.keywords_with.setdefault(word, []).append(rank)
+        self.max_word_len = max((len(w) for w in self.keywords_with), default=0)
+
+    def match(self, name):
+        """The best keyword for a product name, or None."""
+        words = set()
+        for token in set(tokenize(name)):
+            for end in range(1, min(len(token), self.max_word_len) + 1):
+                if token[:end] in self.keywords_with:
+                    words.add(token[:end])
+        if not words:
+            return None
+        hits = {}
+        for word in words:
+            for rank in self.keywords_with[word]:
+                hits[rank] = hits.get(rank, 0) + 1
+        full = [rank for rank, n in hits.items() if n == self.word_count[rank]]
+        return self.keywords[min(full)] if full else None
+
+    def match_all(self, products):
+        """{product_id: keyword} for a DataFrame with product_id and name."""
+        mapping = {}
+        for pid, name in zip(products['product_id'], products['name']):
+            keyword = self.match(name)
+            if keyword is not None:
+                mapping[int(pid)] = keyword
+        return mapping
+
+
+def sync_mapping(conn, dry_run=False):
+    """Diffs the computed mapping against product_trend_mapping and applies the changes."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS product_trend_mapping (
+                product_id INTEGER REFERENCES products(product_id),
+                keyword VARCHAR(255) NOT NULL,
+                PRIMARY KEY (product_id, keyword)
+            )
+        """)
+        cur.execute("SELECT product_id, name FROM products")
+        products = cur.fetchall()
+        cur.execute("SELECT DISTINCT keyword FROM trend_data")
+        keywords = [r[0] for r in cur.fetchall()]
+        cur.execute("SELECT product_id, keyword FROM product_trend_mapping")
+        current = {(int(pid), kw) for pid, kw in cur.fetchall()}
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        wanted = set(matcher.match_all({
+            'product_id': [p[0] for p in products],
+            'name': [p[1] for p in products],
+        }).items())
+        elapsed = time.perf_counter() - start
+
+        to_add = sorted(wanted - current)
+        to_remove = sorted(current - wanted)
+        if not dry_run:
+            if to_remove:
+                psycopg2.extras.execute_values(
+                    cur,
+                    """
+                    DELETE FROM product_trend_mapping m USING (VALUES %s) AS r(product_id, keyword)
+                    WHERE m.product_id = r.product_id AND m.keyword = r.keyword
+                    """,
+                    to_remove,
+                )
+            if to_add:
+                psycopg2.extras.execute_values(
+                    cur, "INSERT INTO product_trend_mapping (product_id, keyword) VALUES %s ON CONFLICT DO NOTHING", to_add
+                )
+    if dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
+    return {
+        "products": len(products),
+        "keywords": len(keywords),
+        "mapped": len(wanted),
+        "added": len(to_add),
+        "removed": len(to_remove),
+        "match_seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync product_trend_mapping with the catalogue and trend keywords.")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    args = parser.parse_args()
+
+    from db import new_connection
+
+    conn = new_connection()
+    summary = sync_mapping(conn, dry_run=args.dry_run)
+    conn.close()
+    print(f"Matched {summary['products']:,} products against {summary['keywords']} keywords "
+          f"in {summary['match_seconds']:.2f}s: {summary['mapped']:,} mapped.")
+    verb = "Would add" if args.dry_run else "Added"
+    print(f"{verb} {summary['added']:,} and {'would remove' if args.dry_run else 'removed'} {summary['removed']:,} mappings.")
+
+
+if __name__ == "__main__":
+    main()